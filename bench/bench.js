@@ -0,0 +1,572 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Benchmarks for the hot paths of the html5 client,
+ * running the client code in nodejs, without a browser or a server.
+ *
+ * usage:
+ *  node --expose-gc bench/bench.js [--iterations=N] [--json] [--only=NAME,..] [TRACE..]
+ *
+ * The traces are recorded by the client using the `trace` option,
+ * without any, a synthetic session is generated.
+ * Traces of encrypted connections cannot be used.
+ */
+
+"use strict";
+
+const fs = require("fs");
+const path = require("path");
+const vm = require("vm");
+const zlib = require("zlib");
+const {PerformanceObserver, performance} = require("perf_hooks");
+
+const JS_DIR = path.join(__dirname, "..", "html5", "js");
+const CLIENT_SCRIPTS = [
+  "lib/lz4.js",
+  "lib/brotli_decode.js",
+  "lib/rencode.js",
+  "Utilities.js",
+  "RgbHelpers.js",
+  "Protocol.js",
+];
+const MB = 1024 * 1024;
+
+
+function load_scripts(scripts, globals) {
+  //runs the scripts in their own context, like a browser page or a worker would
+  const context = Object.assign({
+    console,
+    performance,
+    setTimeout,
+    clearTimeout,
+    queueMicrotask,
+    TextEncoder,
+    TextDecoder,
+    Blob,
+    navigator: {
+      userAgent: "nodejs",
+      platform: process.platform,
+      language: "en",
+      hardwareConcurrency: 1,
+    },
+  }, globals || {});
+  vm.createContext(context);
+  context.importScripts = function() {
+    for (const script of arguments) {
+      run_script(context, script);
+    }
+  };
+  for (const script of scripts) {
+    run_script(context, script);
+  }
+  return context;
+}
+
+function run_script(context, script) {
+  const filename = path.join(JS_DIR, script);
+  vm.runInContext(fs.readFileSync(filename, "utf8"), context, {filename});
+}
+
+function load_client() {
+  //pretend to be a page, so Protocol.js does not start a worker:
+  const document = {};
+  return load_scripts(CLIENT_SCRIPTS, {
+    document,
+    window: {document},
+  });
+}
+
+
+/*
+ * Synthetic session: the packets we receive the most often,
+ * framed and compressed the way the server sends them.
+ */
+function make_header(proto_flags, level, index, size) {
+  const header = new Uint8Array(8);
+  header[0] = "P".charCodeAt(0);
+  header[1] = proto_flags;
+  header[2] = level;
+  header[3] = index;
+  new DataView(header.buffer).setUint32(4, size);
+  return header;
+}
+
+function lz4_compress(client, data) {
+  //the format used by the server: the uncompressed size (little endian) followed by an lz4 block
+  const lz4 = client.lz4;
+  const block = new Uint8Array(lz4.compressBound(data.length));
+  const size = lz4.compressBlock(data, block, 0, data.length, new Uint32Array(1 << 16));
+  if (size === 0) {
+    throw new Error("synthetic data is not compressible");
+  }
+  const compressed = new Uint8Array(4 + size);
+  new DataView(compressed.buffer).setUint32(0, data.length, true);
+  compressed.set(block.subarray(0, size), 4);
+  return compressed;
+}
+
+function make_rgb(width, height, bpp) {
+  //text-like content: mostly background, some repeated glyphs
+  const pixels = new Uint8Array(width * height * bpp);
+  pixels.fill(255);
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < width; x++) {
+      if ((x * 7 + y * 3) % 11 < 3) {
+        const offset = (y * width + x) * bpp;
+        pixels[offset] = pixels[offset + 1] = pixels[offset + 2] = (x ^ y) & 0x3f;
+      }
+    }
+  }
+  return pixels;
+}
+
+function make_trace(client) {
+  const frames = [];
+  const rencode = (packet) => vm.runInContext("rencode", client)(packet);
+
+  function add_packet(packet, level) {
+    let payload = rencode(packet);
+    if (level === 0x10) {
+      payload = lz4_compress(client, payload);
+    } else if (level === 0x40) {
+      payload = new Uint8Array(zlib.brotliCompressSync(payload));
+    }
+    frames.push(make_header(0x10, level, 0, payload.length), payload);
+  }
+
+  function add_chunk(index, data, level) {
+    const payload = level === 0x10 ? lz4_compress(client, data) : data;
+    frames.push(make_header(0x10, level, index, payload.length), payload);
+  }
+
+  const metadata = {};
+  for (let index = 0; index < 100; index++) {
+    metadata[`entry-${index}`] = {
+      "Name": `Application ${index}`,
+      "Exec": `/usr/bin/application-${index} --option=${index}`,
+      "Categories": ["Utility", "TextEditor", "Development"],
+      "IconData": new Uint8Array(256).fill(index),
+    };
+  }
+  add_packet(["setting-change", "xdg-menu", metadata], 0x40);
+
+  let sequence = 1;
+  const rgb24 = make_rgb(480, 32, 3);
+  const rgb32 = make_rgb(240, 48, 4);
+  const jpeg = new Uint8Array(12_000).map((v, i) => (i * 2_654_435_761) >>> 24);
+  for (let index = 0; index < 400; index++) {
+    const wid = 1 + (index % 4);
+    add_packet(["ping", Date.now(), 0], 0);
+    add_packet(["cursor", "png", 0, 0, 16, 16, 8, 8, 0, new Uint8Array(400)], 0x10);
+    //rgb24 pixel data in a compressed raw chunk:
+    add_chunk(7, rgb24, 0x10);
+    add_packet(["draw", wid, 0, index % 40, 480, 32, "rgb24", null, sequence++, 480 * 3, {}], 0);
+    //rgb32 pixel data in a raw chunk, with lz4 pixel compression:
+    add_chunk(7, lz4_compress(client, rgb32), 0);
+    add_packet(["draw", wid, 0, index % 40, 240, 48, "rgb32", null, sequence++, 240 * 4, {"lz4": 1}], 0);
+    add_chunk(7, jpeg, 0);
+    add_packet(["draw", wid, 0, 0, 320, 200, "jpeg", null, sequence++, 0, {"quality": 50}], 0);
+    add_packet(["window-metadata", wid, {"title": `window ${wid} title ${index}`}], 0);
+  }
+  //send it the way websockets would deliver it: in messages of varying sizes
+  const stream = concat(frames);
+  const records = [];
+  let pos = 0;
+  let time = 0;
+  let size = 1000;
+  while (pos < stream.length) {
+    records.push([time, stream.subarray(pos, pos + size)]);
+    pos += size;
+    time += 1;
+    size = size * 3 % 65_521 + 500;
+  }
+  return records;
+}
+
+function concat(arrays) {
+  let length = 0;
+  for (const array of arrays) {
+    length += array.length;
+  }
+  const result = new Uint8Array(length);
+  let pos = 0;
+  for (const array of arrays) {
+    result.set(array, pos);
+    pos += array.length;
+  }
+  return result;
+}
+
+function load_trace(client, filename) {
+  const data = new Uint8Array(fs.readFileSync(filename));
+  return vm.runInContext("parse_trace", client)(data);
+}
+
+
+/*
+ * Extracts the packet chunks from the trace, without using the client code,
+ * so the other benchmarks can use them as input.
+ */
+function split_chunks(client, records) {
+  const stream = concat(records.map((record) => record[1]));
+  const parse_packet_header = vm.runInContext("parse_packet_header", client);
+  //the client code checks the type of the arrays it is given,
+  //so they must be created in its context:
+  const ClientUint8Array = vm.runInContext("Uint8Array", client);
+  const chunks = [];
+  let pos = 0;
+  while (pos + 8 <= stream.length) {
+    const header = parse_packet_header(stream.subarray(pos, pos + 8));
+    if (!header) {
+      throw new Error(`invalid packet header at offset ${pos}`);
+    }
+    if (header.proto_flags & 0x2) {
+      throw new Error("encrypted traces are not supported");
+    }
+    pos += 8;
+    chunks.push({
+      level: header.level,
+      index: header.index,
+      data: new ClientUint8Array(stream.subarray(pos, pos + header.payload_size)),
+    });
+    pos += header.payload_size;
+  }
+  return chunks;
+}
+
+
+/*
+ * Measurements
+ */
+let gc_count = 0;
+let gc_time = 0;
+const gc_observer = new PerformanceObserver((list) => {
+  for (const entry of list.getEntries()) {
+    gc_count++;
+    gc_time += entry.duration;
+  }
+});
+gc_observer.observe({entryTypes: ["gc"]});
+
+function collect() {
+  if (global.gc) {
+    global.gc();
+  }
+}
+
+async function measure(name, iterations, run) {
+  //`run` returns the number of bytes and packets processed by one iteration
+  collect();
+  //let the observer catch up before we start counting:
+  await new Promise((resolve) => setTimeout(resolve, 0));
+  const gc_count_start = gc_count;
+  const gc_time_start = gc_time;
+  const heap_start = process.memoryUsage().heapUsed;
+  let bytes = 0;
+  let packets = 0;
+  const start = performance.now();
+  for (let iteration = 0; iteration < iterations; iteration++) {
+    const result = await run();
+    bytes += result.bytes;
+    packets += result.packets;
+  }
+  const elapsed = (performance.now() - start) / 1000;
+  const heap_end = process.memoryUsage().heapUsed;
+  await new Promise((resolve) => setTimeout(resolve, 0));
+  return {
+    name,
+    seconds: elapsed,
+    mbps: bytes / MB / elapsed,
+    pps: packets / elapsed,
+    gc_count: gc_count - gc_count_start,
+    gc_ms: gc_time - gc_time_start,
+    heap_mb: (heap_end - heap_start) / MB,
+  };
+}
+
+
+/*
+ * The benchmarks
+ */
+function bench_framing(client, records) {
+  //the websocket receive path: framing, decompression and packet decoding
+  const XpraProtocol = vm.runInContext("XpraProtocol", client);
+  const ClientUint8Array = vm.runInContext("Uint8Array", client);
+  let bytes = 0;
+  for (const record of records) {
+    bytes += record[1].length;
+  }
+  return () => {
+    const protocol = new XpraProtocol();
+    protocol.websocket = {};
+    let packets = 0;
+    protocol.set_packet_handler(() => packets++);
+    for (const record of records) {
+      //the websocket gives us a new buffer for each message:
+      protocol.rQ.push(new ClientUint8Array(record[1]));
+      protocol.process_receive_queue();
+    }
+    return {bytes, packets};
+  };
+}
+
+function bench_lz4(client, chunks) {
+  const lz4 = client.lz4;
+  const compressed = chunks.filter((chunk) => chunk.level & 0x10).map((chunk) => chunk.data);
+  return () => {
+    let bytes = 0;
+    for (const data of compressed) {
+      bytes += lz4.decode(data).length;
+    }
+    return {bytes, packets: compressed.length};
+  };
+}
+
+function bench_brotli(client, chunks) {
+  const BrotliDecode = client.BrotliDecode;
+  const compressed = chunks.filter((chunk) => chunk.level & 0x40).map((chunk) => chunk.data);
+  return () => {
+    let bytes = 0;
+    for (const data of compressed) {
+      bytes += BrotliDecode(data).length;
+    }
+    return {bytes, packets: compressed.length};
+  };
+}
+
+function decompress(client, chunk) {
+  if (chunk.level & 0x10) {
+    return client.lz4.decode(chunk.data);
+  }
+  if (chunk.level & 0x40) {
+    return new (vm.runInContext("Uint8Array", client))(client.BrotliDecode(chunk.data));
+  }
+  return chunk.data;
+}
+
+function rencoded_packets(client, chunks) {
+  return chunks.filter((chunk) => chunk.index === 0).map((chunk) => decompress(client, chunk));
+}
+
+function bench_rdecode(client, chunks) {
+  const rdecode = vm.runInContext("rdecode", client);
+  const encoded = rencoded_packets(client, chunks);
+  let bytes = 0;
+  for (const data of encoded) {
+    bytes += data.length;
+  }
+  return () => {
+    for (const data of encoded) {
+      rdecode(data);
+    }
+    return {bytes, packets: encoded.length};
+  };
+}
+
+function bench_rencode(client, chunks) {
+  const rdecode = vm.runInContext("rdecode", client);
+  const rencode_view = vm.runInContext("rencode_view", client);
+  const encoded = rencoded_packets(client, chunks);
+  const packets = encoded.map((data) => rdecode(data));
+  let bytes = 0;
+  for (const data of encoded) {
+    bytes += data.length;
+  }
+  return () => {
+    for (const packet of packets) {
+      rencode_view(packet);
+    }
+    return {bytes, packets: packets.length};
+  };
+}
+
+function draw_packets(client, chunks) {
+  //the draw packets, with their raw pixel data chunks put back in place
+  const rdecode = vm.runInContext("rdecode", client);
+  const packets = [];
+  let raw = {};
+  for (const chunk of chunks) {
+    const data = decompress(client, chunk);
+    if (chunk.index > 0) {
+      raw[chunk.index] = data;
+      continue;
+    }
+    const packet = rdecode(data);
+    for (const index in raw) {
+      packet[index] = raw[index];
+    }
+    raw = {};
+    if (packet[0] === "draw") {
+      packets.push(packet);
+    }
+  }
+  return packets;
+}
+
+function copy_packet(packet) {
+  //`decode_rgb` modifies the packet and its options
+  const copy = packet.slice();
+  copy[10] = Object.assign({}, packet[10] || {});
+  return copy;
+}
+
+function bench_rgb(client, chunks) {
+  const decode_rgb = vm.runInContext("decode_rgb", client);
+  const pool = vm.runInContext("rgb_buffer_pool", client);
+  const packets = draw_packets(client, chunks).filter((packet) => `${packet[6]}`.startsWith("rgb"));
+  return () => {
+    let bytes = 0;
+    for (const packet of packets) {
+      const pixels = decode_rgb(copy_packet(packet));
+      bytes += pixels.length;
+      //like the real callers, once the pixels have been uploaded:
+      pool.release(pixels);
+    }
+    return {bytes, packets: packets.length};
+  };
+}
+
+function bench_decode_worker(chunks_client, chunks) {
+  //the ordering logic of DecodeWorker.js: packets are sent back in sequence order for each window,
+  //the browser's image decoding is replaced with a stand-in that completes asynchronously
+  const packets = draw_packets(chunks_client, chunks);
+  const sent = [];
+  const worker = load_scripts([], {
+    self: {
+      postMessage: (message) => sent.push(message),
+    },
+    ImageData: class {
+      constructor(data, width, height) {
+        this.data = data;
+        this.width = width;
+        this.height = height;
+      }
+    },
+    createImageBitmap: (source) => new Promise((resolve) => setTimeout(() => resolve({
+      width: source.width || 0,
+      height: source.height || 0,
+      close() {},
+    }), 0)),
+  });
+  run_script(worker, "DecodeWorker.js");
+  const onmessage = worker.onmessage;
+  return async () => {
+    sent.length = 0;
+    let bytes = 0;
+    for (const packet of packets) {
+      const copy = copy_packet(packet);
+      bytes += copy[7] ? copy[7].length : 0;
+      onmessage({data: {cmd: "decode", packet: copy, start: performance.now()}});
+    }
+    while (sent.length < packets.length) {
+      await new Promise((resolve) => setTimeout(resolve, 0));
+    }
+    //verify the ordering for each window:
+    const last_sequence = new Map();
+    for (const message of sent) {
+      const packet = message.draw || message.packet;
+      const wid = packet[1];
+      if ((last_sequence.get(wid) || 0) > packet[8]) {
+        throw new Error(`draw packet ${packet[8]} for window ${wid} was sent back out of order`);
+      }
+      last_sequence.set(wid, packet[8]);
+    }
+    return {bytes, packets: packets.length};
+  };
+}
+
+const BENCHMARKS = {
+  "framing": bench_framing,
+  "lz4": bench_lz4,
+  "brotli": bench_brotli,
+  "rdecode": bench_rdecode,
+  "rencode": bench_rencode,
+  "rgb": bench_rgb,
+  "decode-worker": bench_decode_worker,
+};
+
+
+function parse_args(argv) {
+  const options = {
+    iterations: 20,
+    json: false,
+    only: null,
+    traces: [],
+  };
+  for (const arg of argv) {
+    if (arg.startsWith("--iterations=")) {
+      options.iterations = parseInt(arg.split("=")[1]);
+    } else if (arg === "--json") {
+      options.json = true;
+    } else if (arg.startsWith("--only=")) {
+      options.only = arg.split("=")[1].split(",");
+    } else if (arg.startsWith("--")) {
+      throw new Error(`unknown option ${arg}`);
+    } else {
+      options.traces.push(arg);
+    }
+  }
+  return options;
+}
+
+function format_row(values) {
+  const widths = [16, 10, 10, 12, 8, 10, 10];
+  return values.map((value, index) => `${value}`.padStart(widths[index])).join(" ");
+}
+
+async function main(argv) {
+  const options = parse_args(argv);
+  const client = load_client();
+  const traces = [];
+  if (options.traces.length === 0) {
+    traces.push(["synthetic", make_trace(client)]);
+  }
+  for (const filename of options.traces) {
+    traces.push([path.basename(filename), load_trace(client, filename)]);
+  }
+  if (!global.gc && !options.json) {
+    console.log("(run node with --expose-gc for more accurate heap figures)");
+  }
+  const results = [];
+  for (const [trace_name, records] of traces) {
+    const chunks = split_chunks(client, records);
+    if (!options.json) {
+      console.log(`\n${trace_name}: ${records.length} records, ${chunks.length} packet chunks`);
+      console.log(format_row(["benchmark", "seconds", "MB/s", "packets/s", "gcs", "gc ms", "heap MB"]));
+    }
+    for (const name in BENCHMARKS) {
+      if (options.only && !options.only.includes(name)) {
+        continue;
+      }
+      const run = BENCHMARKS[name](client, name === "framing" ? records : chunks);
+      //warm up:
+      await run();
+      const result = await measure(name, options.iterations, run);
+      result.trace = trace_name;
+      results.push(result);
+      if (!options.json) {
+        console.log(format_row([
+          name,
+          result.seconds.toFixed(3),
+          result.mbps.toFixed(1),
+          Math.round(result.pps),
+          result.gc_count,
+          result.gc_ms.toFixed(1),
+          result.heap_mb.toFixed(1),
+        ]));
+      }
+    }
+  }
+  if (options.json) {
+    console.log(JSON.stringify(results, null, 2));
+  }
+  gc_observer.disconnect();
+}
+
+main(process.argv.slice(2)).catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,1063 @@
+#!/usr/bin/env python3
+# This file is part of Xpra.
+# Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+# Xpra is released under the terms of the GNU GPL v2, or, at your option, any
+# later version. See the file LICENSE for details.
+
+"""
+A local stand-in for an xpra server, for load-testing the html5 client.
+
+It serves the `html5/` directory over http and accepts the client's websocket
+connection on the same port, then either replays a session trace recorded
+by the client (`trace` option) or generates synthetic draw streams.
+The client's `damage-sequence` replies are logged,
+so the frame rate and latency can be measured on a single machine.
+
+usage:
+  ./bench/replay.py [--trace=FILE] [--speed=N|max] [--stream=ENCODING:FPS ..] [--log=FILE]
+
+Only the standard library is required,
+the `lz4`, `brotli`, `cryptography` (AES) and `PIL` (jpeg) modules are used when available.
+"""
+
+import os
+import sys
+import csv
+import time
+import struct
+import base64
+import shutil
+import socket
+import asyncio
+import hashlib
+import argparse
+import mimetypes
+from subprocess import Popen, PIPE
+from urllib.parse import unquote, urlsplit
+
+HTML5_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "html5")
+
+# see `XpraTraceRecorder` in Protocol.js:
+TRACE_MAGIC = b"XPRATRC1"
+
+# packet header flags and compression levels, as parsed by `XpraProtocol`:
+FLAGS_RENCODEPLUS = 0x10
+FLAGS_CIPHER = 0x2
+LZ4_FLAG = 0x10
+BROTLI_FLAG = 0x40
+HEADER = struct.Struct(">cBBBI")
+# the raw chunk index used for the pixel data of draw packets:
+DRAW_DATA_INDEX = 7
+# smaller packets are not worth compressing:
+MIN_COMPRESS_SIZE = 512
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_CONTINUATION = 0x0
+WS_BINARY = 0x2
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+AES_BLOCK_SIZE = 16
+KEY_STRETCH_ITERATIONS = 1000
+
+REPORT_INTERVAL = 1.0
+
+SYNTHETIC_ENCODINGS = ("rgb", "jpeg", "scroll", "h264")
+
+
+def get_lz4_module():
+    try:
+        import lz4.block  # @UnresolvedImport
+        return lz4
+    except ImportError:
+        return None
+
+
+def get_brotli_module():
+    try:
+        import brotli  # @UnresolvedImport
+        return brotli
+    except ImportError:
+        return None
+
+
+def get_cipher_module():
+    try:
+        from cryptography.hazmat.primitives import ciphers  # @UnresolvedImport
+        return ciphers
+    except ImportError:
+        return None
+
+
+def get_pil_module():
+    try:
+        from PIL import Image, ImageDraw  # @UnresolvedImport
+        return Image, ImageDraw
+    except ImportError:
+        return None
+
+
+# rencodeplus, the packet encoder used by the client, see `lib/rencode.js`
+CHR_LIST = 59
+CHR_DICT = 60
+CHR_INT = 61
+CHR_INT1 = 62
+CHR_INT2 = 63
+CHR_INT4 = 64
+CHR_INT8 = 65
+CHR_FLOAT32 = 66
+CHR_FLOAT64 = 44
+CHR_TRUE = 67
+CHR_FALSE = 68
+CHR_NONE = 69
+CHR_TERM = 127
+INT_POS_FIXED_COUNT = 44
+INT_NEG_FIXED_START = 70
+INT_NEG_FIXED_COUNT = 32
+DICT_FIXED_START = 102
+DICT_FIXED_COUNT = 25
+STR_FIXED_START = 128
+STR_FIXED_COUNT = 64
+LIST_FIXED_START = STR_FIXED_START + STR_FIXED_COUNT
+LIST_FIXED_COUNT = 64
+
+
+def rencode(obj) -> bytes:
+    out = []
+    _rencode(obj, out)
+    return b"".join(out)
+
+
+def _rencode(obj, out: list) -> None:
+    if obj is None:
+        out.append(bytes((CHR_NONE, )))
+    elif obj is True:
+        out.append(bytes((CHR_TRUE, )))
+    elif obj is False:
+        out.append(bytes((CHR_FALSE, )))
+    elif isinstance(obj, int):
+        if 0 <= obj < INT_POS_FIXED_COUNT:
+            out.append(bytes((obj, )))
+        elif -INT_NEG_FIXED_COUNT <= obj < 0:
+            out.append(bytes((INT_NEG_FIXED_START - 1 - obj, )))
+        elif -128 <= obj < 128:
+            out.append(struct.pack(">Bb", CHR_INT1, obj))
+        elif -32768 <= obj < 32768:
+            out.append(struct.pack(">Bh", CHR_INT2, obj))
+        elif -2**31 <= obj < 2**31:
+            out.append(struct.pack(">Bi", CHR_INT4, obj))
+        elif -2**63 <= obj < 2**63:
+            out.append(struct.pack(">Bq", CHR_INT8, obj))
+        else:
+            out.append(bytes((CHR_INT, )) + str(obj).encode() + bytes((CHR_TERM, )))
+    elif isinstance(obj, str):
+        data = obj.encode("utf8")
+        if len(data) < STR_FIXED_COUNT:
+            out.append(bytes((STR_FIXED_START + len(data), )))
+        else:
+            out.append(b"%i:" % len(data))
+        out.append(data)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        out.append(b"%i/" % len(obj))
+        out.append(bytes(obj))
+    elif isinstance(obj, (list, tuple)):
+        if len(obj) < LIST_FIXED_COUNT:
+            out.append(bytes((LIST_FIXED_START + len(obj), )))
+            for item in obj:
+                _rencode(item, out)
+        else:
+            out.append(bytes((CHR_LIST, )))
+            for item in obj:
+                _rencode(item, out)
+            out.append(bytes((CHR_TERM, )))
+    elif isinstance(obj, dict):
+        if len(obj) < DICT_FIXED_COUNT:
+            out.append(bytes((DICT_FIXED_START + len(obj), )))
+        else:
+            out.append(bytes((CHR_DICT, )))
+        for key, value in obj.items():
+            _rencode(key, out)
+            _rencode(value, out)
+        if len(obj) >= DICT_FIXED_COUNT:
+            out.append(bytes((CHR_TERM, )))
+    else:
+        # the client cannot decode floats:
+        raise TypeError(f"cannot encode {type(obj)}")
+
+
+def rdecode(data: bytes):
+    obj, pos = _rdecode(data, 0)
+    if pos != len(data):
+        raise ValueError(f"{len(data) - pos} bytes of trailing data")
+    return obj
+
+
+def _rdecode(data: bytes, pos: int) -> tuple:
+    typecode = data[pos]
+    if typecode >= LIST_FIXED_START:
+        items = []
+        pos += 1
+        for _ in range(typecode - LIST_FIXED_START):
+            item, pos = _rdecode(data, pos)
+            items.append(item)
+        return items, pos
+    if typecode >= STR_FIXED_START:
+        end = pos + 1 + typecode - STR_FIXED_START
+        return data[pos + 1:end].decode("utf8"), end
+    if typecode < INT_POS_FIXED_COUNT:
+        return typecode, pos + 1
+    if INT_NEG_FIXED_START <= typecode < INT_NEG_FIXED_START + INT_NEG_FIXED_COUNT:
+        return INT_NEG_FIXED_START - 1 - typecode, pos + 1
+    if DICT_FIXED_START <= typecode < DICT_FIXED_START + DICT_FIXED_COUNT:
+        d = {}
+        pos += 1
+        for _ in range(typecode - DICT_FIXED_START):
+            key, pos = _rdecode(data, pos)
+            d[key], pos = _rdecode(data, pos)
+        return d, pos
+    if ord("0") <= typecode <= ord("9"):
+        # the length prefix of a string, followed by ':' for utf8 or '/' for binary:
+        end = pos
+        while data[end] not in b":/":
+            end += 1
+        length = int(data[pos:end])
+        value = data[end + 1:end + 1 + length]
+        if data[end] == ord(":"):
+            value = value.decode("utf8")
+        return value, end + 1 + length
+    if typecode in (CHR_LIST, CHR_DICT):
+        items = []
+        pos += 1
+        while data[pos] != CHR_TERM:
+            item, pos = _rdecode(data, pos)
+            items.append(item)
+        if typecode == CHR_LIST:
+            return items, pos + 1
+        return dict(zip(items[::2], items[1::2])), pos + 1
+    if typecode == CHR_INT:
+        end = data.index(bytes((CHR_TERM, )), pos)
+        return int(data[pos + 1:end]), end + 1
+    fixed = {
+        CHR_INT1: ">b",
+        CHR_INT2: ">h",
+        CHR_INT4: ">i",
+        CHR_INT8: ">q",
+        CHR_FLOAT32: ">f",
+        CHR_FLOAT64: ">d",
+    }.get(typecode)
+    if fixed:
+        size = struct.calcsize(fixed)
+        return struct.unpack_from(fixed, data, pos + 1)[0], pos + 1 + size
+    constants = {CHR_TRUE: True, CHR_FALSE: False, CHR_NONE: None}
+    if typecode in constants:
+        return constants[typecode], pos + 1
+    raise ValueError(f"invalid typecode {typecode} at position {pos}")
+
+
+# compression, using the format expected by `lz4.decode` in `lib/lz4.js`:
+# the uncompressed size as a little endian 32-bit integer, followed by an lz4 block
+
+def lz4_compress(data: bytes) -> bytes:
+    lz4 = get_lz4_module()
+    if lz4:
+        return lz4.block.compress(data, store_size=True)
+    # without the module, emit a valid block made of a single literal run:
+    size = len(data)
+    out = bytearray(struct.pack("<I", size))
+    if size < 15:
+        out.append(size << 4)
+    else:
+        out.append(0xF0)
+        remaining = size - 15
+        out += b"\xff" * (remaining // 255)
+        out.append(remaining % 255)
+    out += data
+    return bytes(out)
+
+
+def lz4_decompress(data: bytes) -> bytes:
+    size = struct.unpack_from("<I", data)[0]
+    lz4 = get_lz4_module()
+    if lz4:
+        return lz4.block.decompress(data[4:], uncompressed_size=size)
+    out = bytearray()
+    pos = 4
+    while pos < len(data):
+        token = data[pos]
+        pos += 1
+        literals = token >> 4
+        if literals == 15:
+            while True:
+                extra = data[pos]
+                pos += 1
+                literals += extra
+                if extra != 255:
+                    break
+        out += data[pos:pos + literals]
+        pos += literals
+        if pos >= len(data):
+            break
+        offset = data[pos] | (data[pos + 1] << 8)
+        pos += 2
+        length = token & 0xF
+        if length == 15:
+            while True:
+                extra = data[pos]
+                pos += 1
+                length += extra
+                if extra != 255:
+                    break
+        length += 4
+        start = len(out) - offset
+        for index in range(length):
+            out.append(out[start + index])
+    return bytes(out)
+
+
+def compress(data: bytes, compressor: str) -> tuple:
+    """
+    returns the compression level flag and the data
+    """
+    if compressor == "lz4" and len(data) >= MIN_COMPRESS_SIZE:
+        return LZ4_FLAG | 1, lz4_compress(data)
+    if compressor == "brotli" and len(data) >= MIN_COMPRESS_SIZE:
+        brotli = get_brotli_module()
+        return BROTLI_FLAG | 1, brotli.compress(data, quality=1)
+    return 0, data
+
+
+def decompress(level: int, data: bytes) -> bytes:
+    if level & LZ4_FLAG:
+        return lz4_decompress(data)
+    if level & BROTLI_FLAG:
+        brotli = get_brotli_module()
+        if not brotli:
+            raise ValueError("the brotli module is required for decompressing this packet")
+        return brotli.decompress(data)
+    return data
+
+
+class AESCipher:
+    """
+    AES-CBC with PKCS#7 padding and a random IV prefixed to each packet,
+    see `setup_cipher` in Protocol.js
+    """
+
+    def __init__(self, caps: dict, key: str):
+        ciphers = get_cipher_module()
+        if not ciphers:
+            raise ValueError("the cryptography module is required for AES encryption")
+        mode = caps.get("mode", "CBC")
+        if caps.get("cipher", "AES") != "AES" or mode != "CBC":
+            raise ValueError(f"unsupported cipher {caps.get('cipher')}-{mode}")
+        key_hash = caps.get("key_hash", "SHA1").lower().replace("-", "")
+        salt = caps["key_salt"]
+        if isinstance(salt, str):
+            salt = salt.encode("latin1")
+        iterations = caps.get("key_stretch_iterations", KEY_STRETCH_ITERATIONS)
+        key_size = caps.get("key_size", 32)
+        self.secret = hashlib.pbkdf2_hmac(key_hash, key.encode("utf8"), salt, iterations, key_size)
+        self.ciphers = ciphers
+
+    def encrypt(self, data: bytes) -> bytes:
+        iv = os.urandom(AES_BLOCK_SIZE)
+        cipher = self.ciphers.Cipher(self.ciphers.algorithms.AES(self.secret), self.ciphers.modes.CBC(iv))
+        padding = AES_BLOCK_SIZE - len(data) % AES_BLOCK_SIZE
+        encryptor = cipher.encryptor()
+        return iv + encryptor.update(data + bytes((padding, )) * padding) + encryptor.finalize()
+
+    def decrypt(self, data: bytes) -> bytes:
+        iv = data[:AES_BLOCK_SIZE]
+        cipher = self.ciphers.Cipher(self.ciphers.algorithms.AES(self.secret), self.ciphers.modes.CBC(iv))
+        decryptor = cipher.decryptor()
+        plain = decryptor.update(data[AES_BLOCK_SIZE:]) + decryptor.finalize()
+        return plain[:-plain[-1]]
+
+
+def make_cipher_caps() -> dict:
+    # the capabilities the client uses for encrypting the packets it sends us:
+    return {
+        "cipher": "AES",
+        "mode": "CBC",
+        "iv": base64.b64encode(os.urandom(12)).decode(),
+        "key_salt": os.urandom(64),
+        "key_size": 32,
+        "key_hash": "SHA1",
+        "key_stretch_iterations": KEY_STRETCH_ITERATIONS,
+        "padding.options": ["PKCS#7"],
+        "always-pad": True,
+        "stream": False,
+    }
+
+
+def parse_trace(filename: str) -> list:
+    """
+    returns the `(time, data)` records of a trace, the time is in milliseconds
+    """
+    with open(filename, "rb") as f:
+        trace = f.read()
+    if not trace.startswith(TRACE_MAGIC):
+        raise ValueError(f"{filename!r} is not an xpra session trace")
+    records = []
+    pos = len(TRACE_MAGIC)
+    while pos + 12 <= len(trace):
+        rtime, length = struct.unpack_from(">dI", trace, pos)
+        pos += 12
+        if pos + length > len(trace):
+            raise ValueError(f"truncated trace record at offset {pos}")
+        records.append((rtime, trace[pos:pos + length]))
+        pos += length
+    return records
+
+
+def split_chunks(records: list) -> list:
+    """
+    re-assembles the packet chunks from the trace records,
+    returns `(time, proto_flags, level, index, payload)` for each chunk,
+    using the time of the record that completed it
+    """
+    chunks = []
+    buf = bytearray()
+    for rtime, data in records:
+        buf += data
+        while len(buf) >= HEADER.size:
+            magic, proto_flags, level, index, size = HEADER.unpack_from(buf)
+            if magic != b"P":
+                raise ValueError("invalid packet header in trace")
+            if proto_flags & FLAGS_CIPHER:
+                raise ValueError("traces of encrypted connections cannot be replayed")
+            if len(buf) < HEADER.size + size:
+                break
+            chunks.append((rtime, proto_flags, level, index, bytes(buf[HEADER.size:HEADER.size + size])))
+            del buf[:HEADER.size + size]
+    return chunks
+
+
+def peek_packet(level: int, payload: bytes):
+    # decodes a packet from a trace, returns None if we can't:
+    try:
+        return rdecode(decompress(level, payload))
+    except ValueError:
+        return None
+
+
+class DamageStats:
+    """
+    Matches the client's `damage-sequence` replies with the draw packets we sent,
+    reports the frame rate, decode time and latency for each window.
+    """
+
+    def __init__(self, log_file=None):
+        self.sent = {}
+        self.pending = {}
+        self.interval = {}
+        self.totals = {}
+        self.dropped = {}
+        self.log_file = log_file
+        self.writer = None
+        if log_file:
+            self.writer = csv.writer(log_file)
+            self.writer.writerow(("time", "wid", "sequence", "coding", "width", "height",
+                                  "decode_time_us", "latency_ms", "message"))
+
+    def record_send(self, sequence: int, wid: int, coding: str) -> None:
+        self.sent[sequence] = (time.monotonic(), wid, coding)
+        self.pending[wid] = self.pending.get(wid, 0) + 1
+
+    def record_drop(self, wid: int) -> None:
+        self.dropped[wid] = self.dropped.get(wid, 0) + 1
+
+    def get_pending(self, wid: int) -> int:
+        return self.pending.get(wid, 0)
+
+    def record_ack(self, sequence: int, wid: int, width: int, height: int, decode_time: int, message: str) -> None:
+        now = time.monotonic()
+        sent = self.sent.pop(sequence, None)
+        latency = -1.0
+        coding = ""
+        if sent:
+            latency = (now - sent[0]) * 1000
+            coding = sent[2]
+            self.pending[wid] = max(0, self.pending.get(wid, 0) - 1)
+        if self.writer:
+            self.writer.writerow((f"{now:.6f}", wid, sequence, coding, width, height,
+                                  decode_time, f"{latency:.3f}", message))
+        for stats in (self.interval, self.totals):
+            stats.setdefault(wid, []).append((decode_time, latency))
+
+    def report(self, elapsed: float) -> None:
+        for wid, acks in sorted(self.interval.items()):
+            print(f"window {wid:3}: {self.format_stats(acks, elapsed)}, {self.get_pending(wid)} pending")
+        self.interval = {}
+
+    def summary(self, elapsed: float) -> None:
+        print(f"summary after {elapsed:.1f} seconds:")
+        for wid, acks in sorted(self.totals.items()):
+            print(f"window {wid:3}: {self.format_stats(acks, elapsed)}, {self.dropped.get(wid, 0)} dropped")
+        if self.log_file:
+            self.log_file.flush()
+
+    @staticmethod
+    def format_stats(acks: list, elapsed: float) -> str:
+        errors = sum(1 for decode_time, _ in acks if decode_time < 0)
+        decode_times = sorted(decode_time / 1000 for decode_time, _ in acks if decode_time >= 0)
+        latencies = sorted(latency for _, latency in acks if latency >= 0)
+
+        def fmt(values: list) -> str:
+            if not values:
+                return "-"
+            average = sum(values) / len(values)
+            return f"{average:.1f}ms avg, {values[int(len(values) * 0.95)]:.1f}ms p95"
+        return (f"{len(acks) / max(0.001, elapsed):6.1f} fps, decode {fmt(decode_times)}, "
+                f"latency {fmt(latencies)}, {errors} errors")
+
+
+class WebSocketConnection:
+    """
+    The server side of a websocket connection, binary messages only.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    async def read_message(self):
+        # returns the payload of the next binary message, or None when the connection is closed
+        message = bytearray()
+        while True:
+            header = await self.reader.readexactly(2)
+            fin = header[0] & 0x80
+            opcode = header[0] & 0xF
+            length = header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack(">H", await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", await self.reader.readexactly(8))[0]
+            if len(message) + length > MAX_MESSAGE_SIZE:
+                raise ValueError(f"websocket message too large: {length} bytes")
+            mask = await self.reader.readexactly(4) if header[1] & 0x80 else b""
+            payload = await self.reader.readexactly(length)
+            if mask and length:
+                repeated = (mask * (length // 4 + 1))[:length]
+                payload = (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+            if opcode == WS_CLOSE:
+                await self.close()
+                return None
+            if opcode == WS_PING:
+                self.send_frame(WS_PONG, payload)
+                continue
+            if opcode == WS_PONG:
+                continue
+            if opcode not in (WS_BINARY, WS_CONTINUATION):
+                raise ValueError(f"unexpected websocket opcode {opcode}")
+            message += payload
+            if fin:
+                return bytes(message)
+
+    def send_frame(self, opcode: int, payload: bytes) -> None:
+        if self.closed:
+            return
+        length = len(payload)
+        if length < 126:
+            header = struct.pack(">BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+        self.writer.write(header + payload)
+
+    async def send(self, payload: bytes) -> None:
+        self.send_frame(WS_BINARY, payload)
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.send_frame(WS_CLOSE, b"")
+        self.closed = True
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        self.writer.close()
+
+
+class ReplaySession:
+    """
+    Handles one client connection: the hello handshake, pings,
+    and the draw streams we send it.
+    """
+
+    def __init__(self, ws: WebSocketConnection, options):
+        self.ws = ws
+        self.options = options
+        self.stats = options.stats
+        self.cipher_out = None
+        self.cipher_in = None
+        self.sequence = 0
+        # keep the synthetic windows clear of the ones in the trace:
+        self.next_wid = 1000 if options.trace else 1
+        self.tasks = []
+        self.client_encodings = []
+        self.buffer = bytearray()
+
+    async def run(self) -> None:
+        try:
+            while True:
+                message = await self.ws.read_message()
+                if message is None:
+                    break
+                self.buffer += message
+                for packet in self.parse_packets():
+                    await self.process_packet(packet)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await self.ws.close()
+
+    def parse_packets(self) -> list:
+        packets = []
+        while len(self.buffer) >= HEADER.size:
+            _magic, proto_flags, level, _index, size = HEADER.unpack_from(self.buffer)
+            total = size
+            if proto_flags & FLAGS_CIPHER:
+                total += AES_BLOCK_SIZE - size % AES_BLOCK_SIZE
+            if len(self.buffer) < HEADER.size + total:
+                break
+            payload = bytes(self.buffer[HEADER.size:HEADER.size + total])
+            del self.buffer[:HEADER.size + total]
+            if proto_flags & FLAGS_CIPHER:
+                if not self.cipher_in:
+                    raise ValueError("received an encrypted packet, but encryption is not configured")
+                payload = self.cipher_in.decrypt(payload)
+            packets.append(rdecode(decompress(level, payload)))
+        return packets
+
+    async def send_chunk(self, payload: bytes, level=0, index=0, proto_flags=FLAGS_RENCODEPLUS) -> None:
+        size = len(payload)
+        if self.cipher_out:
+            payload = self.cipher_out.encrypt(payload)
+            # the header does not include the padding:
+            size = AES_BLOCK_SIZE + size
+            proto_flags |= FLAGS_CIPHER
+        await self.ws.send(HEADER.pack(b"P", proto_flags, level, index, size) + payload)
+
+    async def send(self, packet: list) -> None:
+        # large binary pixel data is sent in its own chunk, without compression:
+        if packet[0] == "draw" and isinstance(packet[DRAW_DATA_INDEX], bytes) and len(packet[DRAW_DATA_INDEX]) > 4096:
+            await self.send_chunk(packet[DRAW_DATA_INDEX], index=DRAW_DATA_INDEX)
+            packet = list(packet)
+            packet[DRAW_DATA_INDEX] = b""
+        level, payload = compress(rencode(packet), self.options.compress)
+        await self.send_chunk(payload, level)
+
+    async def send_draw(self, wid: int, x: int, y: int, w: int, h: int, coding: str, data, rowstride: int,
+                        options: dict) -> None:
+        self.sequence += 1
+        self.stats.record_send(self.sequence, wid, coding)
+        await self.send(["draw", wid, x, y, w, h, coding, data, self.sequence, rowstride, options])
+
+    async def process_packet(self, packet: list) -> None:
+        packet_type = packet[0]
+        if packet_type == "hello":
+            await self.process_hello(packet[1])
+        elif packet_type == "ping":
+            await self.send(["ping_echo", packet[1], 0, 0, 0, 0])
+        elif packet_type == "damage-sequence":
+            sequence, wid, width, height, decode_time = packet[1:6]
+            message = packet[6] if len(packet) > 6 else ""
+            self.stats.record_ack(sequence, wid, width, height, decode_time, message)
+        elif packet_type == "disconnect":
+            print(f"client disconnected: {packet[1:]}")
+            await self.ws.close()
+        elif self.options.verbose:
+            print(f"ignoring {packet_type!r} packet")
+
+    async def process_hello(self, caps: dict) -> None:
+        encodings = caps.get("encodings", {})
+        if isinstance(encodings, dict):
+            encodings = encodings.get("core", [])
+        self.client_encodings = list(encodings)
+        print(f"client connected: {caps.get('platform', '')} {caps.get('user-agent', '')}")
+        hello = {
+            "version": "6.0",
+            "rencodeplus": True,
+            # we can always decompress the packets the client sends:
+            "lz4": True,
+            "session_name": "xpra replay",
+            "platform": sys.platform,
+            "display": ":replay",
+            "encodings": self.client_encodings,
+            "desktop_size": [caps.get("desktop_size", [1920, 1080])[0], caps.get("desktop_size", [1920, 1080])[1]],
+        }
+        key = self.options.encryption_key
+        client_cipher = caps.get("encryption")
+        if client_cipher and not key:
+            print("the client requested encryption, use '--encryption-key'")
+            await self.ws.close()
+            return
+        if key:
+            if not client_cipher:
+                print("the client did not request encryption")
+                await self.ws.close()
+                return
+            cipher_caps = make_cipher_caps()
+            hello["encryption"] = cipher_caps
+            self.cipher_in = AESCipher(cipher_caps, key)
+            self.cipher_out = AESCipher(client_cipher, key)
+        await self.send(["hello", hello])
+        if self.options.trace:
+            self.start_task(self.replay(self.options.trace))
+        for encoding, fps in self.options.stream:
+            if encoding == "rgb":
+                encoding = "rgb24"
+            if encoding not in self.client_encodings:
+                print(f"the client does not support {encoding!r}, skipping this stream")
+                continue
+            self.start_task(self.stream(encoding, fps))
+
+    def start_task(self, coroutine) -> None:
+        task = asyncio.ensure_future(coroutine)
+
+        def task_done(task) -> None:
+            if not task.cancelled() and task.exception():
+                print(f"error: {task.exception()}")
+        task.add_done_callback(task_done)
+        self.tasks.append(task)
+
+    async def replay(self, chunks: list) -> None:
+        speed = self.options.speed
+        start = time.monotonic()
+        first = chunks[0][0] if chunks else 0
+        for rtime, proto_flags, level, index, payload in chunks:
+            if speed > 0:
+                delay = start + (rtime - first) / 1000 / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if index == 0:
+                packet = peek_packet(level, payload)
+                if packet and packet[0] == "draw":
+                    self.stats.record_send(packet[8], packet[1], str(packet[6]))
+            await self.send_chunk(payload, level, index, proto_flags)
+        print(f"replay completed in {time.monotonic() - start:.1f} seconds")
+
+    async def stream(self, encoding: str, fps: int) -> None:
+        width, height = self.options.size
+        wid = self.next_wid
+        self.next_wid += 1
+        frames = make_frames(encoding, width, height, fps, self.options)
+        metadata = {
+            "title": f"{encoding} {fps}fps",
+            "window-type": ["NORMAL"],
+        }
+        await self.send(["new-window", wid, 0, 0, width, height, metadata, {}])
+        if encoding == "scroll":
+            # the initial contents we scroll:
+            data, rowstride, options = make_rgb_frame(width, height, 0)
+            await self.send_draw(wid, 0, 0, width, height, "rgb24", data, rowstride, options)
+        interval = 1 / fps
+        next_time = time.monotonic()
+        frame_no = 0
+        while True:
+            next_time += interval
+            if self.stats.get_pending(wid) >= self.options.max_pending:
+                # the client is not keeping up:
+                self.stats.record_drop(wid)
+            else:
+                for packet in frames[frame_no % len(frames)]:
+                    x, y, w, h, coding, data, rowstride, options = packet
+                    options = dict(options)
+                    if coding == "h264":
+                        options["frame"] = frame_no
+                    await self.send_draw(wid, x, y, w, h, coding, data, rowstride, options)
+                frame_no += 1
+            await asyncio.sleep(max(0.0, next_time - time.monotonic()))
+
+
+def make_rgb_frame(width: int, height: int, offset: int) -> tuple:
+    # vertical stripes, moving with the offset:
+    row = bytearray(width * 3)
+    for x in range(width):
+        value = ((x + offset) * 4) & 0xFF
+        row[x * 3:x * 3 + 3] = bytes((value, 255 - value, (value * 3) & 0xFF))
+    data = bytes(row) * height
+    if get_lz4_module():
+        return lz4_compress(data), width * 3, {"lz4": 1}
+    return data, width * 3, {}
+
+
+def make_jpeg_frame(width: int, height: int, offset: int, quality: int) -> bytes:
+    import io
+    pil = get_pil_module()
+    if not pil:
+        raise ValueError("the PIL module is required for generating jpeg frames")
+    image_class, draw_class = pil
+    image = image_class.new("RGB", (width, height), (240, 240, 240))
+    draw = draw_class.Draw(image)
+    size = min(width, height) // 4
+    x = (offset * 8) % max(1, width - size)
+    y = (offset * 5) % max(1, height - size)
+    draw.rectangle((x, y, x + size, y + size), fill=(offset * 8 % 256, 64, 192))
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def read_h264_frames(options, width: int, height: int, fps: int) -> list:
+    """
+    returns the access units of an annex-b h264 stream,
+    either from the file specified or generated using ffmpeg
+    """
+    if options.h264:
+        with open(options.h264, "rb") as f:
+            stream = f.read()
+    else:
+        cmd = [
+            "ffmpeg", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc=size={width}x{height}:rate={fps}",
+            "-t", "10", "-pix_fmt", "yuv420p",
+            "-c:v", "libx264", "-profile:v", "high", "-bf", "0", "-g", str(fps * 5),
+            "-f", "h264", "-",
+        ]
+        try:
+            proc = Popen(cmd, stdout=PIPE, stderr=PIPE)
+        except OSError as e:
+            raise ValueError(f"failed to run ffmpeg: {e}") from None
+        stream, err = proc.communicate()
+        if proc.returncode != 0:
+            raise ValueError(f"ffmpeg failed: {err.decode(errors='replace').strip()}")
+    # split on the start codes, each access unit ends with a slice:
+    nals = [nal for nal in stream.split(b"\x00\x00\x01") if nal]
+    frames = []
+    unit = []
+    keyframe = False
+    for nal in nals:
+        nal = nal.rstrip(b"\x00")
+        nal_type = nal[0] & 0x1F
+        unit.append(b"\x00\x00\x00\x01" + nal)
+        if nal_type == 5:
+            keyframe = True
+        if nal_type in (1, 5):
+            frames.append((b"".join(unit), keyframe))
+            unit = []
+            keyframe = False
+    if not frames or not frames[0][1]:
+        raise ValueError("the h264 stream must start with a key frame")
+    return frames
+
+
+def make_frames(encoding: str, width: int, height: int, fps: int, options) -> list:
+    """
+    pre-computes the draw packets of a synthetic stream,
+    as a list of frames, each frame is a list of `(x, y, w, h, coding, data, rowstride, options)`
+    """
+    count = 30
+    if encoding == "rgb24":
+        frames = []
+        for offset in range(count):
+            data, rowstride, draw_options = make_rgb_frame(width, height, offset)
+            frames.append([(0, 0, width, height, "rgb24", data, rowstride, draw_options)])
+        return frames
+    if encoding == "jpeg":
+        return [
+            [(0, 0, width, height, "jpeg", make_jpeg_frame(width, height, offset, options.quality), 0,
+              {"quality": options.quality})]
+            for offset in range(count)
+        ]
+    if encoding == "scroll":
+        # scroll up and paint the new strip at the bottom:
+        step = max(1, height // 20)
+        frames = []
+        for offset in range(count):
+            data, rowstride, draw_options = make_rgb_frame(width, step, offset)
+            scroll = [[0, step, width, height - step, 0, -step]]
+            frames.append([
+                (0, 0, width, height, "scroll", b"", 0, {"scroll": scroll, "flush": 1}),
+                (0, height - step, width, step, "rgb24", data, rowstride, draw_options),
+            ])
+        return frames
+    if encoding == "h264":
+        return [
+            [(0, 0, width, height, "h264", data, 0, {"type": "IDR" if keyframe else "P"})]
+            for data, keyframe in read_h264_frames(options, width, height, fps)
+        ]
+    raise ValueError(f"unsupported synthetic encoding {encoding!r}")
+
+
+async def serve_file(writer, path: str) -> None:
+    path = unquote(urlsplit(path).path)
+    if path.endswith("/"):
+        path += "index.html"
+    filename = os.path.realpath(os.path.join(HTML5_DIR, path.lstrip("/")))
+    if not filename.startswith(os.path.realpath(HTML5_DIR) + os.sep) or not os.path.isfile(filename):
+        body = b"not found"
+        writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: %i\r\nConnection: close\r\n\r\n%s" % (len(body), body))
+    else:
+        with open(filename, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        headers = (
+            "HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(headers.encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+async def handle_connection(reader, writer, options) -> None:
+    try:
+        request = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        writer.close()
+        return
+    lines = request.decode("latin1").split("\r\n")
+    parts = lines[0].split(" ")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    if len(parts) < 2 or parts[0] != "GET":
+        writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nConnection: close\r\n\r\n")
+        writer.close()
+        return
+    if headers.get("upgrade", "").lower() != "websocket":
+        await serve_file(writer, parts[1])
+        return
+    key = headers.get("sec-websocket-key", "")
+    accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+    response = (
+        "HTTP/1.1 101 Switching Protocols\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n"
+    )
+    protocols = [p.strip() for p in headers.get("sec-websocket-protocol", "").split(",")]
+    if "binary" in protocols:
+        response += "Sec-WebSocket-Protocol: binary\r\n"
+    writer.write((response + "\r\n").encode())
+    await writer.drain()
+    sock = writer.get_extra_info("socket")
+    if sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    await ReplaySession(WebSocketConnection(reader, writer), options).run()
+
+
+async def report_loop(options) -> None:
+    start = last = time.monotonic()
+    try:
+        while not options.duration or time.monotonic() - start < options.duration:
+            await asyncio.sleep(REPORT_INTERVAL)
+            now = time.monotonic()
+            options.stats.report(now - last)
+            last = now
+    finally:
+        options.stats.summary(time.monotonic() - start)
+
+
+def parse_stream(value: str) -> tuple:
+    encoding, _, fps = value.partition(":")
+    if encoding not in SYNTHETIC_ENCODINGS:
+        raise argparse.ArgumentTypeError(f"invalid encoding {encoding!r}, use one of {SYNTHETIC_ENCODINGS}")
+    try:
+        fps = int(fps or 30)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid frame rate {fps!r}") from None
+    return encoding, max(1, fps)
+
+
+def parse_speed(value: str) -> float:
+    if value == "max":
+        return 0
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("the speed must be positive, or 'max'")
+    return speed
+
+
+def parse_size(value: str) -> tuple:
+    try:
+        width, height = (int(x) for x in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size {value!r}") from None
+    return width, height
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(prog="replay", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bind", default="127.0.0.1", help="the address to listen on")
+    parser.add_argument("--port", type=int, default=10000, help="the port to listen on")
+    parser.add_argument("--trace", help="a session trace recorded by the client, see the `trace` option")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="the trace replay speed: N or 'max'")
+    parser.add_argument("--stream", type=parse_stream, action="append", default=[],
+                        help="a synthetic draw stream: ENCODING[:FPS], one of: " + ", ".join(SYNTHETIC_ENCODINGS))
+    parser.add_argument("--size", type=parse_size, default=(1280, 720), help="the synthetic window size: WxH")
+    parser.add_argument("--quality", type=int, default=50, help="the jpeg quality")
+    parser.add_argument("--h264", help="an annex-b h264 file for the h264 stream, generated with ffmpeg otherwise")
+    parser.add_argument("--max-pending", type=int, default=4,
+                        help="skip frames when this many are waiting for the client's reply")
+    parser.add_argument("--compress", choices=("none", "lz4", "brotli"), default="lz4",
+                        help="the compressor used for packets")
+    parser.add_argument("--encryption-key", help="use AES encryption, the client must be given the same key")
+    parser.add_argument("--log", help="write each damage-sequence reply to this CSV file")
+    parser.add_argument("--duration", type=float, default=0, help="exit after this many seconds")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    options = parser.parse_args(args)
+    if not options.trace and not options.stream:
+        parser.error("specify a '--trace' to replay or at least one synthetic '--stream'")
+    if options.compress == "brotli" and not get_brotli_module():
+        parser.error("the brotli module is required for '--compress=brotli'")
+    if options.encryption_key and not get_cipher_module():
+        parser.error("the cryptography module is required for AES encryption")
+    encodings = [encoding for encoding, _ in options.stream]
+    if "jpeg" in encodings and not get_pil_module():
+        parser.error("the PIL module is required for jpeg streams")
+    if "h264" in encodings and not options.h264 and not shutil.which("ffmpeg"):
+        parser.error("h264 streams require '--h264=FILE' or the ffmpeg command")
+    return options
+
+
+async def run_server(options) -> None:
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, options),
+        options.bind, options.port,
+    )
+    print(f"connect to http://{options.bind}:{options.port}/")
+    async with server:
+        await report_loop(options)
+
+
+def main(args) -> int:
+    options = parse_args(args)
+    if options.trace:
+        options.trace = split_chunks(parse_trace(options.trace))
+        # skip everything up to the server's hello, we send our own:
+        for position, chunk in enumerate(options.trace):
+            if chunk[3] == 0:
+                packet = peek_packet(chunk[2], chunk[4])
+                if packet is None or packet[0] == "hello":
+                    options.trace = options.trace[position + 1:]
+                    break
+    log_file = open(options.log, "w", newline="", encoding="utf8") if options.log else None
+    options.stats = DamageStats(log_file)
+    try:
+        asyncio.run(run_server(options))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if log_file:
+            log_file.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
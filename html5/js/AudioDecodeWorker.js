@@ -0,0 +1,222 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Decodes the audio stream received from the server
+ * and posts the samples to the AudioWorklet through a MessagePort:
+ * opus is decoded using WebCodecs,
+ * wav is 16-bit PCM which only needs to be converted to floats.
+ */
+
+// the port connected to the AudioWorklet:
+let output = null;
+let codec = "";
+let decoder = null;
+// the timestamp of the next chunk in microseconds,
+// used when the server does not provide one:
+let next_timestamp = 0;
+// the "OpusHead" identification header, if we have received one:
+let opus_head = null;
+// [channels, sample rate, bits per sample] once the wav header has been parsed:
+let wav_format = null;
+// the bytes of an incomplete wav sample frame:
+let wav_remainder = null;
+
+function send_samples(planes, sample_rate, timestamp) {
+  output.postMessage({
+    samples: planes,
+    sample_rate,
+    timestamp,
+  }, planes.map((plane) => plane.buffer));
+  const duration = Math.round(planes[0].length * 1_000_000 / sample_rate);
+  next_timestamp = timestamp + duration;
+}
+
+function init_opus(channels) {
+  decoder = new AudioDecoder({
+    output: (audio_data) => {
+      const planes = [];
+      for (let plane_index = 0; plane_index < audio_data.numberOfChannels; plane_index++) {
+        const plane = new Float32Array(audio_data.numberOfFrames);
+        audio_data.copyTo(plane, {
+          planeIndex: plane_index,
+          format: "f32-planar",
+        });
+        planes.push(plane);
+      }
+      send_samples(planes, audio_data.sampleRate, audio_data.timestamp);
+      audio_data.close();
+    },
+    error: (error) => postMessage({
+      c: "error",
+      e: `opus decoder error: ${error}`,
+    }),
+  });
+  const config = {
+    codec: "opus",
+    sampleRate: 48_000,
+    numberOfChannels: channels,
+  };
+  if (opus_head) {
+    config.description = opus_head;
+  }
+  decoder.configure(config);
+}
+
+function parse_opus_header(data) {
+  //returns true if `data` is one of the ogg opus headers rather than an audio packet
+  const magic = String.fromCharCode(...data.subarray(0, 8));
+  if (magic === "OpusTags") {
+    return true;
+  }
+  if (magic !== "OpusHead") {
+    return false;
+  }
+  if (data.length < 19) {
+    throw new Error("invalid OpusHead header");
+  }
+  opus_head = data.slice();
+  //configure the decoder again, with the channels from the header:
+  if (decoder) {
+    decoder.close();
+    decoder = null;
+  }
+  return true;
+}
+
+function decode_opus(data, timestamp) {
+  if (parse_opus_header(data)) {
+    return;
+  }
+  if (!decoder) {
+    //the channel count of the header,
+    //or the stereo flag of the table of contents byte:
+    init_opus(opus_head ? opus_head[9] : (data[0] & 0x4 ? 2 : 1));
+  }
+  decoder.decode(new EncodedAudioChunk({
+    type: "key",
+    timestamp,
+    data,
+  }));
+}
+
+function parse_wav_header(data) {
+  //returns the offset of the samples
+  const view = new DataView(data.buffer, data.byteOffset, data.byteLength);
+  const tag = (offset) => String.fromCharCode(...data.subarray(offset, offset + 4));
+  if (data.length < 12 || tag(0) !== "RIFF" || tag(8) !== "WAVE") {
+    throw new Error("invalid wav header");
+  }
+  let format = null;
+  let offset = 12;
+  while (offset + 8 <= data.length) {
+    const chunk_size = view.getUint32(offset + 4, true);
+    if (tag(offset) === "fmt ") {
+      format = [view.getUint16(offset + 10, true), view.getUint32(offset + 12, true), view.getUint16(offset + 22, true)];
+    } else if (tag(offset) === "data") {
+      if (!format || format[2] !== 16) {
+        throw new Error("unsupported wav format, only 16-bit PCM is supported");
+      }
+      wav_format = format;
+      return offset + 8;
+    }
+    offset += 8 + chunk_size + (chunk_size & 1);
+  }
+  throw new Error("wav data chunk not found");
+}
+
+function decode_wav(data, timestamp) {
+  if (!wav_format) {
+    data = data.subarray(parse_wav_header(data));
+  }
+  if (wav_remainder) {
+    const joined = new Uint8Array(wav_remainder.length + data.length);
+    joined.set(wav_remainder, 0);
+    joined.set(data, wav_remainder.length);
+    data = joined;
+    wav_remainder = null;
+  }
+  const [channels, sample_rate] = wav_format;
+  const frames = Math.floor(data.length / (2 * channels));
+  if (frames * 2 * channels < data.length) {
+    wav_remainder = data.slice(frames * 2 * channels);
+  }
+  if (frames === 0) {
+    return;
+  }
+  const view = new DataView(data.buffer, data.byteOffset, frames * 2 * channels);
+  const planes = [];
+  for (let channel = 0; channel < channels; channel++) {
+    const plane = new Float32Array(frames);
+    for (let frame = 0; frame < frames; frame++) {
+      plane[frame] = view.getInt16((frame * channels + channel) * 2, true) / 32_768;
+    }
+    planes.push(plane);
+  }
+  send_samples(planes, sample_rate, timestamp);
+}
+
+function close_decoder() {
+  if (decoder && decoder.state !== "closed") {
+    decoder.close();
+  }
+  decoder = null;
+  opus_head = null;
+  wav_format = null;
+  wav_remainder = null;
+  next_timestamp = 0;
+}
+
+onmessage = (e) => {
+  const data = e.data;
+  switch (data.c) {
+    case "start":
+      close_decoder();
+      codec = data.codec;
+      output = data.port;
+      break;
+    case "header":
+      try {
+        if (codec === "opus") {
+          parse_opus_header(data.data);
+        } else if (codec === "wav") {
+          decode_wav(data.data, next_timestamp);
+        }
+      } catch (error) {
+        postMessage({
+          c: "error",
+          e: `${error}`,
+        });
+      }
+      break;
+    case "data": {
+      const timestamp = data.timestamp >= 0 ? data.timestamp : next_timestamp;
+      try {
+        if (codec === "opus") {
+          decode_opus(data.data, timestamp);
+        } else if (codec === "wav") {
+          decode_wav(data.data, timestamp);
+        } else {
+          throw new Error(`unsupported codec '${codec}'`);
+        }
+      } catch (error) {
+        postMessage({
+          c: "error",
+          e: `${error}`,
+        });
+      }
+      break;
+    }
+    case "stop":
+      close_decoder();
+      if (output) {
+        output.close();
+        output = null;
+      }
+      break;
+    default:
+      console.error(`audio decode worker got unknown message: ${data.c}`);
+  }
+};
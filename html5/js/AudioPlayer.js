@@ -0,0 +1,113 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Low latency audio using WebCodecs:
+ * the packets are decoded in a worker,
+ * which sends the samples straight to an AudioWorklet jitter buffer,
+ * the main thread only forwards the packets.
+ */
+
+class XpraAudioPlayer {
+  constructor(codec) {
+    this.codec = codec;
+    this.context = null;
+    this.node = null;
+    this.worker = null;
+    this.ready = false;
+    // the buffer statistics reported by the worklet:
+    this.stats = {};
+    this.on_error = null;
+  }
+
+  start() {
+    //returns a promise which resolves once the worklet is loaded
+    this.context = new AudioContext({
+      latencyHint: "interactive",
+    });
+    const channel = new MessageChannel();
+    this.worker = new Worker("js/AudioDecodeWorker.js");
+    this.worker.addEventListener("message", (e) => {
+      if (e.data.c === "error" && this.on_error) {
+        this.on_error(e.data.e);
+      }
+    });
+    this.worker.postMessage({
+      c: "start",
+      codec: this.codec,
+      port: channel.port1,
+    }, [channel.port1]);
+    return this.context.audioWorklet.addModule("js/AudioWorkletProcessor.js").then(() => {
+      if (!this.context) {
+        //closed whilst loading
+        return;
+      }
+      this.node = new AudioWorkletNode(this.context, "xpra-audio-processor", {
+        numberOfInputs: 0,
+        outputChannelCount: [2],
+      });
+      this.node.port.addEventListener("message", (e) => {
+        this.stats = e.data;
+      });
+      this.node.port.start();
+      //the samples decoded until now are queued in the port:
+      this.node.port.postMessage({
+        c: "input",
+        port: channel.port2,
+      }, [channel.port2]);
+      this.node.connect(this.context.destination);
+      this.ready = true;
+    });
+  }
+
+  add_header(data) {
+    //the stream headers are parsed by the worker, they are not audio data:
+    const copy = data.slice();
+    this.worker.postMessage({
+      c: "header",
+      data: copy,
+    }, [copy.buffer]);
+  }
+
+  add_data(data, timestamp) {
+    //`timestamp` is in microseconds, or -1 to use the duration of the previous chunks
+    //the packet data may be a view of a larger buffer, so we copy it:
+    const copy = data.slice();
+    this.worker.postMessage({
+      c: "data",
+      data: copy,
+      timestamp,
+    }, [copy.buffer]);
+  }
+
+  resume() {
+    //the browser may keep the context suspended until the user interacts with the page
+    if (this.context && this.context.state === "suspended") {
+      return this.context.resume();
+    }
+    return Promise.resolve();
+  }
+
+  get_state() {
+    return this.context ? this.context.state : "closed";
+  }
+
+  close() {
+    this.ready = false;
+    if (this.worker) {
+      this.worker.postMessage({c: "stop"});
+      this.worker.terminate();
+      this.worker = null;
+    }
+    if (this.node) {
+      this.node.disconnect();
+      this.node = null;
+    }
+    if (this.context) {
+      this.context.close().catch(() => null);
+      this.context = null;
+    }
+  }
+}
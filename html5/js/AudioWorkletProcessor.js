@@ -0,0 +1,160 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Plays the decoded audio samples from a ring buffer,
+ * in the audio rendering thread.
+ * The buffer level follows a jitter target derived from the arrival times,
+ * and the playback rate is adjusted slightly to stay close to it,
+ * so the latency does not drift with the server's clock.
+ */
+
+// the capacity of the ring buffer, in seconds:
+const AUDIO_RING_BUFFER_SECONDS = 2;
+// the range of the jitter target, in milliseconds:
+const AUDIO_MIN_TARGET = 20;
+const AUDIO_MAX_TARGET = 200;
+// added to the target after each underrun, decays by 1ms per second:
+const AUDIO_UNDERRUN_PENALTY = 20;
+// the maximum playback rate correction, 0.5% is not audible:
+const AUDIO_MAX_RATE_ADJUST = 0.005;
+// skip ahead when the buffer level is this far above the target:
+const AUDIO_MAX_EXCESS = 100;
+// how often we report the buffer level, in seconds:
+const AUDIO_REPORT_INTERVAL = 1;
+
+class XpraAudioProcessor extends AudioWorkletProcessor {
+  constructor() {
+    super();
+    this.capacity = Math.ceil(AUDIO_RING_BUFFER_SECONDS * sampleRate);
+    this.buffers = null;
+    this.channels = 0;
+    // absolute positions, in input samples, the read position is fractional:
+    this.read_pos = 0;
+    this.write_pos = 0;
+    this.input_rate = sampleRate;
+    this.playing = false;
+    // moving averages, in milliseconds:
+    this.jitter = 0;
+    this.chunk_duration = 0;
+    this.penalty = 0;
+    this.target = AUDIO_MIN_TARGET * 2;
+    this.last_transit = null;
+    this.rate_adjust = 0;
+    this.underruns = 0;
+    this.overruns = 0;
+    this.last_report = 0;
+    this.port.onmessage = (e) => {
+      if (e.data.c === "input") {
+        //the samples come directly from the decode worker:
+        e.data.port.onmessage = (message) => this.add_samples(message.data);
+      }
+    };
+  }
+
+  add_samples(chunk) {
+    const planes = chunk.samples;
+    const frames = planes[0].length;
+    if (!this.buffers || chunk.sample_rate !== this.input_rate) {
+      this.input_rate = chunk.sample_rate;
+      this.capacity = Math.ceil(AUDIO_RING_BUFFER_SECONDS * this.input_rate);
+      this.buffers = planes.map(() => new Float32Array(this.capacity));
+      this.channels = planes.length;
+      this.read_pos = this.write_pos = 0;
+      this.playing = false;
+    }
+    //network jitter: the variation of the transit time, like RTP
+    const transit = currentTime * 1000 - chunk.timestamp / 1000;
+    if (this.last_transit !== null) {
+      const delta = Math.abs(transit - this.last_transit);
+      this.jitter += (delta - this.jitter) / 16;
+    }
+    this.last_transit = transit;
+    const duration = frames * 1000 / this.input_rate;
+    this.chunk_duration += (duration - this.chunk_duration) / 16;
+    this.target = Math.min(AUDIO_MAX_TARGET, Math.max(AUDIO_MIN_TARGET,
+      this.chunk_duration + 3 * this.jitter + this.penalty));
+    if (this.write_pos + frames - this.read_pos > this.capacity) {
+      //drop the oldest samples rather than the new ones:
+      this.overruns++;
+      this.read_pos = this.write_pos + frames - this.capacity;
+    }
+    for (let channel = 0; channel < this.channels; channel++) {
+      const buffer = this.buffers[channel];
+      const plane = planes[Math.min(channel, planes.length - 1)];
+      const start = this.write_pos % this.capacity;
+      const first = Math.min(frames, this.capacity - start);
+      buffer.set(plane.subarray(0, first), start);
+      if (first < frames) {
+        buffer.set(plane.subarray(first), 0);
+      }
+    }
+    this.write_pos += frames;
+  }
+
+  get_level() {
+    //the buffer level, in milliseconds
+    return (this.write_pos - this.read_pos) * 1000 / this.input_rate;
+  }
+
+  process(inputs, outputs) {
+    const output = outputs[0];
+    const frames = output[0].length;
+    let level = this.buffers ? this.get_level() : 0;
+    if (!this.playing && level >= this.target) {
+      this.playing = true;
+    }
+    if (this.playing && level > this.target + AUDIO_MAX_EXCESS) {
+      //too far behind to catch up smoothly:
+      this.read_pos = this.write_pos - this.target * this.input_rate / 1000;
+      level = this.target;
+    }
+    let written = 0;
+    if (this.playing) {
+      //proportional correction towards the target level:
+      const error = (level - this.target) / this.target;
+      this.rate_adjust = Math.max(-AUDIO_MAX_RATE_ADJUST, Math.min(AUDIO_MAX_RATE_ADJUST, error * AUDIO_MAX_RATE_ADJUST));
+      const step = this.input_rate / sampleRate * (1 + this.rate_adjust);
+      const capacity = this.capacity;
+      for (; written < frames; written++) {
+        const pos = this.read_pos;
+        if (pos + 1 >= this.write_pos) {
+          //underrun: wait for the buffer to refill
+          this.playing = false;
+          this.underruns++;
+          this.penalty = Math.min(AUDIO_MAX_TARGET, this.penalty + AUDIO_UNDERRUN_PENALTY);
+          break;
+        }
+        const index = Math.floor(pos);
+        const fraction = pos - index;
+        const current = index % capacity;
+        const next = (index + 1) % capacity;
+        for (let channel = 0; channel < output.length; channel++) {
+          const buffer = this.buffers[Math.min(channel, this.channels - 1)];
+          output[channel][written] = buffer[current] + (buffer[next] - buffer[current]) * fraction;
+        }
+        this.read_pos += step;
+      }
+    }
+    for (const channel of output) {
+      channel.fill(0, written);
+    }
+    this.penalty = Math.max(0, this.penalty - frames / sampleRate);
+    if (currentTime - this.last_report >= AUDIO_REPORT_INTERVAL) {
+      this.last_report = currentTime;
+      this.port.postMessage({
+        level: Math.round(this.get_level()),
+        target: Math.round(this.target),
+        jitter: Math.round(this.jitter * 10) / 10,
+        "rate-adjust": Math.round(this.rate_adjust * 100_000) / 100_000,
+        underruns: this.underruns,
+        overruns: this.overruns,
+      });
+    }
+    return true;
+  }
+}
+
+registerProcessor("xpra-audio-processor", XpraAudioProcessor);
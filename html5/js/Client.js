@@ -70,6 +70,8 @@ const MOUSE_BUTTON_MASKS = {
   4: 8, //back
   5: 16, //forward
 };
+//the maximum number of intermediate pointer positions sent per animation frame:
+const POINTER_PATH_MAX = 32;
 
 function truncate(input) {
   if (!input) {
@@ -130,6 +132,8 @@ class XpraClient {
     this.remote_file_chunks = 0;
     this.send_chunks_in_progress = new Map();
     this.receive_chunks_in_progress = new Map();
+    //the file packets received whilst loading the file transfer module:
+    this.file_packets = [];
     this.keyboard_layout = null;
     this.printing = false;
     this.key_packets = [];
@@ -143,6 +147,8 @@ class XpraClient {
     this.reconnect_in_progress = false;
     this.reconnect_delay = 1000; //wait 1 second before retrying
     this.reconnect_attempt = 0;
+    // keep the windows and their decoders whilst reconnecting:
+    this.fast_resume = true;
     this.swap_keys = Utilities.isMacOS();
     this.HELLO_TIMEOUT = 30_000;
     this.OPEN_TIMEOUT = 10_000;
@@ -251,13 +257,14 @@ class XpraClient {
     this.audio = null;
     this.audio_enabled = false;
     this.audio_mediasource_enabled = MediaSourceUtil.getMediaSourceClass() != undefined;
-    this.audio_aurora_enabled = typeof AV !== "undefined" &&
-      AV != undefined &&
-      AV.Decoder != undefined &&
-      AV.Player.fromXpraSource != undefined;
+    //the aurora framework is only loaded if we need it, see init_audio:
+    this.audio_aurora_enabled = true;
+    this.audio_loading = false;
+    this.audio_webcodecs_enabled = true;
     this.audio_codecs = {};
     this.audio_framework = null;
     this.audio_aurora_ctx = null;
+    this.audio_player = null;
     this.audio_codec = null;
     this.audio_context = new AudioContext();
     this.audio_state = "";
@@ -265,6 +272,7 @@ class XpraClient {
     this.audio_signal = false;
     this.aurora_codecs = {};
     this.mediasource_codecs = {};
+    this.webcodecs_codecs = {};
     // encryption
     this.encryption = false;
     this.encryption_key = null;
@@ -286,6 +294,11 @@ class XpraClient {
     this.mouseup_event = null;
     this.last_mouse_x = null;
     this.last_mouse_y = null;
+    // pointer motion is sent once per animation frame:
+    this.pending_pointer = null;
+    this.pointer_frame = 0;
+    // also send the intermediate positions from `getCoalescedEvents`:
+    this.pointer_path = false;
     this.wheel_delta_x = 0;
     this.wheel_delta_y = 0;
     this.mouse_grabbed = false;
@@ -310,6 +323,19 @@ class XpraClient {
     this.info_timer = null;
     this.info_request_pending = false;
     this.server_last_info = {};
+    // performance counters, see `get_telemetry`:
+    this.telemetry = new XpraTelemetry();
+    this.telemetry.add_gauge("rQ", () => (this.protocol ? this.protocol.receive_queue_size || 0 : 0));
+    this.telemetry.add_gauge("decode_queue", () => this.get_decode_queue_length(), true);
+    this.telemetry.add_gauge("paint_queue", () => this.get_paint_queue_length(), true);
+    this.telemetry.add_gauge("pending_redraw", () => this.pending_redraw.length, true);
+    this.telemetry_timer = null;
+    // adjusts the encoding settings to the client's performance:
+    this.adaptive_encoding = true;
+    this.encoding_controller = new XpraEncodingController(this);
+    // slows down the windows the user cannot see:
+    this.throttle_hidden_windows = true;
+    this.visibility = new XpraVisibilityTracker(this);
     // ping
     this.ping_timeout_timer = null;
     this.ping_grace_timer = null;
@@ -322,8 +348,16 @@ class XpraClient {
     this.server_load = null;
     this.server_ok = false;
     //packet handling
-    this.decode_worker = null;
+    //record a trace of the session (for benchmarks):
+    this.trace = false;
+    this.decode_workers = null;
+    //0 means: sized from `navigator.hardwareConcurrency`
+    this.decode_workers_count = 0;
     this.decode_worker_timeout = 0;
+    // draw packets are sent straight from the protocol worker to the decode worker:
+    this.decode_forwarding = false;
+    // shared by the windows for images decoded on the main thread:
+    this.image_decoder = new XpraImageDecoder();
     // floating menu
     this.toolbar_position = "top";
 
@@ -341,6 +375,9 @@ class XpraClient {
     this.xdg_menu = null;
     // a list of our windows
     this.id_to_window = {};
+    // the windows kept from the previous connection,
+    // until the server tells us which ones still exist:
+    this.resume_windows = new Map();
     this.ui_events = 0;
     this.pending_redraw = [];
     this.draw_pending = 0;
@@ -368,6 +405,10 @@ class XpraClient {
 
   send() {
     this.debug("network", "sending a", arguments[0], "packet");
+    //the pending pointer motion must be sent before any other event:
+    if (this.pending_pointer && arguments[0][0] !== PACKET_TYPES.pointer_position) {
+      this.flush_pointer_position();
+    }
     if (this.protocol) {
       this.protocol.send.apply(this.protocol, arguments);
     }
@@ -543,96 +584,174 @@ class XpraClient {
       this.clog("no webworker support at all.");
     }
 
-    if (this.webtransport) {
-      this.protocol = new XpraWebTransportProtocol();
-    } else if (WORKER) {
+    if (WORKER) {
+      //the worker handles both websockets and WebTransport:
       this.protocol = new XpraProtocolWorkerHost();
+    } else if (this.webtransport) {
+      this.protocol = new XpraWebTransportProtocol();
     } else {
       this.protocol = new XpraProtocol();
     }
     this.open_protocol();
+    if (this.trace) {
+      //record the data received, see `save_trace`:
+      this.protocol.start_trace();
+    }
+
+    if (this.decode_workers) {
+      //resuming: the decode workers still hold the windows' canvases and decoders
+      this.forward_draw_packets();
+      return;
+    }
 
     this.decode_worker_timeout = false;
     if (!DECODE_WORKER) {
       this.supported_encodings = SAFE_ENCODINGS;
       this.offscreen_api = false;
-      this.decode_worker = null;
+      this.decode_workers = null;
       return;
     }
 
-    let decode_worker;
     if (this.offscreen_api) {
       // check that it is actually available:
       this.offscreen_api = DECODE_WORKER && XpraOffscreenWorker.isAvailable(this.ssl);
     }
 
+    const size = this.decode_workers_count > 0 ? this.decode_workers_count : default_decode_workers();
+    let script;
     if (this.offscreen_api) {
-      this.clog("initializing offscreen decode worker");
-      decode_worker = new Worker("js/OffscreenDecodeWorker.js");
+      this.clog("initializing", size, "offscreen decode workers");
+      script = "js/OffscreenDecodeWorker.js";
     } else {
-      this.clog("initializing regular decode worker");
-      decode_worker = new Worker("js/DecodeWorker.js");
-    }
-    decode_worker.addEventListener(
-      "message",
-      (e) => {
-        const data = e.data;
-        if (data["draw"]) {
-          this.do_process_draw(data["draw"], data["start"]);
-          return;
+      this.clog("initializing", size, "regular decode workers");
+      script = "js/DecodeWorker.js";
+    }
+    const pool = new XpraDecodeWorkerPool(script, size);
+    //the workers which have not replied to the "check" yet:
+    let checking = size;
+    let formats = null;
+    const errors = [];
+    pool.add_message_listener((e, index) => {
+      const data = e.data;
+      if (data["draw"]) {
+        this.do_process_draw(data["draw"], data["start"]);
+        return;
+      }
+      if (data["error"]) {
+        const message = data["error"];
+        const packet = data["packet"];
+        const wid = packet[1];
+        const width = packet[2];
+        const height = packet[3];
+        const coding = packet[6];
+        const packet_sequence = packet[8];
+        this.clog("decode error on ", coding, "packet sequence", packet_sequence, ":", message);
+        this.telemetry.increment("draw.errors");
+        if (!this.offscreen_api) {
+          this.clog(" pixel data:", packet[7]);
         }
-        if (data["error"]) {
-          const message = data["error"];
-          const packet = data["packet"];
-          const wid = packet[1];
-          const width = packet[2];
-          const height = packet[3];
-          const coding = packet[6];
-          const packet_sequence = packet[8];
-          this.clog("decode error on ", coding, "packet sequence", packet_sequence, ":", message);
-          if (!this.offscreen_api) {
-            this.clog(" pixel data:", packet[7]);
-          }
-          this.do_send_damage_sequence(packet_sequence, wid, width, height, -1, message);
+        this.do_send_damage_sequence(packet_sequence, wid, width, height, -1, message);
+        return;
+      }
+      switch (data["result"]) {
+        case true:
+          //all the workers run the same code, so they should support the same formats:
+          formats = formats || [...data["formats"]];
+          break;
+        case false:
+          this.clog(`we can't decode using worker ${index}: ${data["errors"]}`);
+          errors.push(data["errors"]);
+          pool.remove_worker(index);
+          break;
+        default:
+          this.clog("client got unknown message from decode worker", index);
+          pool.remove_worker(index);
           return;
-        }
-        switch (data["result"]) {
-          case true: {
-            const formats = [...data["formats"]];
-            this.clog("we can decode using a worker:", decode_worker);
-            if (this.decode_worker_timeout) {
-              this.clog("but worker initialization took too long!");
-              decode_worker.postMessage({cmd: "close"});
-              this.decode_worker = null;
-            }
-            else {
-              if (this.offscreen_api) {
-                this.set_encoding_option('video_max_size', [4096, 4096]);
-              }
-              this.supported_encodings = formats;
-              this.clog("full list of supported encodings:", this.supported_encodings);
-              this.decode_worker = decode_worker;
-            }
-            break;
-          }
-          case false:
-            this.clog(`we can't decode using a worker: ${data["errors"]}`);
-            this.decode_worker = null;
-            break;
-          default:
-            this.clog("client got unknown message from the decode worker");
-            this.decode_worker = null;
-        }
-      },
-      false
-    );
-    this.clog("decode worker will check:", this.check_encodings);
-    decode_worker.postMessage({cmd: "check", encodings: this.check_encodings});
+      }
+      checking--;
+      if (checking > 0) {
+        return;
+      }
+      pool.compact();
+      if (pool.size === 0) {
+        this.clog("we can't decode using a worker:", errors);
+        this.decode_workers = null;
+        return;
+      }
+      this.clog("we can decode using", pool.size, "workers");
+      if (this.decode_worker_timeout) {
+        this.clog("but worker initialization took too long!");
+        pool.close();
+        this.decode_workers = null;
+        return;
+      }
+      if (this.offscreen_api) {
+        this.set_encoding_option('video_max_size', [4096, 4096]);
+      }
+      this.supported_encodings = formats;
+      this.clog("full list of supported encodings:", this.supported_encodings);
+      this.decode_workers = pool;
+      this.forward_draw_packets();
+    });
+    this.clog("decode workers will check:", this.check_encodings);
+    pool.post_all({cmd: "check", encodings: this.check_encodings});
+  }
+
+  forward_draw_packets() {
+    //only the worker host can send the draw packets to the decode workers directly,
+    //so the compressed pixel data does not need to go through the main thread:
+    if (this.protocol && this.protocol.forward_draw_packets && this.decode_workers) {
+      this.decode_forwarding = this.protocol.forward_draw_packets(this.decode_workers);
+      this.clog("forwarding draw packets to the decode workers:", this.decode_forwarding);
+    }
+  }
+
+  get_decode_queue_depths() {
+    //for each decode worker: the number of windows and the number of draw packets pending
+    if (!this.decode_workers) {
+      return [];
+    }
+    return this.decode_workers.get_queue_depths();
+  }
+
+  get_decode_queue_length() {
+    let length = 0;
+    for (const depth of this.get_decode_queue_depths()) {
+      length += depth.queue;
+    }
+    return length;
+  }
+
+  get_paint_queue_length() {
+    let length = 0;
+    for (const wid in this.id_to_window) {
+      //windows painted by an offscreen worker don't have one:
+      const paint_queue = this.id_to_window[wid].paint_queue;
+      if (paint_queue) {
+        length += paint_queue.length;
+      }
+    }
+    return length;
+  }
+
+  save_trace() {
+    //stops recording and downloads the session trace
+    if (!this.protocol || !this.protocol.stop_trace) {
+      return;
+    }
+    this.protocol.stop_trace((trace) => {
+      if (!trace) {
+        this.warn("no session trace recorded, use the 'trace' option");
+        return;
+      }
+      this.clog("saving session trace:", trace.byteLength, "bytes");
+      Utilities.saveFile("xpra-session.trace", trace, {type: "application/octet-stream"});
+    });
   }
 
   open_protocol() {
     // set protocol to deliver packets to our packet router
-    this.protocol.set_packet_handler((packet) => this._route_packet(packet));
+    this.protocol.set_packet_handler((packet, received) => this._route_packet(packet, received));
     // make uri
     let uri = "";
     if (this.webtransport) {
@@ -672,6 +791,7 @@ class XpraClient {
   redraw_windows() {
     for (const wid in this.id_to_window) {
       const win = this.id_to_window[wid];
+      win.invalidate();
       this.request_redraw(win);
     }
   }
@@ -680,12 +800,19 @@ class XpraClient {
     for (const wid in this.id_to_window) {
       const win = this.id_to_window[wid];
       window.removeWindowListItem(win.wid);
+      this.visibility.remove(win);
       win.destroy();
     }
-    if (this.decode_worker) {
-      this.decode_worker.postMessage({cmd: "close"});
-      this.decode_worker = null;
+    for (const win of this.resume_windows.values()) {
+      window.removeWindowListItem(win.wid);
+      win.destroy();
+    }
+    this.resume_windows.clear();
+    if (this.decode_workers) {
+      this.decode_workers.close();
+      this.decode_workers = null;
     }
+    this.decode_forwarding = false;
   }
 
   send_close_window(win) {
@@ -703,10 +830,14 @@ class XpraClient {
       this.protocol.terminate();
       this.protocol = null;
     }
+    this.decode_forwarding = false;
   }
 
   clear_timers() {
     this.stop_info_timer();
+    this.telemetry.stop();
+    this.encoding_controller.stop();
+    this.visibility.stop();
     this.cancel_hello_timer();
     if (this.ping_timer) {
       clearTimeout(this.ping_timer);
@@ -733,10 +864,14 @@ class XpraClient {
     this.encoding_options[option] = value;
   }
 
-  _route_packet(packet) {
+  _route_packet(packet, received) {
     // ctx refers to `this` because we came through a callback
     const packet_type = Utilities.s(packet[0]);
     this.debug("network", "received a", packet_type, "packet");
+    if (received) {
+      //the protocol may be running in a worker, so we use the same clock:
+      this.telemetry.record(`route.${packet_type}`, performance.timeOrigin + performance.now() - received);
+    }
     const function_ = this.packet_handlers[packet_type];
     if (function_ === undefined) {
       this.cerror("no packet handler for ", packet_type);
@@ -1181,6 +1316,8 @@ class XpraClient {
   }
 
   _get_keycodes() {
+    //the keysyms of the unicode characters are only needed once we are connected:
+    LazyModules.load("keysyms").catch((error) => this.error("failed to load the keysyms:", error));
     //keycodes.append((nn(keyval), nn(name), nn(keycode), nn(group), nn(level)))
     const keycodes = [];
     let kc;
@@ -1300,8 +1437,16 @@ class XpraClient {
    */
   _send_hello(counter) {
     counter = counter || 0;
+    if (this.audio_loading && counter < 100) {
+      //the hello packet includes the audio codecs:
+      if (counter === 0) {
+        this.on_connection_progress("Loading audio framework", "", 70);
+      }
+      setTimeout(() => this._send_hello(counter + 1), 100);
+      return;
+    }
     this.decode_worker_timeout = counter >= 100;
-    if (!DECODE_WORKER || this.decode_worker || this.decode_worker_timeout) {
+    if (!DECODE_WORKER || this.decode_workers || this.decode_worker_timeout) {
       // we don't need to wait for the decode worker (ie: disabled),
       // or we have successfully initialized it,
       // or we have already waited too long...
@@ -1726,18 +1871,75 @@ class XpraClient {
     if (this.server_is_desktop) {
       wid = 1;
     }
+    let pos = null;
     if (win) {
       wid = win.wid;
       // add relative coordinates:
-      const pos = win.get_internal_geometry();
+      pos = win.get_internal_geometry();
       coords.push(Math.round(mouse.x - pos.x));
       coords.push(Math.round(mouse.y - pos.y));
       e.preventDefault();
     }
-    this.send([PACKET_TYPES.pointer_position, wid, coords, modifiers, buttons]);
+    const path = [];
+    if (this.pointer_path && e.getCoalescedEvents && !document.pointerLockElement) {
+      //the events merged by the browser into this one, the last one is this event:
+      const events = e.getCoalescedEvents().slice(0, -1);
+      const scroll_x = jQuery(document).scrollLeft();
+      const scroll_y = jQuery(document).scrollTop();
+      for (const event of events) {
+        const px = Math.round((event.clientX + scroll_x) * this.scale);
+        const py = Math.round((event.clientY + scroll_y) * this.scale);
+        path.push(pos ? [px, py, px - Math.round(pos.x), py - Math.round(pos.y)] : [px, py]);
+      }
+    }
+    this.queue_pointer_position(wid, coords, modifiers, buttons, path);
     return !win;
   }
 
+  queue_pointer_position(wid, coords, modifiers, buttons, path) {
+    //only the last position is sent on the next animation frame,
+    //or all of them as a path if `pointer_path` is enabled
+    const pending = this.pending_pointer;
+    if (pending && (pending[0] !== wid || pending[1].length !== coords.length)) {
+      this.flush_pointer_position();
+    } else if (pending && document.pointerLockElement) {
+      //the coordinates are the relative motion, so we add them up:
+      coords = coords.map((value, index) => pending[1][index] + coords[index % 2]);
+    } else if (pending && this.pointer_path) {
+      path = pending[4].concat([pending[1]], path);
+    }
+    if (path.length > POINTER_PATH_MAX) {
+      //keep evenly spaced samples:
+      const step = path.length / POINTER_PATH_MAX;
+      path = Array.from({length: POINTER_PATH_MAX}, (_, index) => path[Math.floor(index * step)]);
+    }
+    this.pending_pointer = [wid, coords, modifiers, buttons, path];
+    if (!this.pointer_frame) {
+      this.pointer_frame = window.requestAnimationFrame(() => {
+        this.pointer_frame = 0;
+        this.flush_pointer_position();
+      });
+    }
+  }
+
+  flush_pointer_position() {
+    if (this.pointer_frame) {
+      window.cancelAnimationFrame(this.pointer_frame);
+      this.pointer_frame = 0;
+    }
+    const pending = this.pending_pointer;
+    if (!pending) {
+      return;
+    }
+    this.pending_pointer = null;
+    const [wid, coords, modifiers, buttons, path] = pending;
+    //these packets are all sent in the same websocket message:
+    for (const point of path) {
+      this.send([PACKET_TYPES.pointer_position, wid, point, modifiers, buttons]);
+    }
+    this.send([PACKET_TYPES.pointer_position, wid, coords, modifiers, buttons]);
+  }
+
   // release the buttons given, or all the ones we believe are pressed,
   // `e` is optional: we fall back to the last known pointer position
   release_buttons(e, win, buttons) {
@@ -2280,6 +2482,14 @@ class XpraClient {
    * Show/Hide the window preview list
    */
   toggle_window_preview(init_callback) {
+    if (!LazyModules.is_loaded("preview")) {
+      //the carousel is loaded the first time we open the preview:
+      LazyModules.load("preview").then(
+        () => this.toggle_window_preview(init_callback),
+        (error) => this.error("failed to load the window preview:", error)
+      );
+      return;
+    }
     const preview_element = $(WINDOW_PREVIEW_SELECTOR);
 
     preview_element.on("init", (e, slick) => {
@@ -2318,6 +2528,7 @@ class XpraClient {
       preview_element.off("init");
       $(window).off("click", this._handle_window_list_blur);
       $(window).off("contextmenu", this._handle_window_list_blur);
+      this.visibility.schedule();
       return;
     }
 
@@ -2389,6 +2600,7 @@ class XpraClient {
       easing: "null",
       waitForAnimate: false,
     });
+    this.visibility.schedule();
   }
 
   /*
@@ -2512,12 +2724,22 @@ class XpraClient {
     this.reconnect_in_progress = true;
     setTimeout(() => {
       try {
-        this.remove_windows();
+        const windows = new Map([...this.resume_windows, ...Object.values(this.id_to_window).map((win) => [win.wid, win])]);
+        const decode_workers = this.decode_workers;
+        const resume = this.fast_resume && windows.size > 0;
+        if (!resume) {
+          this.remove_windows();
+        }
         this.close_audio();
         this.cancel_all_files();
         this.clear_timers();
         this.init_state();
         this.close_protocol();
+        if (resume) {
+          this.clog("keeping", windows.size, "windows until the connection is resumed");
+          this.resume_windows = windows;
+          this.decode_workers = decode_workers;
+        }
         this.emit_connection_lost();
         this.connect();
       } finally {
@@ -2579,6 +2801,10 @@ class XpraClient {
 
   _process_startup_complete(packet) {
     this.log("startup complete");
+    //the server has sent all its windows by now:
+    for (const wid of [...this.resume_windows.keys()]) {
+      this.discard_resume_window(wid);
+    }
     this.emit_connection_established();
   }
 
@@ -2619,6 +2845,11 @@ class XpraClient {
       console.info("cipher out caps=", JSON.stringify(this.cipher_out_caps));
       this.protocol.set_cipher_out(this.cipher_out_caps, this.encryption_key);
     }
+    // compress the large packets we send, if the server can decompress them:
+    const compressors = (hello["compressors"] || []).map((compressor) => Utilities.s(compressor));
+    if (hello["lz4"] || compressors.includes("lz4")) {
+      this.protocol.set_compressor("lz4");
+    }
 
     const version = Utilities.s(hello["version"]);
     try {
@@ -2697,6 +2928,10 @@ class XpraClient {
     this.remote_file_size_limit = hello["max-file-size"];
     this.remote_file_chunks = Math.max(0, Math.min(this.remote_file_size_limit, hello["file-chunks"] || 0));
 
+    this.telemetry.start();
+    if (this.adaptive_encoding) {
+      this.encoding_controller.start();
+    }
     // start sending our own pings
     this._send_ping();
     this.ping_timer = setInterval(() => this._send_ping(), this.PING_FREQUENCY);
@@ -2768,12 +3003,17 @@ class XpraClient {
     if (!this.server_audio_codecs.includes(this.audio_codec)) {
       this.warn(`audio codec ${this.audio_codec} is not supported by the server`);
       this.audio_codec = null;
-      //find the best codec we can use:
-      for (let codec of MediaSourceConstants.PREFERRED_CODEC_ORDER) {
+      //find the best codec we can use, WebCodecs first:
+      const webcodecs_codecs = MediaSourceConstants.PREFERRED_CODEC_ORDER.filter((codec) => codec in this.webcodecs_codecs);
+      for (let codec of [...webcodecs_codecs, ...MediaSourceConstants.PREFERRED_CODEC_ORDER]) {
         if (codec in this.audio_codecs && this.server_audio_codecs.includes(codec)) {
-          this.audio_framework = this.mediasource_codecs[codec] ?
-            "mediasource" :
-            "aurora";
+          if (this.webcodecs_codecs[codec]) {
+            this.audio_framework = "webcodecs";
+          } else {
+            this.audio_framework = this.mediasource_codecs[codec] ?
+              "mediasource" :
+              "aurora";
+          }
           this.audio_codec = codec;
           this.log("using", this.audio_framework, "audio codec", codec);
           break;
@@ -2896,11 +3136,8 @@ class XpraClient {
   xdg_image(icon_data, icon_type) {
     const img = new Image();
     if (typeof icon_data !== "undefined") {
-      let image_type = "image/" + icon_type;
-      if (icon_type == "svg") {
-        image_type = "image/svg+xml";
-      }
-      img.src = "data:" + image_type + ";base64," + Utilities.ArrayBufferToBase64(icon_data);
+      //menu entries are never removed, so the object URL is never revoked:
+      img.src = URL.createObjectURL(image_blob(icon_type, icon_data));
     }
     img.className = "menu-content-left";
     img.height = 24;
@@ -3052,9 +3289,8 @@ class XpraClient {
       sid = packet[3];
     }
     this.last_ping_local_time = Date.now();
-    const l1 = 0;
-    const l2 = 0;
-    const l3 = 0;
+    //so the server can adapt the encoding when we are struggling:
+    const [l1, l2, l3] = this.telemetry.get_load();
     this.send([PACKET_TYPES.ping_echo, echotime, l1, l2, l3, 0, sid]);
   }
 
@@ -3109,6 +3345,39 @@ class XpraClient {
     }
   }
 
+  /**
+   * Telemetry
+   */
+  get_telemetry() {
+    const info = this.telemetry.get_info();
+    info["decode-workers"] = this.get_decode_queue_depths();
+    info["adaptive-encoding"] = this.encoding_controller.get_info();
+    info["visibility"] = this.visibility.get_info();
+    if (this.audio_player) {
+      //the jitter buffer level and target, in milliseconds:
+      info["audio"] = this.audio_player.stats;
+    }
+    return info;
+  }
+  start_telemetry_timer() {
+    //dispatches a "telemetry" event with the performance counters
+    if (this.telemetry_timer) {
+      return;
+    }
+    this.telemetry_timer = setInterval(() => {
+      const event = document.createEvent("Event");
+      event.initEvent("telemetry", true, true);
+      event.data = this.get_telemetry();
+      document.dispatchEvent(event);
+    }, this.INFO_FREQUENCY);
+  }
+  stop_telemetry_timer() {
+    if (this.telemetry_timer) {
+      clearInterval(this.telemetry_timer);
+      this.telemetry_timer = null;
+    }
+  }
+
   /**
    * System Tray forwarding
    */
@@ -3145,6 +3414,8 @@ class XpraClient {
   _process_new_tray(packet) {
     const wid = packet[1];
     const metadata = packet[4];
+    //tray windows are always re-created:
+    this.discard_resume_window(wid);
     const mydiv = document.createElement("div");
     mydiv.id = String(wid);
     const mycanvas = document.createElement("canvas");
@@ -3246,10 +3517,11 @@ class XpraClient {
     this.clog("resume event, sending control refresh with options=", options);
     this.send_control_refresh(100, options);
     this.redraw_windows();
+    this.visibility.reset();
   }
 
-  send_control_refresh(quality, options) {
-    const wid = 0;
+  send_control_refresh(quality, options, wid = 0) {
+    //`wid` 0 applies to all the windows
     const client_options = {};
     const packet = [PACKET_TYPES.buffer_refresh, wid, 0, quality, options, client_options];
     this.send(packet);
@@ -3288,6 +3560,7 @@ class XpraClient {
       window.addWindowListItem(win, wid, trimmedTitle);
     }
     this.id_to_window[wid] = win;
+    this.visibility.add(win);
     this.auto_fullscreen_desktop_window();
     if (!override_redirect) {
       const geom = win.get_internal_geometry();
@@ -3305,13 +3578,18 @@ class XpraClient {
     const metadata = packet[6];
     if (wid in this.id_to_window)
       throw new Error(`we already have a window ${wid}`);
+    let client_properties = {};
+    if (packet.length >= 8) client_properties = packet[7];
+    const win = this.resume_windows.get(wid);
+    if (win) {
+      this.resume_window(win, x, y, w, h, metadata, override_redirect, client_properties);
+      return;
+    }
     if (w <= 0 || h <= 0) {
       this.error("window dimensions are wrong:", w, h);
       w = 1;
       h = 1;
     }
-    let client_properties = {};
-    if (packet.length >= 8) client_properties = packet[7];
     if (x === 0 && y === 0 && !metadata["set-initial-position"] && !metadata["fullscreen"]) {
       //find a good position for it
       const l = Object.keys(this.id_to_window).length;
@@ -3332,6 +3610,49 @@ class XpraClient {
     this._new_ui_event();
   }
 
+  resume_window(win, x, y, w, h, metadata, override_redirect, client_properties) {
+    //the server still has this window, we only update what changed whilst we were disconnected:
+    const wid = win.wid;
+    this.resume_windows.delete(wid);
+    this.id_to_window[wid] = win;
+    this.visibility.add(win);
+    this.clog("resuming window", wid);
+    win.client_properties = client_properties;
+    win.update_metadata(metadata);
+    if (x !== 0 || y !== 0 || metadata["set-initial-position"]) {
+      win.move_resize(x, y, w, h);
+    } else {
+      win.resize(w, h);
+    }
+    //the server starts new video streams:
+    if (this.decode_workers) {
+      this.decode_workers.post(wid, {cmd: "eos", wid});
+    }
+    if (!override_redirect) {
+      const geom = win.get_internal_geometry();
+      this.send([PACKET_TYPES.map_window, wid, geom.x, geom.y, geom.w, geom.h, win.client_properties]);
+      if (win.focused) {
+        this.set_focus(win);
+      }
+    }
+    this._new_ui_event();
+  }
+
+  discard_resume_window(wid) {
+    //this window no longer exists on the server
+    const win = this.resume_windows.get(wid);
+    if (!win) {
+      return;
+    }
+    this.resume_windows.delete(wid);
+    this.clog("window", wid, "is gone");
+    window.removeWindowListItem(wid);
+    if (this.decode_workers) {
+      this.decode_workers.remove(wid);
+    }
+    win.destroy();
+  }
+
   send_configure_window(win, state, skip_geometry) {
     const geom = win.get_internal_geometry();
     const wid = win.wid;
@@ -3339,6 +3660,7 @@ class XpraClient {
       win.client_properties, win.resize_counter, state, skip_geometry,
     ];
     this.send(packet);
+    this.visibility.schedule();
   }
 
   _process_new_window(packet) {
@@ -3433,6 +3755,7 @@ class XpraClient {
       delete this.id_to_window[wid];
     } catch {}
     if (win) {
+      this.visibility.remove(win);
       win.destroy();
       this.clog("lost window, was tray=", win.tray);
       if (win.tray) {
@@ -3448,8 +3771,8 @@ class XpraClient {
       //it had focus, find the next highest:
       this.auto_focus();
     }
-    if (this.decode_worker) {
-      this.decode_worker.postMessage({cmd: "remove", wid});
+    if (this.decode_workers) {
+      this.decode_workers.remove(wid);
     }
   }
 
@@ -3667,14 +3990,15 @@ class XpraClient {
   _process_draw(packet) {
     //ensure that the pixel data is in a byte array:
     const coding = Utilities.s(packet[6]);
-    let img_data = packet[7];
     const raw_buffers = [];
     const now = performance.now();
     if (coding !== "scroll") {
-      raw_buffers.push(img_data.buffer);
+      //the pixel data may be a view of a buffer shared with the rest of the packet:
+      packet[7] = transferable_buffer(packet[7]);
+      raw_buffers.push(packet[7].buffer);
     }
-    if (this.decode_worker) {
-      this.decode_worker.postMessage({cmd: "decode", packet, start: now}, raw_buffers);
+    if (this.decode_workers) {
+      this.decode_workers.post(packet[1], {cmd: "decode", packet, start: now}, raw_buffers);
       //the worker draw event will call do_process_draw
     } else {
       this.do_process_draw(packet, now);
@@ -3684,8 +4008,9 @@ class XpraClient {
   _process_eos(packet) {
     this.do_process_draw(packet, 0);
     const wid = packet[1];
-    if (this.decode_worker) {
-      this.decode_worker.postMessage({cmd: "eos", wid});
+    //when forwarding, the protocol worker has already sent the 'eos' to the decode worker:
+    if (this.decode_workers && !this.decode_forwarding) {
+      this.decode_workers.post(wid, {cmd: "eos", wid});
     }
   }
 
@@ -3695,8 +4020,8 @@ class XpraClient {
       return;
     }
 
-    if (this.offscreen_api && this.decode_worker) {
-      this.decode_worker.postMessage({cmd: "redraw", wid: win.wid});
+    if (this.offscreen_api && this.decode_workers) {
+      this.decode_workers.post(win.wid, {cmd: "redraw", wid: win.wid});
       return;
     }
     // request that drawing to screen takes place at next available opportunity if possible
@@ -3725,6 +4050,7 @@ class XpraClient {
     const elapsed = performance.now() - this.draw_pending;
     this.debug("draw", "animation frame:", this.pending_redraw.length, "windows to paint, processing delay", elapsed, "ms");
     this.draw_pending = 0;
+    this.encoding_controller.on_animation_frame(elapsed);
     // draw all the windows in the list:
     while (this.pending_redraw.length > 0) {
       const w = this.pending_redraw.shift();
@@ -3776,15 +4102,24 @@ class XpraClient {
     }
     const client = this;
 
+    //when using decode workers, the packet has already been decoded:
+    const paint_start = performance.now();
+
     function decode_result(error) {
       const flush = options["flush"] || 0;
-      let decode_time = Math.round(1000 * performance.now() - 1000 * start);
+      const now = performance.now();
+      let decode_time = Math.round(1000 * now - 1000 * start);
       if (flush === 0) {
         client.request_redraw(win);
       }
       if (error || start === 0) {
         client.request_redraw(win);
         decode_time = -1;
+        client.telemetry.increment("draw.errors");
+      } else {
+        client.telemetry.record(`decode.${coding}`, paint_start - start);
+        client.telemetry.record(`paint.${coding}`, now - paint_start);
+        client.encoding_controller.on_frame(wid, now - start);
       }
       client.debug("draw", "decode time for ", coding, " sequence ", packet_sequence, ": ", decode_time, ", flush=", flush);
       send_damage_sequence(decode_time, error || "");
@@ -3796,6 +4131,12 @@ class XpraClient {
     }
     if (coding === "offscreen-painted") {
       const decode_time = options["decode_time"];
+      if (options["throttled"]) {
+        this.telemetry.increment("video.throttled");
+      } else {
+        this.telemetry.record(`decode.${options["coding"]}`, (decode_time || 0) / 1000);
+        this.encoding_controller.on_frame(wid, (decode_time || 0) / 1000);
+      }
       send_damage_sequence(decode_time || 0, "");
       return;
     }
@@ -3803,6 +4144,7 @@ class XpraClient {
       win.paint(packet, decode_result);
     } catch (error) {
       this.exc(error, "error painting", coding, "sequence no", packet_sequence);
+      this.telemetry.increment("draw.errors");
       send_damage_sequence(-1, String(error));
       //there may be other screen updates pending:
       win.paint_pending = 0;
@@ -3816,13 +4158,33 @@ class XpraClient {
    */
   init_audio(ignore_audio_blacklist) {
     this.debug("audio", "init_audio() enabled=", this.audio_enabled, ", mediasource enabled=",
-      this.audio_mediasource_enabled, ", aurora enabled=", this.audio_aurora_enabled);
+      this.audio_mediasource_enabled, ", aurora enabled=", this.audio_aurora_enabled,
+      ", webcodecs enabled=", this.audio_webcodecs_enabled);
+    if (this.audio_webcodecs_enabled) {
+      this.webcodecs_codecs = MediaSourceUtil.getWebCodecsAudioCodecs();
+      for (const codec_option in this.webcodecs_codecs) {
+        this.audio_codecs[codec_option] = this.webcodecs_codecs[codec_option];
+      }
+    }
     if (this.audio_mediasource_enabled) {
       this.mediasource_codecs = MediaSourceUtil.getMediaSourceAudioCodecs(ignore_audio_blacklist);
       for (const codec_option in this.mediasource_codecs) {
         this.audio_codecs[codec_option] = this.mediasource_codecs[codec_option];
       }
     }
+    if (this.audio_aurora_enabled && this.audio_enabled && !LazyModules.is_loaded("aurora") &&
+      (this.audio_framework === "aurora" || Object.keys(this.audio_codecs).length === 0)) {
+      //only load the aurora decoders when we have no native alternative:
+      this.audio_loading = true;
+      LazyModules.load("aurora").catch((error) => {
+        this.error("failed to load the aurora audio framework:", error);
+        this.audio_aurora_enabled = false;
+      }).finally(() => {
+        this.audio_loading = false;
+        this.init_audio(ignore_audio_blacklist);
+      });
+      return;
+    }
     if (this.audio_aurora_enabled) {
       this.aurora_codecs = MediaSourceUtil.getAuroraAudioCodecs();
       for (const codec_option in this.aurora_codecs) {
@@ -3845,9 +4207,12 @@ class XpraClient {
         this.warn(`invalid audio codec: ${this.audio_codec}`);
         this.warn(`codecs found: ${this.audio_codecs}`);
       }
-      this.audio_codec = MediaSourceUtil.getDefaultAudioCodec(this.audio_codecs);
+      this.audio_codec = MediaSourceUtil.getDefaultAudioCodec(this.webcodecs_codecs) ||
+        MediaSourceUtil.getDefaultAudioCodec(this.audio_codecs);
       if (this.audio_codec) {
-        if (this.audio_mediasource_enabled && this.audio_codec in this.mediasource_codecs) {
+        if (this.audio_codec in this.webcodecs_codecs) {
+          this.audio_framework = "webcodecs";
+        } else if (this.audio_mediasource_enabled && this.audio_codec in this.mediasource_codecs) {
           this.audio_framework = "mediasource";
         } else if (this.audio_aurora_enabled && !Utilities.isIE()) {
           this.audio_framework = "aurora";
@@ -3871,7 +4236,8 @@ class XpraClient {
   _sound_start_receiving() {
     if (!this.audio_framework || !this.audio_codec) {
       //choose a codec + framework to use
-      const codecs_supported = MediaSourceUtil.get_supported_codecs(this.audio_mediasource_enabled, this.audio_aurora_enabled, false);
+      const codecs_supported = MediaSourceUtil.get_supported_codecs(this.audio_mediasource_enabled, this.audio_aurora_enabled,
+        false, this.audio_webcodecs_enabled);
       const audio_codec = MediaSourceUtil.get_best_codec(codecs_supported);
       if (!audio_codec) {
         this.log("no codec found");
@@ -3884,7 +4250,9 @@ class XpraClient {
     try {
       this.audio_buffers = [];
       this.audio_buffers_count = 0;
-      if (this.audio_framework === "mediasource") {
+      if (this.audio_framework === "webcodecs") {
+        this._sound_start_webcodecs();
+      } else if (this.audio_framework === "mediasource") {
         this._sound_start_mediasource();
       } else {
         this._sound_start_aurora();
@@ -3899,6 +4267,28 @@ class XpraClient {
     this.send([PACKET_TYPES.sound_control, "start", this.audio_codec]);
   }
 
+  _sound_start_webcodecs() {
+    const player = new XpraAudioPlayer(this.audio_codec);
+    player.on_error = (message) => {
+      this.error("audio decoding error:", message);
+      this.on_audio_state_change("error", message);
+      this.close_audio();
+    };
+    this.audio_player = player;
+    player.start().then(
+      () => {
+        if (this.audio_player === player) {
+          this._send_sound_start();
+        }
+      },
+      (error) => {
+        this.exc(error, "error loading the audio worklet");
+        this.on_audio_state_change("error", `audio worklet failed: ${error}`);
+        this.close_audio();
+      }
+    );
+  }
+
   _sound_start_aurora() {
     this.audio_aurora_ctx = AV.Player.fromXpraSource();
     this._send_sound_start();
@@ -3993,7 +4383,9 @@ class XpraClient {
     if (this.connected && this.audio_enabled) {
       this._send_sound_stop();
     }
-    if (this.audio_framework === "mediasource") {
+    if (this.audio_framework === "webcodecs") {
+      this._close_audio_webcodecs();
+    } else if (this.audio_framework === "mediasource") {
       this._close_audio_mediasource();
     } else {
       this._close_audio_aurora();
@@ -4001,6 +4393,13 @@ class XpraClient {
     this.on_audio_state_change("stopped", "closed");
   }
 
+  _close_audio_webcodecs() {
+    if (this.audio_player) {
+      this.audio_player.close();
+      this.audio_player = null;
+    }
+  }
+
   _close_audio_aurora() {
     if (this.audio_aurora_ctx) {
       if (this.audio_aurora_ctx.context) {
@@ -4066,7 +4465,9 @@ class XpraClient {
         this._audio_start_stream();
       }
 
-      if (buf && buf.length > 0) {
+      if (this.audio_framework === "webcodecs") {
+        this.add_webcodecs_sound_data(buf, options, metadata);
+      } else if (buf && buf.length > 0) {
         this.add_sound_data(codec, buf, metadata);
       }
 
@@ -4106,16 +4507,33 @@ class XpraClient {
     //can be overriden
   }
 
+  add_webcodecs_sound_data(buf, options, metadata) {
+    //the jitter buffer is in the worklet, so we don't queue anything here
+    const player = this.audio_player;
+    if (!player) {
+      return;
+    }
+    if (metadata) {
+      for (const metadatum of metadata) {
+        player.add_header(Utilities.u(metadatum));
+      }
+    }
+    if (buf && buf.length > 0) {
+      //the server's timestamps are in nanoseconds:
+      const timestamp = options["timestamp"] >= 0 ? Math.round(options["timestamp"] / 1000) : -1;
+      player.add_data(buf, timestamp);
+    }
+  }
+
   add_sound_data(codec, buf, metadata) {
     let MIN_START_BUFFERS = 4;
     const MAX_BUFFERS = 250;
     const CONCAT = true;
     this.debug("audio", "sound-data: ", codec, ", ", buf.length, "bytes");
     if (this.audio_buffers.length >= MAX_BUFFERS) {
-      this.warn(`audio queue overflowing: ${this.audio_buffers.length}, stopping`);
-      this.on_audio_state_change("error", "queue overflow");
-      this.close_audio();
-      return;
+      //drop the oldest buffers rather than stopping the stream:
+      this.warn(`audio queue overflowing: ${this.audio_buffers.length}, dropping the oldest buffers`);
+      this.audio_buffers.splice(0, this.audio_buffers.length - MIN_START_BUFFERS);
     }
     if (metadata) {
       this.debug("audio", "audio metadata=", metadata);
@@ -4187,6 +4605,14 @@ class XpraClient {
           this.close_audio();
         }
       );
+    } else if (this.audio_framework === "webcodecs") {
+      this.audio_player.resume().then(
+        () => this.on_audio_state_change("playing", `webcodecs playing ${this.audio_codec} stream`),
+        (error) => {
+          this.on_audio_state_change("error", `stream failed:${error}`);
+          this.close_audio();
+        }
+      );
     } else if (this.audio_framework === "http-stream") {
       this.log("invalid start-of-stream data for http-stream framework");
     } else if (this.audio_framework === "aurora") {
@@ -4524,7 +4950,37 @@ class XpraClient {
   /**
    * File transfers and printing
    */
+  defer_file_packet(packet) {
+    //returns true if the packet has to wait for the file transfer module
+    if (LazyModules.is_loaded("file_transfer")) {
+      return false;
+    }
+    this.file_packets.push(packet);
+    if (this.file_packets.length === 1) {
+      LazyModules.load("file_transfer").then(() => {
+        const packets = this.file_packets;
+        this.file_packets = [];
+        for (const p of packets) {
+          this._route_packet(p);
+        }
+      }, (error) => {
+        this.error("failed to load the file transfer module:", error);
+        for (const p of this.file_packets) {
+          const chunk_id = Utilities.s((p[7] || {})["file-chunk-id"] || "");
+          if (Utilities.s(p[0]) === PACKET_TYPES.send_file && chunk_id) {
+            this.send([PACKET_TYPES.ack_file_chunk, chunk_id, false, "file transfers are not available", 0]);
+          }
+        }
+        this.file_packets = [];
+      });
+    }
+    return true;
+  }
+
   _process_send_file(packet) {
+    if (this.defer_file_packet(packet)) {
+      return;
+    }
     const basefilename = Utilities.s(packet[1]);
     const mimetype = Utilities.s(packet[2]);
     const printit = packet[3];
@@ -4538,15 +4994,14 @@ class XpraClient {
       this.error("send-file: invalid data size, received", data.length, "bytes, expected", filesize);
       return;
     }
-    // removed hash checks because crypto.subtle is asynchronous, which is a pain
     if (data.length === filesize) {
       // got the whole file
-      for (const digest of ["sha512", "sha384", "sha256", "sha224", "sha1"]) {
-        const digest_value = options[digest];
-        if (digest_value) {
-          // not implemented!
-          this.log("digest check not implemented for", digest);
-        }
+      const download = new XpraFileDownload(basefilename, mimetype, printit, filesize, options);
+      download.digest?.update(data);
+      const error = download.verify_digest();
+      if (error) {
+        this.error("send-file:", error);
+        return;
       }
       this._got_file(basefilename, data, printit, mimetype, options);
       return;
@@ -4565,48 +5020,38 @@ class XpraClient {
       this.cancel_file(chunk_id, "too many concurrent files being downloaded", chunk);
       return;
     }
-    //start receiving chunks:
-    let writer = null;
-    try {
-      //try to use a stream saver:
-      this.debug("file", "streamSaver=", streamSaver);
-      streamSaver.mitm = "./mitm.html";
-      const fileStream = streamSaver.createWriteStream(basefilename, {
-        size: filesize,
-      });
-      writer = fileStream.getWriter();
-      this.debug("file", "stream writer=", writer);
-    } catch (error) {
-      writer = [];
+    //start receiving chunks,
+    //documents to print are kept in memory, the others are streamed to disk:
+    const download = new XpraFileDownload(basefilename, mimetype, printit, filesize, options);
+    const error = download.open(!printit);
+    if (error) {
       this.error("cannot use streamSaver:", error);
     }
-    const timer = setTimeout(
-      () => this._check_chunk_receiving(chunk_id, chunk),
-      CHUNK_TIMEOUT
-    );
-    const openit = true;
-    const chunk_state = [Date.now(), writer, basefilename, mimetype, printit, openit, filesize,
-      options, digest, 0, false, send_id, timer, chunk,
-    ];
-    this.receive_chunks_in_progress.set(chunk_id, chunk_state);
+    this.receive_chunks_in_progress.set(chunk_id, download);
+    this._schedule_chunk_check(chunk_id, download);
     this.send([PACKET_TYPES.ack_file_chunk, chunk_id, true, "", chunk]);
     this.log("receiving chunks for", basefilename, "with transfer id", chunk_id);
   }
 
-  _check_chunk_receiving(chunk_id, chunk_no) {
-    const chunk_state = this.receive_chunks_in_progress.get(chunk_id);
-    this.debug("file", "check_chunk_receiving(", chunk_id, ",", chunk_no, ") chunk_state=", chunk_state);
-    if (!chunk_state) {
-      return;
+  _schedule_chunk_check(chunk_id, download) {
+    //cancel the transfer if we don't receive the next chunk in time
+    if (download.timer) {
+      clearTimeout(download.timer);
     }
-    if (chunk_state[10]) {
-      //transfer has been cancelled
+    const chunk_no = download.chunk;
+    download.timer = setTimeout(() => this._check_chunk_receiving(chunk_id, chunk_no), CHUNK_TIMEOUT);
+  }
+
+  _check_chunk_receiving(chunk_id, chunk_no) {
+    const download = this.receive_chunks_in_progress.get(chunk_id);
+    this.debug("file", "check_chunk_receiving(", chunk_id, ",", chunk_no, ") download=", download);
+    if (!download || download.cancelled) {
       return;
     }
-    chunk_state[12] = 0; //this timer has been used
-    if (chunk_state[13] === 0) {
-      this.cerror("Error: chunked file transfer", chunk_id, "timed out");
-      this.receive_chunks_in_progress.delete(chunk_id);
+    download.timer = 0; //this timer has been used
+    if (download.chunk === chunk_no) {
+      this.cerror("Error: chunked file transfer", chunk_id, "timed out on chunk", chunk_no);
+      this.cancel_file(chunk_id, "timeout");
     }
   }
 
@@ -4617,6 +5062,9 @@ class XpraClient {
     for (const chunk_id of this.receive_chunks_in_progress.keys()) {
       this.cancel_file(chunk_id, reason);
     }
+    for (const chunk_id of this.send_chunks_in_progress.keys()) {
+      this.cancel_sending(chunk_id);
+    }
   }
 
   active_file_transfers() {
@@ -4624,22 +5072,10 @@ class XpraClient {
   }
 
   cancel_file(chunk_id, message, chunk) {
-    const chunk_state = this.receive_chunks_in_progress.get(chunk_id);
-    if (chunk_state) {
-      //mark it as cancelled:
-      chunk_state[10] = true;
-      //free the buffers
-      const writer = chunk_state[1];
-      if (writer.abort) {
-        writer.abort();
-      }
-      chunk_state[1] = null;
-      //stop the timer
-      const timer = chunk_state[12];
-      if (timer) {
-        clearTimeout(timer);
-        chunk_state[12] = 0;
-      }
+    const download = this.receive_chunks_in_progress.get(chunk_id);
+    if (download && !download.cancelled) {
+      //stops the timer and frees the buffers:
+      download.cancel();
       //remove this transfer after a little while,
       //so in-flight packets won't cause errors
       setTimeout(
@@ -4651,144 +5087,104 @@ class XpraClient {
   }
 
   _process_send_file_chunk(packet) {
+    if (this.defer_file_packet(packet)) {
+      return;
+    }
     const chunk_id = Utilities.s(packet[1]);
     const chunk = packet[2];
     const file_data = packet[3];
     const has_more = packet[4];
     this.debug("file", "_process_send_file_chunk(", chunk_id, chunk, `${file_data.length} bytes`, has_more, ")");
-    const chunk_state = this.receive_chunks_in_progress.get(chunk_id);
-    if (!chunk_state) {
+    const download = this.receive_chunks_in_progress.get(chunk_id);
+    if (!download) {
       this.error("Error: cannot find the file transfer id", chunk_id);
       this.cancel_file(chunk_id, `file transfer id${chunk_id}not found`, chunk);
       return;
     }
-    if (chunk_state[10]) {
+    if (download.cancelled) {
       this.debug("file", "got chunk for a cancelled file transfer, ignoring it");
       return;
     }
-    const filesize = chunk_state[6];
-    if (chunk_state[13] + 1 !== chunk) {
-      this.cancel_file(chunk_id, `chunk number mismatch, expected ${chunk_state[13] + 1} but got ${chunk}`);
+    if (download.chunk + 1 !== chunk) {
+      this.cancel_file(chunk_id, `chunk number mismatch, expected ${download.chunk + 1} but got ${chunk}`);
       return;
     }
     //update chunk number:
-    chunk_state[13] = chunk;
-    const written = chunk_state[9] + file_data.length;
-    if (written > filesize) {
+    download.chunk = chunk;
+    if (download.received + file_data.length > download.filesize) {
       this.cancel_file(chunk_id, "too much data received");
       return;
     }
-    const writer = chunk_state[1];
-    if (writer.write) {
-      //this is a file stream writer:
-      try {
-        const p = writer.write(file_data);
-        //depending on the implementation,
-        //this may be a promise:
-        if (p) {
-          p.then(
-            () => {
-              chunk_state[9] = written;
-              this.file_chunk_written(packet);
-            },
-            (error) => {
-              let message = "cannot write file data, download cancelled?";
-              if (error) {
-                this.clog("write failed:", error);
-                message = `cannot write file data: ${error}, download cancelled?`;
-              }
-              this.cancel_file(chunk_id, message);
-            }
-          );
-          //we will continue when the promise resolves, see above
-          return;
-        }
-        this.clog("write(..)=", p);
-      } catch (error) {
-        const message = "cannot write file data - download cancelled?";
-        this.error(error);
-        this.cancel_file(chunk_id, message);
-        return;
+    let written = null;
+    try {
+      written = download.write(file_data);
+    } catch (error) {
+      this.error(error);
+      this.cancel_file(chunk_id, "cannot write file data - download cancelled?");
+      return;
+    }
+    const write_failed = (error) => {
+      let message = "cannot write file data, download cancelled?";
+      if (error) {
+        this.clog("write failed:", error);
+        message = `cannot write file data: ${error}, download cancelled?`;
       }
-    } else {
-      //just a plain array:
-      writer.push(file_data);
+      this.cancel_file(chunk_id, message);
+    };
+    if (!has_more) {
+      if (written) {
+        written.then(() => this.file_download_complete(chunk_id, download), write_failed);
+      } else {
+        this.file_download_complete(chunk_id, download);
+      }
+      return;
     }
-    chunk_state[9] = written;
-    this.file_chunk_written(packet);
+    this._schedule_chunk_check(chunk_id, download);
+    //let the server send the next chunk while we write this one,
+    //unless the writer is falling behind:
+    if (!written || download.can_receive()) {
+      if (written) {
+        written.catch(write_failed);
+      }
+      this.send([PACKET_TYPES.ack_file_chunk, chunk_id, true, "", chunk]);
+      return;
+    }
+    written.then(() => {
+      if (!download.cancelled) {
+        this.send([PACKET_TYPES.ack_file_chunk, chunk_id, true, "", chunk]);
+      }
+    }, write_failed);
   }
 
-  file_chunk_written(packet) {
-    const chunk_id = Utilities.s(packet[1]);
-    const chunk = packet[2];
-    const file_data = packet[3];
-    const has_more = packet[4];
-    const chunk_state = this.receive_chunks_in_progress.get(chunk_id);
-    const writer = chunk_state[1];
-    const filesize = chunk_state[6];
-    const digest = chunk_state[8];
-    const written = chunk_state[9];
-    if (digest) {
-      digest.update(Utilities.Uint8ToString(file_data));
-    }
-    this.send([PACKET_TYPES.ack_file_chunk, chunk_id, true, "", chunk]);
-    if (has_more) {
-      const timer = chunk_state[12];
-      if (timer) {
-        clearTimeout(timer);
-      }
-      //remote end will send more after receiving the ack
-      chunk_state[12] = setTimeout(
-        () => this._check_chunk_receiving(chunk_id, chunk),
-        CHUNK_TIMEOUT
-      );
+  file_download_complete(chunk_id, download) {
+    if (download.cancelled) {
       return;
     }
-    this.receive_chunks_in_progress.delete(chunk_id);
+    const chunk = download.chunk;
     //check file size and digest then process it:
-    if (written !== filesize) {
-      this.cancel_file(chunk_id, `file size mismatch: expected a file of ${filesize} bytes but got ${written}`);
+    if (download.received !== download.filesize) {
+      this.cancel_file(chunk_id, `file size mismatch: expected a file of ${download.filesize} bytes but got ${download.received}`);
       return;
     }
-    const options = chunk_state[7];
-    if (digest && !this.verify_digest(digest, options[digest.algorithm])) {
-      this.cancel_file(chunk_id, `${digest.algorithm} checksum mismatch`);
+    const error = download.verify_digest();
+    if (error) {
+      this.error("Error verifying file checksum:", error);
+      this.cancel_file(chunk_id, error);
       return;
     }
-    const start_time = chunk_state[0];
-    const elapsed = Date.now() - start_time;
-    this.clog(filesize, "bytes received in", chunk, "chunks, took", Math.round(elapsed * 1000), "ms");
-    const filename = chunk_state[2];
-    const mimetype = chunk_state[3];
-    const printit = chunk_state[4];
-    //join all the data into a single typed array:
-    const data = new Uint8Array(filesize);
-    let start = 0;
-    if (writer.close) {
-      writer.close();
+    clearTimeout(download.timer);
+    download.timer = 0;
+    this.receive_chunks_in_progress.delete(chunk_id);
+    this.send([PACKET_TYPES.ack_file_chunk, chunk_id, true, "", chunk]);
+    const elapsed = performance.now() - download.start_time;
+    this.clog(download.filesize, "bytes received in", chunk, "chunks, took", Math.round(elapsed), "ms");
+    if (download.writer) {
+      download.writer.close();
     } else {
-      const chunks = chunk_state[1];
-      for (const chunk_ of chunks) {
-        data.set(chunk_, start);
-        start += chunk_.length;
-      }
-      this._got_file(filename, data, mimetype, printit, mimetype, options);
+      this._got_file(download.filename, download.get_blob(), download.printit, download.mimetype, download.options);
     }
   }
 
-  verify_digest(digest, expected_value) {
-    const algo = digest.algorithm;
-    const value = digest.digest().data;
-    const hex_value = Utilities.convertToHex(value);
-    if (hex_value !== expected_value.toLowerCase()) {
-      this.error("Error verifying", algo, "file checksum");
-      this.error(" expected", expected_value, "but got", hex_value);
-      return false;
-    }
-    this.log("verified", algo, "digest of file transfer");
-    return true;
-  }
-
   _got_file(basefilename, data, printit, mimetype, options) {
     if (printit) {
       this.print_document(basefilename, data, mimetype);
@@ -4805,7 +5201,7 @@ class XpraClient {
     if (!mimetype) {
       mimetype = "application/octet-binary";
     }
-    this.log(`saving ${data.length} bytes of ${mimetype} data to filename ${filename}`);
+    this.log(`saving ${data.length || data.size} bytes of ${mimetype} data to filename ${filename}`);
     Utilities.saveFile(filename, data, {
       type: mimetype
     });
@@ -4820,7 +5216,7 @@ class XpraClient {
       this.warn(`Received unsupported print data mimetype: ${mimetype}`);
       return;
     }
-    this.log(`got ${data.length} bytes of PDF to print`);
+    this.log(`got ${data.length || data.size} bytes of PDF to print`);
     const file = new Blob([data], {
       type: mimetype
     });
@@ -4844,72 +5240,87 @@ class XpraClient {
   }
 
   send_file(f) {
+    //the file is only read as the chunks are sent:
     clog("send_file:", f.name, ", type:", f.type, ", size:", f.size);
-    const fileReader = new FileReader();
-    fileReader.onloadend = (event_) => {
-      const u8a = new Uint8Array(event_.target.result);
-      this.do_send_file(f.name, f.type, f.size, u8a);
-    };
-    fileReader.readAsArrayBuffer(f);
+    this.do_send_file(f.name, f.type, f.size, f);
   }
 
-  do_send_file(filename, mimetype, size, buffer) {
+  do_send_file(filename, mimetype, size, data) {
+    //`data` can be a `Blob` (ie: a `File`) or a `Uint8Array`
     if (!this.file_transfer || !this.remote_file_transfer) {
       this.warn("cannot send file: file transfers are disabled!");
       return;
     }
-    let cdata = buffer;
+    if (!LazyModules.is_loaded("file_transfer")) {
+      LazyModules.load("file_transfer").then(
+        () => this.do_send_file(filename, mimetype, size, data),
+        (error) => this.error("cannot send file", filename, ":", error)
+      );
+      return;
+    }
+    const blob = data instanceof Blob ? data : new Blob([data]);
     const options = {};
     const chunk_size = Math.min(FILE_CHUNKS_SIZE, this.remote_file_chunks || 0);
     if (chunk_size > 0 && size > chunk_size) {
       if (this.send_chunks_in_progress.size >= MAX_CONCURRENT_FILES) {
-        throw Exception(`too many file transfers in progress:${this.send_chunks_in_progress.size}`);
+        throw new Error(`too many file transfers in progress:${this.send_chunks_in_progress.size}`);
       }
       //chunking is supported and the file is big enough
       const chunk_id = Utilities.getHexUUID();
       options["file-chunk-id"] = chunk_id;
-      //timer to check that the other end is requesting more chunks:
-      const timer = setTimeout(() => {
-        this._check_chunk_sending(chunk_id, 0);
-      }, CHUNK_TIMEOUT);
-      const chunk_state = [Date.now(), buffer, chunk_size, timer, 0];
-      this.send_chunks_in_progress.set(chunk_id, chunk_state);
-      cdata = "";
+      const upload = new XpraFileUpload(this, chunk_id, blob, chunk_size);
+      this.send_chunks_in_progress.set(chunk_id, upload);
+      this._schedule_chunk_sending_check(chunk_id, upload);
       this.debug("file", "using chunks, sending initial file-chunk-id=", chunk_id, ", for chunk size", chunk_size);
-    } else {
-      //send everything now:
-      this.debug("file", "sending full file:", size, "bytes, chunk size", chunk_size);
+      this.send([PACKET_TYPES.send_file, filename, mimetype, false, this.remote_open_files, size, "", options]);
+      return;
     }
-    const packet = [PACKET_TYPES.send_file, filename, mimetype, false, this.remote_open_files, size, cdata, options];
-    this.send(packet);
+    //send everything now:
+    this.debug("file", "sending full file:", size, "bytes, chunk size", chunk_size);
+    blob.arrayBuffer().then(
+      (buffer) => {
+        const packet = [PACKET_TYPES.send_file, filename, mimetype, false, this.remote_open_files, size, new Uint8Array(buffer), options];
+        this.send(packet);
+      },
+      (error) => this.error("failed to read file", filename, ":", error)
+    );
+  }
+
+  _schedule_chunk_sending_check(chunk_id, upload) {
+    //cancel the transfer if the other end stops acknowledging our chunks
+    if (upload.timer) {
+      clearTimeout(upload.timer);
+    }
+    const acked = upload.acked;
+    upload.timer = setTimeout(() => this._check_chunk_sending(chunk_id, acked), CHUNK_TIMEOUT);
   }
 
-  _check_chunk_sending(chunk_id, chunk_no) {
-    const chunk_state = this.send_chunks_in_progress.get(chunk_id);
-    this.debug("file", "chunk id", chunk_id, "chunk_no", chunk_no, "found chunk_state", Boolean(chunk_state));
-    if (!chunk_state) {
+  _check_chunk_sending(chunk_id, acked) {
+    const upload = this.send_chunks_in_progress.get(chunk_id);
+    this.debug("file", "chunk id", chunk_id, "acked", acked, "found upload", Boolean(upload));
+    if (!upload) {
       return;
     }
-    chunk_state[3] = 0; //timer has fired
-    if (chunk_state[13] === chunk_no) {
+    upload.timer = 0; //timer has fired
+    if (upload.acked === acked) {
       this.error("Error: chunked file transfer", chunk_id, "timed out");
-      this.error(" on chunk", chunk_no);
-      this.cancel_sending(chunk_id);
+      this.error(" waiting for the ack of chunk", acked + 1);
+      this.cancel_sending(chunk_id, "timeout");
     }
   }
 
-  cancel_sending(chunk_id) {
-    const chunk_state = this.send_chunks_in_progress.get(chunk_id);
-    this.debug("file", "cancel_sending", chunk_id, "chunk state found:", Boolean(chunk_state));
-    if (!chunk_state) {
+  cancel_sending(chunk_id, message) {
+    //`message` is only specified if we need to tell the other end
+    const upload = this.send_chunks_in_progress.get(chunk_id);
+    this.debug("file", "cancel_sending", chunk_id, "upload found:", Boolean(upload));
+    if (!upload) {
       return;
     }
-    const timer = chunk_state[3];
-    if (timer) {
-      chunk_state[3] = 0;
-      clearTimeout(timer);
-    }
+    upload.cancel();
     this.send_chunks_in_progress.delete(chunk_id);
+    if (message) {
+      this.send([PACKET_TYPES.ack_file_chunk, chunk_id, false, message, upload.sent]);
+    }
   }
 
   _process_ack_file_chunk(packet) {
@@ -4919,51 +5330,31 @@ class XpraClient {
     const chunk_id = Utilities.s(packet[1]);
     const state = packet[2];
     const error_message = packet[3];
-    let chunk = packet[4];
+    const chunk = packet[4];
     if (!state) {
       this.debug("file", "the remote end is cancelling the file transfer:");
       this.debug("file", " %s", Utilities.s(error_message));
       this.cancel_sending(chunk_id);
       return;
     }
-    const chunk_state = this.send_chunks_in_progress.get(chunk_id);
-    if (!chunk_state) {
-      this.error("Error: cannot find the file transfer id '%r'", chunk_id);
+    const upload = this.send_chunks_in_progress.get(chunk_id);
+    if (!upload) {
+      this.error("Error: cannot find the file transfer id", chunk_id);
       return;
     }
-    if (chunk_state[4] !== chunk) {
-      this.error("Error: chunk number mismatch", chunk_state, "vs", chunk);
-      this.cancel_sending(chunk_id);
+    if (!upload.ack(chunk)) {
+      this.error("Error: chunk number mismatch, expected", upload.acked + 1, "but got", chunk);
+      this.cancel_sending(chunk_id, "chunk number mismatch");
       return;
     }
-    const start_time = chunk_state[0];
-    const chunk_size = chunk_state[2];
-    let timer = chunk_state[3];
-    let data = chunk_state[1];
-    if (!data) {
-      //all sent!
-      const elapsed = Date.now() - start_time;
-      const bps = (8 * chunk * chunk_size) / elapsed;
-      this.log(chunk, "chunks of", chunk_size, "bytes sent in", Math.round(elapsed), "ms", bps, "bps");
+    if (upload.is_complete()) {
+      const elapsed = performance.now() - upload.start_time;
+      const bps = Math.round((8 * 1000 * upload.blob.size) / Math.max(1, elapsed));
+      this.log(chunk, "chunks of", upload.chunk_size, "bytes sent in", Math.round(elapsed), "ms", bps, "bps");
       this.cancel_sending(chunk_id);
       return;
     }
-    if (chunk_size <= 0) {
-      throw Exception(`invalid chunk size ${chunk_size}`);
-    }
-    //carve out another chunk:
-    const cdata = data.subarray(0, chunk_size);
-    data = data.subarray(chunk_size);
-    chunk += 1;
-    if (timer) {
-      clearTimeout(timer);
-    }
-    timer = setTimeout(
-      () => this._check_chunk_sending(chunk_id, chunk),
-      CHUNK_TIMEOUT
-    );
-    this.send_chunks_in_progress.set(chunk_id, [start_time, data, chunk_size, timer, chunk]);
-    this.send([PACKET_TYPES.send_file_chunk, chunk_id, chunk, cdata, data.length > 0]);
+    this._schedule_chunk_sending_check(chunk_id, upload);
   }
 
   start_command(name, command, ignore) {
@@ -83,6 +83,7 @@ const PACKET_TYPES = {
   configure_display: "configure-display",
   disconnect: "disconnect",
   draw: "draw",
+  encoding: "encoding",
   encodings: "encodings",
   eos: "eos",
   error: "error",
@@ -111,14 +112,17 @@ const PACKET_TYPES = {
   ping_echo: "ping_echo",
   pointer_position: "pointer-position",
   printers: "printers",
+  quality: "quality",
   raise_window: "raise-window",
   resume: "resume",
+  scaling_control: "scaling-control",
   send_file: "send-file",
   send_file_chunk: "send-file-chunk",
   set_clipboard_enabled: "set-clipboard-enabled",
   setting_change: "setting-change",
   sound_control: "sound-control",
   sound_data: "sound-data",
+  speed: "speed",
   startup_complete: "startup-complete",
   start_command: "start-command",
   suspend: "suspend",
@@ -0,0 +1,31 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * The decode port handshake, shared by the decode workers:
+ * draw packets sent to us directly by the protocol worker
+ * are held until the main thread has sent us the ones it received before.
+ */
+
+let decode_port_queue = null;
+
+function set_decode_port(port) {
+  decode_port_queue = [];
+  port.onmessage = function(e) {
+    if (decode_port_queue) {
+      decode_port_queue.push(e);
+    } else {
+      onmessage(e);
+    }
+  };
+}
+
+function sync_decode_port() {
+  const queue = decode_port_queue || [];
+  decode_port_queue = null;
+  for (const e of queue) {
+    onmessage(e);
+  }
+}
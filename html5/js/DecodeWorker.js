@@ -4,14 +4,19 @@
 
 importScripts("./lib/lz4.js");
 importScripts("./RgbHelpers.js");
+importScripts("./DecodePort.js");
 
 const on_hold = new Map();
+// the draw packets we have not sent back yet,
+// reported to the main thread so it can balance the decode workers:
+let queue_depth = 0;
 
 let zerocopy = true;
 
 function decode_eos(wid) {}
 
 function decode_draw_packet(packet, start) {
+  queue_depth++;
   const wid = packet[1];
   const width = packet[4];
   const height = packet[5];
@@ -40,17 +45,21 @@ function decode_draw_packet(packet, start) {
   }
 
   function do_send_back(p, raw_buffers) {
+    queue_depth = Math.max(0, queue_depth - 1);
     self.postMessage({
       draw: p,
-      start
+      start,
+      queue: queue_depth
     }, raw_buffers);
   }
 
   function decode_error(message) {
+    queue_depth = Math.max(0, queue_depth - 1);
     self.postMessage({
       error: `${message}`,
       packet,
-      start
+      start,
+      queue: queue_depth
     });
   }
 
@@ -94,19 +103,21 @@ function decode_draw_packet(packet, start) {
 
   function send_rgb32_back(data, actual_width, actual_height, options) {
     const img = new ImageData(
-      new Uint8ClampedArray(data.buffer),
+      new Uint8ClampedArray(data.buffer, data.byteOffset, actual_width * actual_height * 4),
       actual_width,
       actual_height
     );
     hold();
     createImageBitmap(img, 0, 0, actual_width, actual_height, options).then(
       function(bitmap) {
+        rgb_buffer_pool.release(data);
         packet[6] = "bitmap:rgb32";
         packet[7] = bitmap;
         send_back([bitmap]);
         release();
       },
       function(error) {
+        rgb_buffer_pool.release(data);
         decode_error(
           `failed to create ${actual_width}x${actual_height} rgb32 bitmap from buffer ${data}: ${error}`
         );
@@ -144,7 +155,7 @@ function decode_draw_packet(packet, start) {
         return;
       }
       let buffer = data;
-      if (zerocopy) {
+      if (zerocopy && data.byteLength === data.buffer.byteLength) {
         buffer = data.buffer;
       }
       const blob = new Blob([buffer], {
@@ -340,6 +351,13 @@ onmessage = function(e) {
       break;
     case "close":
       on_hold.clear();
+      queue_depth = 0;
+      break;
+    case "port":
+      set_decode_port(data.port);
+      break;
+    case "port-sync":
+      sync_decode_port();
       break;
     default:
       console.error(`decode worker got unknown message: ${data.cmd}`);
@@ -0,0 +1,141 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * A pool of decode workers.
+ * Each window is assigned to one worker for its whole lifetime,
+ * so its draw packets are still processed in order by a single event loop
+ * (see `on_hold` in DecodeWorker.js and the decode queue in OffscreenDecodeWorker.js).
+ */
+
+// upper limit for the default pool size:
+const MAX_DECODE_WORKERS = 4;
+
+function default_decode_workers() {
+  const cpus = navigator.hardwareConcurrency || 2;
+  //leave one core for the main thread and one for the protocol worker:
+  return Math.max(1, Math.min(MAX_DECODE_WORKERS, cpus - 2));
+}
+
+class XpraDecodeWorkerPool {
+  constructor(script, size) {
+    this.script = script;
+    this.workers = [];
+    for (let index = 0; index < size; index++) {
+      this.workers.push({
+        worker: new Worker(script),
+        windows: new Set(),
+        //as last reported by the worker:
+        queue: 0,
+      });
+    }
+    this.wid_to_worker = new Map();
+    //called with `(wid, index)` when a window is assigned to a worker,
+    //and with `(wid, -1)` when it is removed:
+    this.assign_callback = null;
+  }
+
+  get size() {
+    return this.workers.length;
+  }
+
+  add_message_listener(callback) {
+    //the callback receives the message event and the current index of the worker,
+    //which changes when `compact` drops the workers removed before it:
+    for (const entry of this.workers) {
+      entry.worker.addEventListener("message", (e) => {
+        const queue = e.data["queue"];
+        if (queue !== undefined) {
+          entry.queue = queue;
+        }
+        callback(e, this.workers.indexOf(entry));
+      }, false);
+    }
+  }
+
+  remove_worker(index) {
+    //only used before any windows are assigned (ie: failed checks):
+    const entry = index >= 0 ? this.workers[index] : null;
+    if (!entry || entry.windows.size > 0) {
+      return false;
+    }
+    entry.worker.terminate();
+    this.workers[index] = null;
+    return true;
+  }
+
+  compact() {
+    //drop the workers removed with `remove_worker`:
+    this.workers = this.workers.filter((entry) => entry !== null);
+  }
+
+  assign(wid) {
+    let index = this.wid_to_worker.get(wid);
+    if (index !== undefined) {
+      return index;
+    }
+    //pick the worker with the fewest windows,
+    //then the one with the shortest queue:
+    index = 0;
+    for (let other = 1; other < this.workers.length; other++) {
+      const best = this.workers[index];
+      const entry = this.workers[other];
+      if (
+        entry.windows.size < best.windows.size ||
+        (entry.windows.size === best.windows.size && entry.queue < best.queue)
+      ) {
+        index = other;
+      }
+    }
+    this.workers[index].windows.add(wid);
+    this.wid_to_worker.set(wid, index);
+    if (this.assign_callback) {
+      this.assign_callback(wid, index);
+    }
+    return index;
+  }
+
+  post(wid, message, transfer) {
+    const index = this.assign(wid);
+    this.workers[index].worker.postMessage(message, transfer || []);
+  }
+
+  post_all(message) {
+    for (const entry of this.workers) {
+      entry.worker.postMessage(message);
+    }
+  }
+
+  remove(wid) {
+    const index = this.wid_to_worker.get(wid);
+    if (index === undefined) {
+      return;
+    }
+    const entry = this.workers[index];
+    entry.worker.postMessage({cmd: "remove", wid});
+    entry.windows.delete(wid);
+    this.wid_to_worker.delete(wid);
+    //the next windows will be assigned to the least busy workers:
+    if (this.assign_callback) {
+      this.assign_callback(wid, -1);
+    }
+  }
+
+  close() {
+    for (const entry of this.workers) {
+      entry.worker.postMessage({cmd: "close"});
+      entry.worker.terminate();
+    }
+    this.workers = [];
+    this.wid_to_worker.clear();
+  }
+
+  get_queue_depths() {
+    return this.workers.map((entry) => ({
+      windows: entry.windows.size,
+      queue: entry.queue,
+    }));
+  }
+}
@@ -0,0 +1,228 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Adaptive encoding:
+ * lowers the quality and raises the speed requested from the server
+ * when the client does not keep up with the screen updates,
+ * and restores the user's settings once it does again.
+ */
+
+// how often we evaluate the client's performance:
+const ADAPTIVE_ENCODING_INTERVAL = 1000;
+// the number of consecutive evaluations before changing level,
+// we degrade quickly but only recover slowly to avoid oscillating:
+const ADAPTIVE_DEGRADE_COUNT = 2;
+const ADAPTIVE_RESTORE_COUNT = 10;
+// weight of new values in the moving averages:
+const ADAPTIVE_EWMA_WEIGHT = 0.2;
+// frames further apart than this are not part of a stream:
+const ADAPTIVE_MAX_FRAME_INTERVAL = 1000;
+
+// the settings requested at each level, level 0 uses the user's settings,
+// `scaling` is the server's video scaling control (0 to 100)
+// and `video_max_size` the divisor applied to the video size we advertise:
+const ADAPTIVE_ENCODING_LEVELS = [
+  {},
+  {quality: 70, speed: 70},
+  {quality: 50, speed: 85, scaling: 50, lossy: true},
+  {quality: 30, speed: 100, scaling: 100, lossy: true, video_max_size: 2},
+];
+// the scaling control we go back to when the user did not set one,
+// the server cannot be asked to decide again once we have set it:
+const ADAPTIVE_DEFAULT_SCALING = 0;
+// encodings that are too expensive to decode for a struggling client,
+// we let the server choose instead:
+const ADAPTIVE_EXPENSIVE_ENCODINGS = ["png", "rgb", "rgb24", "rgb32", "webp", "avif"];
+
+class XpraEncodingController {
+  constructor(client) {
+    this.client = client;
+    this.timer = 0;
+    this.level = 0;
+    this.baseline = null;
+    // the values last sent to the server:
+    this.current = null;
+    // consecutive evaluations above and below the thresholds:
+    this.overloaded = 0;
+    this.idle = 0;
+    // moving averages, in milliseconds:
+    this.decode_time = 0;
+    this.frame_lateness = 0;
+    // wid -> [last frame time, average interval]
+    this.frames = new Map();
+    this.throttled = 0;
+  }
+
+  start() {
+    if (this.timer) {
+      return;
+    }
+    const options = this.client.encoding_options;
+    const option = (name) => (options[name] >= 0 ? options[name] : -1);
+    //keep the video size advertised before we ever reduced it:
+    const video_max_size = this.baseline ? this.baseline.video_max_size : options["video_max_size"];
+    this.baseline = {
+      quality: option("quality"),
+      speed: option("speed"),
+      encoding: this.client.encoding,
+      //`null` lets the server decide:
+      scaling: options["scaling.control"] >= 0 ? options["scaling.control"] : null,
+      video_max_size,
+    };
+    this.current = Object.assign({}, this.baseline, {video_max_size: options["video_max_size"]});
+    this.level = 0;
+    this.overloaded = 0;
+    this.idle = 0;
+    this.decode_time = 0;
+    this.frame_lateness = 0;
+    this.frames.clear();
+    this.throttled = this.client.telemetry.counters.get("video.throttled") || 0;
+    this.timer = setInterval(() => this.evaluate(), ADAPTIVE_ENCODING_INTERVAL);
+  }
+
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = 0;
+    }
+  }
+
+  on_frame(wid, decode_time) {
+    //called for each frame decoded, with its decode time in milliseconds
+    if (!this.timer) {
+      return;
+    }
+    this.decode_time += (decode_time - this.decode_time) * ADAPTIVE_EWMA_WEIGHT;
+    const now = performance.now();
+    const frame = this.frames.get(wid);
+    if (!frame) {
+      this.frames.set(wid, [now, 0]);
+      return;
+    }
+    const interval = now - frame[0];
+    frame[0] = now;
+    if (interval < ADAPTIVE_MAX_FRAME_INTERVAL) {
+      frame[1] = frame[1] ? frame[1] + (interval - frame[1]) * ADAPTIVE_EWMA_WEIGHT : interval;
+    }
+  }
+
+  on_animation_frame(delay) {
+    //the time between requesting an animation frame and getting it
+    this.frame_lateness += (delay - this.frame_lateness) * ADAPTIVE_EWMA_WEIGHT;
+  }
+
+  get_frame_interval() {
+    //the shortest interval between frames of the windows updated recently:
+    const now = performance.now();
+    let interval = 0;
+    for (const [wid, [last, average]] of this.frames) {
+      if (now - last > ADAPTIVE_MAX_FRAME_INTERVAL) {
+        this.frames.delete(wid);
+      } else if (average > 0 && (interval === 0 || average < interval)) {
+        interval = average;
+      }
+    }
+    return interval;
+  }
+
+  evaluate() {
+    const client = this.client;
+    const queue = client.get_decode_queue_length() + client.get_paint_queue_length();
+    const interval = this.get_frame_interval();
+    //the fraction of the frame interval spent decoding:
+    const decode_ratio = interval > 0 ? this.decode_time / interval : 0;
+    //how many display refreshes late the animation frames are:
+    const vrefresh = client.vrefresh > 0 ? client.vrefresh : 60;
+    const lateness = this.frame_lateness * vrefresh / 1000;
+    //the video decoder drops frames when it falls behind:
+    const throttled_total = client.telemetry.counters.get("video.throttled") || 0;
+    const throttled = throttled_total - this.throttled;
+    this.throttled = throttled_total;
+    client.debug("draw", "adaptive encoding level", this.level, ": queue=", queue,
+      "decode ratio=", decode_ratio, "lateness=", lateness, "throttled=", throttled);
+    if (throttled > 0 || queue > 2 || decode_ratio > 0.8 || lateness > 2) {
+      this.idle = 0;
+      if (++this.overloaded >= ADAPTIVE_DEGRADE_COUNT) {
+        this.overloaded = 0;
+        this.set_level(this.level + 1);
+      }
+    } else if (queue === 0 && decode_ratio < 0.4 && lateness < 1) {
+      this.overloaded = 0;
+      if (++this.idle >= ADAPTIVE_RESTORE_COUNT) {
+        this.idle = 0;
+        this.set_level(this.level - 1);
+      }
+    } else {
+      //in between the thresholds: stay where we are
+      this.overloaded = 0;
+      this.idle = 0;
+    }
+  }
+
+  set_level(level) {
+    level = Math.max(0, Math.min(ADAPTIVE_ENCODING_LEVELS.length - 1, level));
+    if (level === this.level) {
+      return;
+    }
+    this.client.clog("adaptive encoding level changed from", this.level, "to", level);
+    this.level = level;
+    this.apply(ADAPTIVE_ENCODING_LEVELS[level]);
+  }
+
+  apply(settings) {
+    const client = this.client;
+    const baseline = this.baseline;
+    //never ask for a better quality or a slower speed than the user did:
+    let quality = baseline.quality;
+    if (settings.quality !== undefined) {
+      quality = quality >= 0 ? Math.min(quality, settings.quality) : settings.quality;
+    }
+    let speed = baseline.speed;
+    if (settings.speed !== undefined) {
+      speed = Math.max(speed, settings.speed);
+    }
+    let encoding = baseline.encoding;
+    if (settings.lossy && ADAPTIVE_EXPENSIVE_ENCODINGS.includes(encoding)) {
+      encoding = "auto";
+    }
+    let scaling = settings.scaling === undefined ? baseline.scaling : Math.max(baseline.scaling || 0, settings.scaling);
+    const current = this.current;
+    if (scaling === null && current.scaling !== null) {
+      scaling = ADAPTIVE_DEFAULT_SCALING;
+    }
+    let video_max_size = baseline.video_max_size;
+    if (settings.video_max_size && video_max_size) {
+      video_max_size = video_max_size.map((value) => Math.round(value / settings.video_max_size));
+    }
+    if (quality !== current.quality) {
+      client.send([PACKET_TYPES.quality, quality]);
+    }
+    if (speed !== current.speed) {
+      client.send([PACKET_TYPES.speed, speed]);
+    }
+    if (encoding !== current.encoding) {
+      client.send([PACKET_TYPES.encoding, encoding]);
+    }
+    if (scaling !== current.scaling) {
+      client.send([PACKET_TYPES.scaling_control, scaling]);
+    }
+    if (video_max_size !== current.video_max_size) {
+      //only used for new connections, the scaling control resizes the current video streams:
+      client.set_encoding_option("video_max_size", video_max_size);
+    }
+    this.current = {quality, speed, encoding, scaling, video_max_size};
+  }
+
+  get_info() {
+    return {
+      level: this.level,
+      "decode-time": Math.round(this.decode_time * 10) / 10,
+      "frame-interval": Math.round(this.get_frame_interval() * 10) / 10,
+      "frame-lateness": Math.round(this.frame_lateness * 10) / 10,
+      settings: this.current,
+    };
+  }
+}
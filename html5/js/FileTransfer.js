@@ -0,0 +1,290 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Streaming file transfers:
+ * uploads are read from the file one chunk at a time,
+ * with a window of chunks waiting for their acknowledgement,
+ * downloads are written out as the chunks arrive
+ * and their checksum is updated incrementally.
+ */
+
+// the number of chunks we can send before waiting for their acks:
+const FILE_CHUNKS_WINDOW = 8;
+
+const SHA256_K = new Uint32Array([
+  0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+  0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+  0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+  0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+  0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+  0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+  0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+  0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+]);
+
+/*
+SHA-256 of a stream of bytes,
+`crypto.subtle` can only hash the whole file at once.
+*/
+class XpraSHA256 {
+  constructor() {
+    this.algorithm = "sha256";
+    this.state = Uint32Array.of(
+      0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+    );
+    this.words = new Uint32Array(64);
+    this.block = new Uint8Array(64);
+    this.block_length = 0;
+    this.length = 0;
+  }
+
+  update(data) {
+    this.length += data.length;
+    let offset = 0;
+    if (this.block_length > 0) {
+      //complete the partial block first:
+      offset = Math.min(64 - this.block_length, data.length);
+      this.block.set(data.subarray(0, offset), this.block_length);
+      this.block_length += offset;
+      if (this.block_length < 64) {
+        return;
+      }
+      this.process_block(this.block, 0);
+      this.block_length = 0;
+    }
+    while (offset + 64 <= data.length) {
+      this.process_block(data, offset);
+      offset += 64;
+    }
+    if (offset < data.length) {
+      this.block.set(data.subarray(offset), 0);
+      this.block_length = data.length - offset;
+    }
+  }
+
+  process_block(data, offset) {
+    const w = this.words;
+    for (let index = 0; index < 16; index++) {
+      const pos = offset + index * 4;
+      w[index] = (data[pos] << 24) | (data[pos + 1] << 16) | (data[pos + 2] << 8) | data[pos + 3];
+    }
+    for (let index = 16; index < 64; index++) {
+      const w15 = w[index - 15];
+      const w2 = w[index - 2];
+      const s0 = ((w15 >>> 7) | (w15 << 25)) ^ ((w15 >>> 18) | (w15 << 14)) ^ (w15 >>> 3);
+      const s1 = ((w2 >>> 17) | (w2 << 15)) ^ ((w2 >>> 19) | (w2 << 13)) ^ (w2 >>> 10);
+      w[index] = w[index - 16] + s0 + w[index - 7] + s1;
+    }
+    const state = this.state;
+    let [a, b, c, d, e, f, g, h] = state;
+    for (let index = 0; index < 64; index++) {
+      const S1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+      const ch = (e & f) ^ (~e & g);
+      const t1 = (h + S1 + ch + SHA256_K[index] + w[index]) | 0;
+      const S0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+      const maj = (a & b) ^ (a & c) ^ (b & c);
+      const t2 = (S0 + maj) | 0;
+      h = g;
+      g = f;
+      f = e;
+      e = (d + t1) | 0;
+      d = c;
+      c = b;
+      b = a;
+      a = (t1 + t2) | 0;
+    }
+    state[0] += a;
+    state[1] += b;
+    state[2] += c;
+    state[3] += d;
+    state[4] += e;
+    state[5] += f;
+    state[6] += g;
+    state[7] += h;
+  }
+
+  digest() {
+    //can only be called once, after all the data has been added
+    const bit_length = this.length * 8;
+    //0x80, zeros up to 8 bytes before a block boundary, then the length:
+    const padding = new Uint8Array(((this.block_length + 72) & ~63) - this.block_length);
+    padding[0] = 0x80;
+    const view = new DataView(padding.buffer);
+    view.setUint32(padding.length - 8, Math.floor(bit_length / 0x1_00_00_00_00));
+    view.setUint32(padding.length - 4, bit_length >>> 0);
+    this.update(padding);
+    const value = new Uint8Array(32);
+    const output = new DataView(value.buffer);
+    this.state.forEach((word, index) => output.setUint32(index * 4, word));
+    return value;
+  }
+}
+
+/*
+Sends a file one chunk at a time, without reading all of it in memory.
+*/
+class XpraFileUpload {
+  constructor(client, chunk_id, blob, chunk_size) {
+    this.client = client;
+    this.chunk_id = chunk_id;
+    this.blob = blob;
+    this.chunk_size = chunk_size;
+    this.start_time = performance.now();
+    //the next byte to read from the file:
+    this.offset = 0;
+    //the `send-file` packet is chunk 0:
+    this.sent = 0;
+    this.acked = -1;
+    this.reading = false;
+    this.cancelled = false;
+    this.timer = 0;
+  }
+
+  is_complete() {
+    return this.offset >= this.blob.size && this.acked === this.sent;
+  }
+
+  ack(chunk) {
+    //returns false if the chunk is not the one we expected
+    if (chunk !== this.acked + 1 || chunk > this.sent) {
+      return false;
+    }
+    this.acked = chunk;
+    this.send_chunks();
+    return true;
+  }
+
+  send_chunks() {
+    //reads the next chunk if the window is not full,
+    //the chunks are read one at a time so they are sent in order
+    if (this.reading || this.cancelled) {
+      return;
+    }
+    if (this.offset >= this.blob.size || this.sent - this.acked >= FILE_CHUNKS_WINDOW) {
+      return;
+    }
+    this.reading = true;
+    const end = Math.min(this.blob.size, this.offset + this.chunk_size);
+    this.blob.slice(this.offset, end).arrayBuffer().then(
+      (buffer) => {
+        this.reading = false;
+        if (this.cancelled) {
+          return;
+        }
+        this.offset = end;
+        this.sent += 1;
+        const has_more = end < this.blob.size;
+        this.client.send([PACKET_TYPES.send_file_chunk, this.chunk_id, this.sent, new Uint8Array(buffer), has_more]);
+        this.send_chunks();
+      },
+      (error) => {
+        this.reading = false;
+        this.client.error("failed to read file data:", error);
+        this.client.cancel_sending(this.chunk_id, `failed to read file data: ${error}`);
+      }
+    );
+  }
+
+  cancel() {
+    this.cancelled = true;
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = 0;
+    }
+  }
+}
+
+/*
+Receives a file one chunk at a time,
+either streaming it to disk or collecting the chunks in a `Blob`.
+*/
+class XpraFileDownload {
+  constructor(filename, mimetype, printit, filesize, options) {
+    this.filename = filename;
+    this.mimetype = mimetype;
+    this.printit = printit;
+    this.filesize = filesize;
+    this.options = options;
+    this.start_time = performance.now();
+    this.writer = null;
+    //used when we cannot stream to disk:
+    this.parts = null;
+    this.digest = options["sha256"] ? new XpraSHA256() : null;
+    this.received = 0;
+    this.chunk = 0;
+    this.cancelled = false;
+    this.timer = 0;
+  }
+
+  open(use_stream) {
+    //returns the error if we had to fall back to a blob
+    if (use_stream) {
+      try {
+        streamSaver.mitm = "./mitm.html";
+        const file_stream = streamSaver.createWriteStream(this.filename, {
+          size: this.filesize,
+        });
+        this.writer = file_stream.getWriter();
+        return null;
+      } catch (error) {
+        this.parts = [];
+        return error;
+      }
+    }
+    this.parts = [];
+    return null;
+  }
+
+  write(data) {
+    //returns a promise if the data is written asynchronously
+    this.received += data.length;
+    if (this.digest) {
+      this.digest.update(data);
+    }
+    if (this.writer) {
+      return this.writer.write(data);
+    }
+    this.parts.push(data);
+    return null;
+  }
+
+  can_receive() {
+    //the stream writer tells us when its queue is full:
+    return !this.writer || this.writer.desiredSize === null || this.writer.desiredSize > 0;
+  }
+
+  verify_digest() {
+    //returns an error message, if the checksum does not match
+    if (!this.digest) {
+      return "";
+    }
+    const expected = Utilities.s(this.options["sha256"]).toLowerCase();
+    const value = Utilities.convertToHex(this.digest.digest());
+    if (value !== expected) {
+      return `sha256 checksum mismatch: expected ${expected} but got ${value}`;
+    }
+    return "";
+  }
+
+  get_blob() {
+    return new Blob(this.parts, {
+      type: this.mimetype,
+    });
+  }
+
+  cancel() {
+    this.cancelled = true;
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = 0;
+    }
+    if (this.writer) {
+      this.writer.abort().catch(() => null);
+      this.writer = null;
+    }
+    this.parts = null;
+  }
+}
@@ -7,14 +7,86 @@
  *
  */
 
+function image_mimetype(encoding) {
+  if (encoding === "svg") {
+    return "image/svg+xml";
+  }
+  return `image/${encoding}`;
+}
+
+function image_blob(encoding, data) {
+  return new Blob([data], {
+    type: image_mimetype(encoding),
+  });
+}
+
+/*
+Holds at most one object URL,
+the previous one is revoked when it is replaced.
+*/
+class XpraObjectURL {
+  constructor() {
+    this.url = null;
+  }
+
+  set(blob) {
+    this.revoke();
+    this.url = URL.createObjectURL(blob);
+    return this.url;
+  }
+
+  revoke() {
+    if (this.url) {
+      URL.revokeObjectURL(this.url);
+      this.url = null;
+    }
+  }
+}
+
 class XpraImageDecoder {
+  /*
+  Decode compressed image data (ie: "png", "jpeg", "webp")
+  into an object that can be passed to `drawImage`.
+  Uses `createImageBitmap` when available,
+  otherwise falls back to loading an object URL into an image element.
+  */
+  decode(encoding, data, bitmap_options) {
+    const blob = image_blob(encoding, data);
+    if (typeof createImageBitmap === "function") {
+      return createImageBitmap(blob, bitmap_options || {});
+    }
+    return new Promise((resolve, reject) => {
+      const image = new Image();
+      const url = URL.createObjectURL(blob);
+      image.addEventListener("load", () => {
+        URL.revokeObjectURL(url);
+        if (image.width === 0 || image.height === 0) {
+          reject(new Error(`invalid image size: ${image.width}x${image.height}`));
+        } else {
+          resolve(image);
+        }
+      });
+      image.addEventListener("error", () => {
+        URL.revokeObjectURL(url);
+        reject(new Error(`failed to load ${encoding} image`));
+      });
+      image.src = url;
+    });
+  }
+
   async convertToBitmap(packet) {
     const width = packet[4];
     const height = packet[5];
     const coding = packet[6];
     if (coding.startsWith("rgb")) {
       const data = decode_rgb(packet);
-      const bitmap = await createImageBitmap(new ImageData(new Uint8ClampedArray(data.buffer), width, height), 0, 0, width, height);
+      const pixels = new Uint8ClampedArray(data.buffer, data.byteOffset, width * height * 4);
+      let bitmap;
+      try {
+        bitmap = await createImageBitmap(new ImageData(pixels, width, height), 0, 0, width, height);
+      } finally {
+        rgb_buffer_pool.release(data);
+      }
       packet[6] = `bitmap:${coding}`;
       packet[7] = bitmap;
     } else {
@@ -29,10 +101,7 @@ class XpraImageDecoder {
         bitmap_options.resizeQuality = options["scaling-quality"] || "medium";
       }
 
-      const blob = new Blob([packet[7].buffer], {
-        type: `image/${paint_coding}`,
-      });
-      const bitmap = await createImageBitmap(blob, bitmap_options);
+      const bitmap = await this.decode(paint_coding, packet[7], bitmap_options);
       packet[6] = `bitmap:${coding}`;
       packet[7] = bitmap;
     }
@@ -0,0 +1,100 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Loads the optional parts of the client the first time they are needed,
+ * so that the page does not have to parse them at startup.
+ */
+
+/*
+The scripts are loaded in this order,
+setup.py reads this table when bundling the client,
+so it must remain valid JSON.
+*/
+const LAZY_MODULES = {
+  "keyboard": {
+    "scripts": ["js/lib/simple-keyboard.js"],
+    "styles": ["css/simple-keyboard.css"]
+  },
+  "preview": {
+    "scripts": ["js/lib/slick.js"],
+    "styles": ["css/slick.css"]
+  },
+  "aurora": {
+    "scripts": ["js/lib/aurora/aurora.js", "js/lib/aurora/aurora-xpra.js"]
+  },
+  "file_transfer": {
+    "scripts": ["js/lib/web-streams-ponyfill.es6.js", "js/lib/StreamSaver.js", "js/lib/FileSaver.js", "js/FileTransfer.js"]
+  },
+  "keysyms": {
+    "scripts": ["js/Keysyms.js"]
+  }
+};
+
+const LazyModules = {
+  // module name -> promise
+  loading: {},
+  loaded: new Set(),
+
+  get_scripts(name) {
+    //setup.py replaces the scripts with a single bundle:
+    const chunks = typeof LAZY_MODULE_CHUNKS === "undefined" ? {} : LAZY_MODULE_CHUNKS;
+    if (name in chunks) {
+      return [chunks[name]];
+    }
+    return LAZY_MODULES[name].scripts;
+  },
+
+  add_stylesheet(href) {
+    const link = document.createElement("link");
+    link.rel = "stylesheet";
+    link.type = "text/css";
+    link.href = href;
+    document.head.append(link);
+  },
+
+  add_script(src) {
+    return new Promise((resolve, reject) => {
+      const script = document.createElement("script");
+      script.type = "text/javascript";
+      //execute the scripts in the order they were added:
+      script.async = false;
+      script.src = src;
+      script.addEventListener("load", () => resolve());
+      script.addEventListener("error", () => reject(new Error(`failed to load ${src}`)));
+      document.head.append(script);
+    });
+  },
+
+  is_loaded(name) {
+    return this.loaded.has(name);
+  },
+
+  load(name) {
+    //returns a promise, which resolves once all the scripts have been executed
+    let promise = this.loading[name];
+    if (promise) {
+      return promise;
+    }
+    const module = LAZY_MODULES[name];
+    if (!module) {
+      return Promise.reject(new Error(`unknown module ${name}`));
+    }
+    Utilities.log("loading module", name);
+    for (const href of module.styles || []) {
+      this.add_stylesheet(href);
+    }
+    const scripts = this.get_scripts(name).map((src) => this.add_script(src));
+    promise = Promise.all(scripts).then(() => {
+      this.loaded.add(name);
+    }, (error) => {
+      //allow the next call to try again:
+      delete this.loading[name];
+      throw error;
+    });
+    this.loading[name] = promise;
+    return promise;
+  },
+};
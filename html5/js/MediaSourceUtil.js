@@ -99,6 +99,12 @@ const MediaSourceConstants = {
     flac: "flac",
     "aac+mpeg4": "mp4a",
   },
+
+  //decoded in a worker and played through an AudioWorklet, see AudioPlayer.js
+  WEBCODECS_CODECS: {
+    opus: "opus",
+    wav: "pcm",
+  },
 };
 
 const MediaSourceUtil = {
@@ -117,7 +123,8 @@ const MediaSourceUtil = {
   getAuroraAudioCodecs() {
     const codecs_supported = new Map();
     const codecs_failed = new Map();
-    if (AV && AV.Decoder && AV.Decoder.find) {
+    //the aurora framework may not have been loaded:
+    if (typeof AV !== "undefined" && AV.Decoder && AV.Decoder.find) {
       for (const codec_option in MediaSourceConstants.AURORA_CODECS) {
         const codec_string = MediaSourceConstants.AURORA_CODECS[codec_option];
         // eslint-disable-next-line unicorn/no-array-callback-reference
@@ -134,6 +141,16 @@ const MediaSourceUtil = {
     return codecs_supported;
   },
 
+  getWebCodecsAudioCodecs() {
+    if (typeof AudioDecoder === "undefined" || typeof AudioWorkletNode === "undefined" || typeof Worker === "undefined") {
+      Utilities.log("audio forwarding: no WebCodecs or AudioWorklet support");
+      return {};
+    }
+    const codecs_supported = Object.assign({}, MediaSourceConstants.WEBCODECS_CODECS);
+    Utilities.log("audio codec WebCodecs supported:", codecs_supported);
+    return codecs_supported;
+  },
+
   getMediaSourceAudioCodecs(ignore_blacklist) {
     const media_source_class = MediaSourceUtil.getMediaSourceClass();
     if (!media_source_class) {
@@ -284,8 +301,14 @@ const MediaSourceUtil = {
     });
   },
 
-  get_supported_codecs(mediasource, aurora, ignore_audio_blacklist) {
+  get_supported_codecs(mediasource, aurora, ignore_audio_blacklist, webcodecs) {
     const codecs_supported = {};
+    if (webcodecs) {
+      const webcodecs_codecs = MediaSourceUtil.getWebCodecsAudioCodecs();
+      for (const codec_option in webcodecs_codecs) {
+        codecs_supported[`webcodecs:${codec_option}`] = `low latency: ${MediaSourceConstants.CODEC_DESCRIPTION[codec_option]}`;
+      }
+    }
     if (mediasource) {
       const mediasource_codecs = MediaSourceUtil.getMediaSourceAudioCodecs(ignore_audio_blacklist);
       for (const codec_option in mediasource_codecs) {
@@ -307,12 +330,20 @@ const MediaSourceUtil = {
   },
 
   get_best_codec(codecs_supported) {
+    const preferred = MediaSourceConstants.PREFERRED_CODEC_ORDER;
     let best_codec = null;
-    let best_distance = MediaSourceConstants.PREFERRED_CODEC_ORDER.length;
+    let best_distance = preferred.length;
     for (const codec_option in codecs_supported) {
-      const cs = codec_option.split(":")[1];
-      const distance = MediaSourceConstants.PREFERRED_CODEC_ORDER.indexOf(cs);
-      if (distance >= 0 && distance < best_distance) {
+      const [framework, cs] = codec_option.split(":");
+      let distance = preferred.indexOf(cs);
+      if (distance < 0) {
+        continue;
+      }
+      if (framework === "webcodecs") {
+        //lower latency than any of the other frameworks:
+        distance -= preferred.length;
+      }
+      if (distance < best_distance) {
         best_codec = codec_option;
         best_distance = distance;
       }
@@ -16,10 +16,16 @@ importScripts("./VideoDecoder.js");
 importScripts("./ImageDecoder.js");
 importScripts("./RgbHelpers.js");
 importScripts("./Constants.js");
+importScripts("./ScrollPainter.js");
+importScripts("./DecodePort.js");
 
 // WindowDecoder for each window we have control over:
 const window_decoders = new Map();
 
+// Draw packets forwarded by the protocol worker can arrive before the window's canvas:
+const pending_draws = new Map();
+const PENDING_DRAW_TIMEOUT = 2000;
+
 // You can change this delay to test decode worker initialization timeouts:
 const ACK_DELAY = 0;
 
@@ -50,23 +56,62 @@ const all_encodings = new Set([
   ...video_coding,
 ]);
 
+function get_queue_depth() {
+  //the draw packets we have not painted yet,
+  //reported to the main thread so it can balance the decode workers:
+  let depth = 0;
+  for (const decoder of window_decoders.values()) {
+    depth += decoder.decode_queue.length;
+  }
+  for (const pending of pending_draws.values()) {
+    depth += pending.packets.length;
+  }
+  return depth;
+}
+
 function send_decode_error(packet, error) {
   packet[7] = null;
   self.postMessage({
     error: `${error}`,
-    packet
+    packet,
+    queue: get_queue_depth()
   });
 }
 
+function hold_draw_packet(packet) {
+  const wid = packet[1];
+  let pending = pending_draws.get(wid);
+  if (!pending) {
+    const packets = [];
+    const timer = setTimeout(() => {
+      pending_draws.delete(wid);
+      for (const held of packets) {
+        send_decode_error(held, `no window decoder found for wid ${wid}`);
+      }
+    }, PENDING_DRAW_TIMEOUT);
+    pending = {packets, timer};
+    pending_draws.set(wid, pending);
+  }
+  pending.packets.push(packet);
+}
+
+function release_draw_packets(wid, decoder) {
+  const pending = pending_draws.get(wid);
+  if (pending) {
+    clearTimeout(pending.timer);
+    pending_draws.delete(wid);
+    for (const packet of pending.packets) {
+      decoder.queue_draw_packet(packet);
+    }
+  }
+}
 
 class WindowDecoder {
   constructor(wid, canvas, debug) {
     this.wid = wid;
     this.canvas = canvas;
     this.context = this.canvas.getContext("2d");
-    // lazily allocated by `get_snapshot`, for painting 'scroll' packets:
-    this.scratch_canvas = null;
-    this.scratch_context = null;
+    this.scroll_painter = new XpraScrollPainter();
     this.debug = debug;
 
     this.image_decoder = new XpraImageDecoder();
@@ -144,6 +189,11 @@ class WindowDecoder {
     const options = packet[10] || {};
     const decode_time = Math.round(1000 * (performance.now() - start));
     options["decode_time"] = Math.max(0, decode_time);
+    // for the client's telemetry:
+    options["coding"] = coding;
+    if (packet[6] === "throttle") {
+      options["throttled"] = true;
+    }
     // Copy without data
     const clonepacket = packet.map((x, i) => {
       if (i !== 7) {
@@ -156,7 +206,8 @@ class WindowDecoder {
     // Tell the server we are done with this packet
     self.postMessage({
       draw: clonepacket,
-      start
+      start,
+      queue: get_queue_depth()
     });
 
     // Paint the packet on screen refresh (if we can use requestAnimationFrame in the worker)
@@ -198,25 +249,6 @@ class WindowDecoder {
     }
   }
 
-  get_snapshot() {
-    // All the rectangles of a 'scroll' packet are relative to the same
-    // reference picture: the window contents as they were before any of them
-    // was applied. The list is not ordered so that it can be applied in place,
-    // so we must blit every rectangle from a copy taken before the first one.
-    const canvas = this.canvas;
-    let scratch = this.scratch_canvas;
-    if (!scratch || scratch.width !== canvas.width || scratch.height !== canvas.height) {
-      scratch = new OffscreenCanvas(canvas.width, canvas.height);
-      this.scratch_canvas = scratch;
-      this.scratch_context = scratch.getContext("2d");
-      this.scratch_context.imageSmoothingEnabled = false;
-    }
-    const scratch_context = this.scratch_context;
-    scratch_context.clearRect(0, 0, scratch.width, scratch.height);
-    scratch_context.drawImage(canvas, 0, 0);
-    return scratch;
-  }
-
   do_paint_packet(wid, coding, image, x, y, width, height) {
     // Update the coding propery
     if (!this.canvas) {
@@ -230,20 +262,8 @@ class WindowDecoder {
       context.drawImage(image, 0, 0, width, height, x, y, width, height);
       this.paint_box(coding, context, x, y, width, height);
     } else if (coding === "scroll") {
-      const snapshot = this.get_snapshot();
-      context.imageSmoothingEnabled = false;
-      for (let index = 0, stop = image.length; index < stop; ++index) {
-        const scroll_data = image[index];
-        const sx = scroll_data[0];
-        const sy = scroll_data[1];
-        const sw = scroll_data[2];
-        const sh = scroll_data[3];
-        const xdelta = scroll_data[4];
-        const ydelta = scroll_data[5];
-        context.drawImage(snapshot,
-            sx, sy, sw, sh,
-            sx + xdelta, sy + ydelta, sw, sh,
-        );
+      this.scroll_painter.paint(context, image, null);
+      for (const [sx, sy, sw, sh] of image) {
         this.paint_box(coding, context, sx, sy, sw, sh);
       }
     } else if (coding.startsWith("frame")) {
@@ -285,8 +305,7 @@ class WindowDecoder {
   close() {
     this.eos();
     this.canvas = null;
-    this.scratch_canvas = null;
-    this.scratch_context = null;
+    this.scroll_painter = new XpraScrollPainter();
     this.decode_queue = [];
     this.decode_queue_draining = true;
   }
@@ -328,6 +347,8 @@ onmessage = function(e) {
       wd = window_decoders.get(wid);
       if (wd) {
         wd.queue_draw_packet(packet);
+      } else if (data.forwarded) {
+        hold_draw_packet(packet);
       } else {
         send_decode_error(packet,
           `no window decoder found for wid ${wid}, only:${[...window_decoders.keys(),].join(",")}`
@@ -344,10 +365,9 @@ onmessage = function(e) {
     case "canvas":
       console.log("canvas transfer for window", data.wid, ":", data.canvas, data.debug);
       if (data.canvas) {
-        window_decoders.set(
-          data.wid,
-          new WindowDecoder(data.wid, data.canvas, data.debug)
-        );
+        wd = new WindowDecoder(data.wid, data.canvas, data.debug);
+        window_decoders.set(data.wid, wd);
+        release_draw_packets(data.wid, wd);
       }
       break;
     case "canvas-geo":
@@ -361,6 +381,16 @@ onmessage = function(e) {
         decoder.close();
       }
       window_decoders.clear();
+      for (const pending of pending_draws.values()) {
+        clearTimeout(pending.timer);
+      }
+      pending_draws.clear();
+      break;
+    case "port":
+      set_decode_port(data.port);
+      break;
+    case "port-sync":
+      sync_decode_port();
       break;
     default:
       console.error(`Offscreen decode worker got unknown message: ${data.cmd}`);
@@ -13,6 +13,7 @@
  * requires:
  *  lz4.js
  *  brotli_decode.js
+ *  WebTransport.js (in the worker)
  */
 
 const CONNECT_TIMEOUT = 15_000;
@@ -25,6 +26,10 @@ class XpraProtocolWorkerHost {
   constructor() {
     this.worker = null;
     this.packet_handler = null;
+    this.decode_workers = null;
+    this.trace_callback = null;
+    //bytes waiting in the worker's receive queue, as of the last packet:
+    this.receive_queue_size = 0;
   }
 
   open(uri) {
@@ -49,13 +54,29 @@ class XpraProtocolWorkerHost {
             });
             break;
           case "p":
+            this.receive_queue_size = data.q;
             if (this.packet_handler) {
-              this.packet_handler(data.p);
+              this.packet_handler(data.p, data.t);
             }
             break;
           case "l":
             console.log(data.t);
             break;
+          case "S":
+            if (this.trace_callback) {
+              this.trace_callback(data.d);
+              this.trace_callback = null;
+            }
+            break;
+          case "f":
+            //all the draw packets received before forwarding started
+            //have now been sent to the decode workers by the main thread:
+            if (this.decode_workers) {
+              this.decode_workers.post_all({
+                cmd: "port-sync"
+              });
+            }
+            break;
           default:
             console.error("got unknown command from worker");
             console.error(e.data);
@@ -78,16 +99,83 @@ class XpraProtocolWorkerHost {
   };
 
   send = function(packet) {
+    //structured cloning a view clones its whole ArrayBuffer (ie: file chunks),
+    //so copy just the bytes we need and transfer those instead:
+    const transfer = [];
+    for (let index = 0; index < packet.length; index++) {
+      const value = packet[index];
+      if (value instanceof Uint8Array && value.byteLength !== value.buffer.byteLength) {
+        if (transfer.length === 0) {
+          packet = packet.slice();
+        }
+        packet[index] = value.slice();
+        transfer.push(packet[index].buffer);
+      }
+    }
     this.worker.postMessage({
       c: "s",
       p: packet
+    }, transfer);
+  };
+
+  forward_draw_packets = function(decode_workers) {
+    /*
+     * send the draw packets straight from the protocol worker
+     * to the decode workers, without going through the main thread
+     */
+    this.decode_workers = decode_workers;
+    const ports = [];
+    decode_workers.workers.forEach((entry) => {
+      const channel = new MessageChannel();
+      entry.worker.postMessage({
+        cmd: "port",
+        port: channel.port1
+      }, [channel.port1]);
+      ports.push(channel.port2);
     });
+    this.worker.postMessage({
+      c: "d",
+      p: ports,
+      o: performance.timeOrigin
+    }, ports);
+    //tell the protocol worker which decode worker handles each window:
+    decode_workers.assign_callback = (wid, index) => {
+      this.worker.postMessage({
+        c: "a",
+        w: wid,
+        i: index
+      });
+    };
+    for (const [wid, index] of decode_workers.wid_to_worker) {
+      decode_workers.assign_callback(wid, index);
+    }
+    return true;
   };
 
   set_packet_handler = function(callback) {
     this.packet_handler = callback;
   };
 
+  start_trace = function() {
+    this.worker.postMessage({
+      c: "T"
+    });
+  };
+
+  stop_trace = function(callback) {
+    this.trace_callback = callback;
+    this.worker.postMessage({
+      c: "S"
+    });
+  };
+
+  set_compressor = function(compressor) {
+    this.worker.postMessage({
+      c: "k",
+      p: compressor
+    });
+  };
+
   set_cipher_in = function(caps, key) {
     this.worker.postMessage({
       c: "z",
@@ -106,9 +194,293 @@ class XpraProtocolWorkerHost {
 }
 
 
+/*
+A list of received buffers, consumed from the front.
+We keep a running count of the bytes available,
+so finding out if a packet is complete does not require scanning the queue,
+and we only copy data when a read spans more than one buffer.
+*/
+class XpraReceiveQueue {
+  constructor() {
+    this.clear();
+  }
+
+  clear() {
+    this.segments = [];
+    // index of the first segment still in use:
+    this.head = 0;
+    // bytes already consumed from the first segment:
+    this.offset = 0;
+    // bytes available:
+    this.length = 0;
+  }
+
+  push(data) {
+    if (data.byteLength > 0) {
+      this.segments.push(data);
+      this.length += data.byteLength;
+    }
+  }
+
+  consume_segment() {
+    this.segments[this.head] = null;
+    this.head++;
+    this.offset = 0;
+    if (this.head === this.segments.length) {
+      this.segments = [];
+      this.head = 0;
+    } else if (this.head >= 64 && this.head * 2 >= this.segments.length) {
+      //compact the list without shifting it on every read:
+      this.segments = this.segments.slice(this.head);
+      this.head = 0;
+    }
+  }
+
+  read(size) {
+    /*
+     * returns a Uint8Array with the next `size` bytes,
+     * this is a view of the received buffer whenever possible
+     * (use `transferable_buffer` before transferring it)
+     */
+    if (size > this.length) {
+      throw `cannot read ${size} bytes, only ${this.length} available`;
+    }
+    this.length -= size;
+    const first = this.segments[this.head];
+    const available = first.byteLength - this.offset;
+    if (available >= size) {
+      const data = first.subarray(this.offset, this.offset + size);
+      if (available === size) {
+        this.consume_segment();
+      } else {
+        this.offset += size;
+      }
+      return data;
+    }
+    //spans multiple segments:
+    const data = new Uint8Array(size);
+    let pos = 0;
+    while (pos < size) {
+      const segment = this.segments[this.head];
+      const n = Math.min(size - pos, segment.byteLength - this.offset);
+      data.set(segment.subarray(this.offset, this.offset + n), pos);
+      pos += n;
+      if (this.offset + n === segment.byteLength) {
+        this.consume_segment();
+      } else {
+        this.offset += n;
+      }
+    }
+    return data;
+  }
+}
+
+/*
+Returns a buffer that can be transferred without detaching
+any other data sharing the same ArrayBuffer,
+the view is copied only if it does not span the whole buffer.
+*/
+function transferable_buffer(u8) {
+  if (u8.byteOffset === 0 && u8.byteLength === u8.buffer.byteLength) {
+    return u8;
+  }
+  return u8.slice();
+}
+
+/*
+Posts a packet from the protocol worker to the main thread,
+transferring the buffers of the packet types that carry large payloads.
+*/
+function post_packet_to_host(packet, received, queued) {
+  //the received data may be a view of a larger buffer:
+  const raw_buffers = [];
+  const ptype = packet[0];
+  if (ptype === "draw" && packet[7] && packet[7].buffer instanceof ArrayBuffer) {
+    packet[7] = transferable_buffer(packet[7]);
+    raw_buffers.push(packet[7].buffer);
+  } else if (ptype === "sound-data" && packet[2] && packet[2].buffer instanceof ArrayBuffer) {
+    packet[2] = transferable_buffer(packet[2]);
+    raw_buffers.push(packet[2].buffer);
+  } else if (ptype === "send-file-chunk" && packet[3] && packet[3].buffer instanceof ArrayBuffer) {
+    packet[3] = transferable_buffer(packet[3]);
+    raw_buffers.push(packet[3].buffer);
+  }
+  postMessage({
+    c: "p",
+    p: packet,
+    t: received,
+    q: queued
+  }, raw_buffers);
+}
+
+/*
+Parses the 8 byte packet header,
+returns null if the header does not start with "P".
+*/
+function parse_packet_header(header) {
+  if (header[0] !== 80) {
+    return null;
+  }
+  const view = new DataView(header.buffer, header.byteOffset, 8);
+  return {
+    proto_flags: header[1],
+    level: header[2],
+    index: header[3],
+    payload_size: view.getUint32(4),
+  };
+}
+
+function packet_header_error(header) {
+  let hex = "";
+  for (const p of header) {
+    const v = p.toString(16);
+    hex += v.length < 2 ? `0${v}` : v;
+  }
+  return `invalid packet header format: ${header[0]}: 0x${hex}`;
+}
+
+// session traces start with this marker, followed by one record for each chunk of data received:
+// the time it was received (milliseconds since the start, float64), its length (uint32), the data
+// (all values are big endian)
+const TRACE_MAGIC = "XPRATRC1";
+// we stop recording the trace beyond this size:
+const TRACE_MAX_SIZE = 256 * 1024 * 1024;
+
+/*
+Records the data received from the server, as it arrives,
+so the session can be used for benchmarks (see `bench/`).
+Traces of encrypted connections cannot be decoded.
+*/
+class XpraTraceRecorder {
+  constructor() {
+    this.start = performance.now();
+    this.records = [];
+    this.size = TRACE_MAGIC.length;
+    this.truncated = false;
+  }
+
+  record(data) {
+    if (this.truncated) {
+      return;
+    }
+    if (this.size + 12 + data.byteLength > TRACE_MAX_SIZE) {
+      this.truncated = true;
+      return;
+    }
+    this.records.push([performance.now() - this.start, data.slice()]);
+    this.size += 12 + data.byteLength;
+  }
+
+  serialize() {
+    const trace = new Uint8Array(this.size);
+    const view = new DataView(trace.buffer);
+    let pos = 0;
+    for (let index = 0; index < TRACE_MAGIC.length; index++) {
+      trace[pos++] = TRACE_MAGIC.charCodeAt(index);
+    }
+    for (const [time, data] of this.records) {
+      view.setFloat64(pos, time);
+      view.setUint32(pos + 8, data.byteLength);
+      trace.set(data, pos + 12);
+      pos += 12 + data.byteLength;
+    }
+    return trace;
+  }
+}
+
+/*
+Returns the records of a session trace, as `[time, data]` pairs.
+*/
+function parse_trace(trace) {
+  for (let index = 0; index < TRACE_MAGIC.length; index++) {
+    if (trace[index] !== TRACE_MAGIC.charCodeAt(index)) {
+      throw new Error("not an xpra session trace");
+    }
+  }
+  const view = new DataView(trace.buffer, trace.byteOffset, trace.byteLength);
+  const records = [];
+  let pos = TRACE_MAGIC.length;
+  while (pos + 12 <= trace.byteLength) {
+    const time = view.getFloat64(pos);
+    const length = view.getUint32(pos + 8);
+    pos += 12;
+    if (pos + length > trace.byteLength) {
+      throw new Error(`truncated trace record at offset ${pos}`);
+    }
+    records.push([time, trace.subarray(pos, pos + length)]);
+    pos += length;
+  }
+  return records;
+}
+
 /*
 The main Xpra wire protocol
 */
+//the initial size of the output buffer, it grows as needed:
+const SEND_BUFFER_SIZE = 64 * 1024;
+//smaller packets are not worth compressing:
+const COMPRESS_THRESHOLD = 1024;
+//the number of packets we encrypt concurrently:
+const ENCRYPT_PIPELINE_DEPTH = 8;
+
+function compress_packet_data(bdata, compressor, hash_table) {
+  //returns the compression level for the packet header and the data to send
+  if (compressor === "lz4" && bdata.length >= COMPRESS_THRESHOLD) {
+    const compressed = lz4.encode(bdata, hash_table);
+    if (compressed) {
+      return [0x10 | 1, compressed];
+    }
+  }
+  return [0, bdata];
+}
+
+/*
+Frames the outgoing packets into a single reusable buffer,
+so that all the packets queued in the same tick
+can be sent as one websocket message.
+*/
+class XpraSendBuffer {
+  constructor() {
+    this.buffer = new Uint8Array(SEND_BUFFER_SIZE);
+    this.length = 0;
+  }
+
+  reset() {
+    this.length = 0;
+  }
+
+  append(proto_flags, level, payload_size, bdata) {
+    //`payload_size` may differ from the data length when encrypting
+    const end = this.length + 8 + bdata.byteLength;
+    if (end > this.buffer.length) {
+      let size = this.buffer.length * 2;
+      while (size < end) {
+        size *= 2;
+      }
+      const buffer = new Uint8Array(size);
+      buffer.set(this.buffer.subarray(0, this.length));
+      this.buffer = buffer;
+    }
+    const buffer = this.buffer;
+    const offset = this.length;
+    buffer[offset] = "P".charCodeAt(0);
+    buffer[offset + 1] = proto_flags;
+    buffer[offset + 2] = level;
+    buffer[offset + 3] = 0;
+    //size header:
+    for (let index = 0; index < 4; index++) {
+      buffer[offset + 7 - index] = (payload_size >> (8 * index)) & 0xff;
+    }
+    buffer.set(bdata, offset + 8);
+    this.length = end;
+  }
+
+  view() {
+    //only valid until the next call to `reset` or `append`
+    return this.buffer.subarray(0, this.length);
+  }
+}
+
 class XpraProtocol {
   constructor() {
     this.verify_connected_timer = 0;
@@ -121,10 +493,21 @@ class XpraProtocol {
     this.cipher_in_key = null;
     this.cipher_out_params = null;
     this.cipher_out_key = null;
-    this.rQ = []; // Receive queue
+    this.rQ = new XpraReceiveQueue(); // Receive queue
     this.sQ = []; // Send queue
+    this.send_buffer = new XpraSendBuffer();
+    this.send_timer = 0;
+    //the packets being encrypted, in the order they must be sent:
+    this.encrypt_queue = [];
+    //outbound compression, see `set_compressor`:
+    this.compressor = null;
+    this.compress_hash_table = null;
     this.mQ = []; // Worker message queue
-    this.header = [];
+    this.header = null;
+    this.receive_timer = 0;
+    this.trace = null;
+    //when the last message was received, using a clock we can compare across workers:
+    this.receive_time = 0;
 
     //Queue processing via intervals
     this.process_interval = 0; //milliseconds
@@ -173,10 +556,11 @@ class XpraProtocol {
     const me = this;
     // (re-)init
     this.raw_packets = [];
-    this.rQ = [];
+    this.rQ.clear();
     this.sQ = [];
+    this.encrypt_queue = [];
     this.mQ = [];
-    this.header = [];
+    this.header = null;
     this.websocket = null;
 
     function handle(packet) {
@@ -208,13 +592,26 @@ class XpraProtocol {
       handle(["error", me.close_event_str(event), event.code || 0]);
     this.websocket.onmessage = function(e) {
       // push arraybuffer values onto the end
-      me.rQ.push(new Uint8Array(e.data));
-      setTimeout(function() {
-        me.process_receive_queue();
-      }, this.process_interval);
+      const data = new Uint8Array(e.data);
+      if (me.trace) {
+        me.trace.record(data);
+      }
+      me.receive_time = performance.timeOrigin + performance.now();
+      me.rQ.push(data);
+      me.schedule_receive_queue();
     };
   }
 
+  schedule_receive_queue() {
+    //a single task drains everything received until it runs:
+    if (!this.receive_timer) {
+      this.receive_timer = setTimeout(() => {
+        this.receive_timer = 0;
+        this.process_receive_queue();
+      }, this.process_interval);
+    }
+  }
+
   close() {
     if (this.websocket) {
       this.websocket.onopen = null;
@@ -233,8 +630,8 @@ class XpraProtocol {
     this.websocket.onclose = null;
     this.websocket.onerror = null;
     this.websocket.onmessage = null;
-    this.header = [];
-    this.rQ = [];
+    this.header = null;
+    this.rQ.clear();
     //and just tell the client to close (it may still try to re-connect):
     this.packet_handler(["close", message]);
   }
@@ -243,6 +640,10 @@ class XpraProtocol {
     while (this.websocket && this.rQ.length > 0 && this.do_process_receive_queue());
   }
 
+  get receive_queue_size() {
+    return this.rQ.length;
+  }
+
   error() {
     console.error.apply(console, arguments);
   }
@@ -255,45 +656,22 @@ class XpraProtocol {
      * process data from this.rQ until we have enough for one packet chunk
      * then calls this.process_packet_data
      */
-    if (this.header.length < 8 && this.rQ.length > 0) {
-      //add from receive queue data to header until we get the 8 bytes we need:
-      while (this.header.length < 8 && this.rQ.length > 0) {
-        const slice = this.rQ[0];
-        const needed = 8 - this.header.length;
-        const n = Math.min(needed, slice.length);
-        this.header.push(...slice.subarray(0, n));
-        if (slice.length > needed) {
-          //replace the slice with what is left over:
-          this.rQ[0] = slice.subarray(n);
-        } else {
-          //this slice has been fully consumed already:
-          this.rQ.shift();
-        }
+    if (!this.header) {
+      if (this.rQ.length < 8) {
+        //we need more data to continue
+        return false;
       }
-
-      //verify the header format:
-      if (this.header[0] !== 80) {
-        let message = `invalid packet header format: ${this.header[0]}`;
-        if (this.header.length > 1) {
-          let hex = "";
-          for (let p of this.header) {
-            const v = p.toString(16);
-            hex += v.length < 2 ? `0${v}` : v;
-          }
-          message += `: 0x${hex}`;
-        }
-        this.protocol_error(message);
+      const header_data = this.rQ.read(8);
+      this.header = parse_packet_header(header_data);
+      if (!this.header) {
+        this.protocol_error(packet_header_error(header_data));
         return false;
       }
     }
-
-    if (this.header.length < 8) {
-      //we need more data to continue
-      return true;
-    }
+    const header = this.header;
 
     //ignore 0x8: this flag is unused client-side:
-    let proto_flags = this.header[1] & ~0x8;
+    let proto_flags = header.proto_flags & ~0x8;
     const encrypted = proto_flags & 0x2;
     if (encrypted) {
       proto_flags = proto_flags & ~0x2;
@@ -303,7 +681,7 @@ class XpraProtocol {
       return false;
     }
 
-    let packet_size = [4, 5, 6, 7].reduce((accumulator, value) => accumulator * 0x1_00 + this.header[value], 0);
+    let packet_size = header.payload_size;
 
     // add padding if encryption is enabled
     let padding = 0;
@@ -315,39 +693,15 @@ class XpraProtocol {
     }
 
     // verify that we have enough data for the full payload:
-    let rsize = this.rQ.reduce((accumulator, value) => accumulator + value.length, 0);
-    if (rsize < packet_size) {
+    if (this.rQ.length < packet_size) {
       return false;
     }
 
     // done parsing the header, the next packet will need a new one:
-    const header = this.header;
-    this.header = [];
+    this.header = null;
+    const received = this.receive_time;
 
-    let packet_data;
-    if (this.rQ[0].length === packet_size) {
-      //exact match: the payload is in a buffer already:
-      packet_data = this.rQ.shift();
-    } else {
-      //aggregate all the buffers into "packet_data" until we get exactly "packet_size" bytes:
-      packet_data = new Uint8Array(packet_size);
-      rsize = 0;
-      while (rsize < packet_size) {
-        const slice = this.rQ[0];
-        const needed = packet_size - rsize;
-        if (slice.length > needed) {
-          //add part of this slice:
-          packet_data.set(slice.subarray(0, needed), rsize);
-          rsize += needed;
-          this.rQ[0] = slice.subarray(needed);
-        } else {
-          //add this slice in full:
-          packet_data.set(slice, rsize);
-          rsize += slice.length;
-          this.rQ.shift();
-        }
-      }
-    }
+    let packet_data = this.rQ.read(packet_size);
 
     // decrypt if needed
     if (encrypted) {
@@ -374,25 +728,25 @@ class XpraProtocol {
             packet_data = new Uint8Array(decrypted.slice(0, packet_size - padding));
           }
           // console.log("packet data:", packet_data);
-          this.process_packet_data(header, packet_data);
+          this.process_packet_data(header, packet_data, received);
         })
         .catch(err => this.protocol_error("failed to decrypt data: " + err));
       return true;
     }
 
-    this.process_packet_data(header, packet_data);
+    this.process_packet_data(header, packet_data, received);
     return true;
   }
 
-  process_packet_data(header, packet_data) {
+  process_packet_data(header, packet_data, received) {
     /*
      * the packet data has been decrypted (if needed),
      * decompress it (if needed),
      * then either store it if it is a chunk,
      * or decode the packet if we have received all the chunks (chunk no is 0)
      */
-    const level = header[2];
-    const index = header[3];
+    const level = header.level;
+    const index = header.index;
     // console.log("process packet data, header=", header, packet_data.byteLength, "bytes, index=", index, "level=", level);
 
     //decompress it if needed:
@@ -414,7 +768,8 @@ class XpraProtocol {
         this.protocol_error(`invalid packet index: ${index}`);
         return;
       }
-      this.raw_packets[index] = packet_data;
+      //raw chunks (ie: pixel data) are used via their ArrayBuffer:
+      this.raw_packets[index] = transferable_buffer(packet_data);
       if (this.raw_packets.length >= 4) {
         this.protocol_error(`too many raw packets: ${this.raw_packets.length}`);
       }
@@ -424,7 +779,9 @@ class XpraProtocol {
     //decode raw packet data into objects:
     let packet = null;
     try {
-      packet = rdecode(packet_data);
+      //the byte strings are views of the packet data,
+      //so it must not share its buffer with other packets:
+      packet = rdecode(transferable_buffer(packet_data));
       for (const index in this.raw_packets) {
         packet[index] = this.raw_packets[index];
       }
@@ -433,8 +790,7 @@ class XpraProtocol {
       //FIXME: maybe we should error out and disconnect here?
       this.error("error decoding packet", error);
       this.error(`packet=${packet_data}`);
-      const proto_flags = header[1];
-      this.error(`protocol flags=${proto_flags}`);
+      this.error(`protocol flags=${header.proto_flags}`);
       this.error(` level=${level}`);
       this.error(` index=${index}`);
       this.raw_packets = [];
@@ -444,10 +800,10 @@ class XpraProtocol {
     try {
       // call the packet handler
       if (this.is_worker) {
-        this.mQ[this.mQ.length] = packet;
+        this.mQ[this.mQ.length] = [packet, received];
         setTimeout(() => this.process_message_queue(), this.process_interval);
       } else {
-        this.packet_handler(packet);
+        this.packet_handler(packet, received);
       }
     } catch (error) {
       //FIXME: maybe we should error out and disconnect here?
@@ -457,101 +813,127 @@ class XpraProtocol {
   }
 
   process_send_queue() {
+    //frames all the packets queued and sends them in a single message
+    const send_buffer = this.send_buffer;
+    send_buffer.reset();
     while (this.sQ.length > 0 && this.websocket) {
+      if (this.cipher_out_key && this.encrypt_queue.length >= ENCRYPT_PIPELINE_DEPTH) {
+        //we will be called again when an encryption completes
+        break;
+      }
       const packet = this.sQ.shift();
       if (!packet) {
-        return;
+        break;
       }
       let bdata = null;
       try {
-        bdata = rencode(packet);
+        //copied by `append`, `compress_packet_data` or `encrypt`:
+        bdata = rencode_view(packet);
       } catch (error) {
         this.error("Error: failed to encode packet:", packet);
         this.error(error);
         continue;
       }
-      let payload_size = bdata.length;
-
+      const [level, payload] = compress_packet_data(bdata, this.compressor, this.compress_hash_table);
       if (this.cipher_out_key) {
-        //console("encrypting", packet[0], "packet using", JSON.stringify(this.cipher_out_params), ":", bdata);
-        const iv = Utilities.getSecureRandomBytes(16);
-        this.cipher_out_params["iv"] = iv;
-        crypto.subtle.encrypt(this.cipher_out_params, this.cipher_out_key, bdata)
-          .then(encrypted => {
-            const enc_u8 = new Uint8Array(encrypted);
-            const packet_data = new Uint8Array(iv.byteLength + enc_u8.byteLength);
-            packet_data.set(iv, 0);
-            packet_data.set(enc_u8, iv.byteLength);
-            payload_size += iv.byteLength;
-            this.send_packet(packet_data, payload_size, true);
-          })
-          .catch(err => this.protocol_error("failed to encrypt packet: " + err));
-        return;
+        this.encrypt(level, payload);
+      } else {
+        send_buffer.append(0x10, level, payload.length, payload);
       }
-      this.send_packet(bdata, payload_size, false);
     }
+    this.flush_send_buffer();
   }
 
-  make_packet_header(proto_flags, level, payload_size) {
-    const header = new Uint8Array(8);
-    header[0] = "P".charCodeAt(0);
-    header[1] = proto_flags;
-    header[2] = level;
-    header[3] = 0;
-    //size header:
-    for (let index = 0; index < 4; index++) {
-      header[7 - index] = (payload_size >> (8 * index)) & 0xff;
+  encrypt(level, payload) {
+    //the encryptions may complete in any order,
+    //`send_encrypted` sends the packets in the order they were queued
+    const entry = {level, payload_size: 0, data: null};
+    this.encrypt_queue.push(entry);
+    const iv = Utilities.getSecureRandomBytes(16);
+    //the payload is copied before `encrypt` returns:
+    const params = Object.assign({}, this.cipher_out_params, {iv});
+    //console("encrypting", payload.length, "bytes using", JSON.stringify(params));
+    crypto.subtle.encrypt(params, this.cipher_out_key, payload)
+      .then(encrypted => {
+        const enc_u8 = new Uint8Array(encrypted);
+        const packet_data = new Uint8Array(iv.byteLength + enc_u8.byteLength);
+        packet_data.set(iv, 0);
+        packet_data.set(enc_u8, iv.byteLength);
+        //the padding is not included in the payload size:
+        entry.payload_size = iv.byteLength + payload.length;
+        entry.data = packet_data;
+        this.send_encrypted();
+      })
+      .catch(err => this.protocol_error("failed to encrypt packet: " + err));
+  }
+
+  send_encrypted() {
+    const queue = this.encrypt_queue;
+    while (queue.length > 0 && queue[0].data) {
+      const entry = queue.shift();
+      this.send_buffer.append(0x10 | 0x2, entry.level, entry.payload_size, entry.data);
+    }
+    this.flush_send_buffer();
+    if (this.sQ.length > 0) {
+      //some packets were waiting for the pipeline:
+      this.process_send_queue();
     }
-    return header;
   }
 
-  send_packet(bdata, payload_size, encrypted) {
-    const level = 0;
-    let proto_flags = 0x10;
-    if (encrypted) {
-      proto_flags |= 0x2;
-    }
-    const header = this.make_packet_header(proto_flags, level, payload_size);
-    const actual_size = bdata.byteLength;
-    const packet = new Uint8Array(8 + actual_size);
-    packet.set(header, 0);
-    packet.set(bdata, 8);
-    // put into buffer before send
-    if (this.websocket) {
-      this.websocket.send(packet.buffer);
+  flush_send_buffer() {
+    const send_buffer = this.send_buffer;
+    if (send_buffer.length > 0 && this.websocket) {
+      //the websocket copies the data, so the buffer can be re-used:
+      this.websocket.send(send_buffer.view());
     }
+    send_buffer.reset();
   }
 
   process_message_queue() {
     while (this.mQ.length > 0) {
-      const packet = this.mQ.shift();
+      const entry = this.mQ.shift();
 
-      if (!packet) {
+      if (!entry) {
         return;
       }
-
-      const raw_buffers = [];
-      if (packet[0] === "draw" && "buffer" in packet[7]) {
-        raw_buffers.push(packet[7].buffer);
-      } else if (packet[0] === "sound-data" && Object.hasOwn(packet[2], "buffer")) {
-        raw_buffers.push(packet[2].buffer);
-      }
-      postMessage({
-        c: "p",
-        p: packet
-      }, raw_buffers);
+      this.packet_handler(entry[0], entry[1]);
     }
   }
 
   send(packet) {
     this.sQ[this.sQ.length] = packet;
-    setTimeout(() => this.process_send_queue(), this.process_interval);
+    //a single task sends everything queued until it runs:
+    if (!this.send_timer) {
+      this.send_timer = setTimeout(() => {
+        this.send_timer = 0;
+        this.process_send_queue();
+      }, this.process_interval);
+    }
   }
 
   set_packet_handler(callback) {
     this.packet_handler = callback;
   }
 
+  start_trace() {
+    this.trace = new XpraTraceRecorder();
+  }
+
+  stop_trace(callback) {
+    //the callback receives the serialized trace, or null if we were not recording one:
+    const trace = this.trace;
+    this.trace = null;
+    callback(trace ? trace.serialize() : null);
+  }
+
+  set_compressor(compressor) {
+    //only lz4 is supported for the packets we send:
+    this.compressor = compressor === "lz4" ? compressor : null;
+    if (this.compressor && !this.compress_hash_table) {
+      this.compress_hash_table = new Uint32Array(1 << 16);
+    }
+  }
+
   set_cipher_in(caps, key) {
     // console.log("configuring cipher in:", caps);
     this.setup_cipher(caps, key, "decrypt", (block_size, params, crypto_key) => {
@@ -678,31 +1060,120 @@ if (
     "lib/lz4.js",
     "lib/brotli_decode.js",
     "lib/rencode.js",
-    "Utilities.js"
+    "Utilities.js",
+    "WebTransport.js"
   );
-  // make protocol instance
-  const protocol = new XpraProtocol();
-  protocol.is_worker = true;
-  // we create a custom packet handler which posts packet as a message
-  protocol.set_packet_handler((packet) => {
-    let raw_buffer = [];
-    if (packet[0] === "draw" && Object.hasOwn(packet[7], "buffer")) {
-      //zero-copy the draw buffer
-      raw_buffer = packet[7].buffer;
-      packet[7] = null;
-    } else if (
-      packet[0] === "send-file-chunk" &&
-      Object.hasOwn(packet[3], "buffer")
-    ) {
-      //zero-copy the file data buffer
-      raw_buffer = packet[3].buffer;
-      packet[3] = null;
-    }
-    postMessage({
-      c: "p",
-      p: packet
-    }, raw_buffer);
-  }, null);
+  // the protocol instance, created when we know which transport to use:
+  let protocol = null;
+  // draw packets can be sent directly to the decode workers using these ports:
+  let decode_ports = null;
+  // the index of the decode port for each window:
+  const decode_assignments = new Map();
+  // packets for windows which have not been assigned a decode worker yet:
+  const unassigned_packets = new Map();
+  // how long we wait for an assignment before letting the main thread handle the packets:
+  const UNASSIGNED_TIMEOUT = 2000;
+  // offset from our clock to the main thread's clock:
+  let time_offset = 0;
+
+  function forward_packet(port, packet) {
+    if (packet[0] === "eos") {
+      port.postMessage({
+        cmd: "eos",
+        wid: packet[1]
+      });
+      return;
+    }
+    const now = performance.now() + time_offset;
+    const raw_buffers = [];
+    if (packet[7] && packet[7].buffer instanceof ArrayBuffer) {
+      packet[7] = transferable_buffer(packet[7]);
+      raw_buffers.push(packet[7].buffer);
+    }
+    port.postMessage({
+      cmd: "decode",
+      packet,
+      start: now,
+      forwarded: true
+    }, raw_buffers);
+  }
+
+  function hold_packet(packet, received) {
+    const wid = packet[1];
+    let pending = unassigned_packets.get(wid);
+    if (!pending) {
+      const packets = [];
+      const timer = setTimeout(() => {
+        unassigned_packets.delete(wid);
+        for (const [held, held_received] of packets) {
+          //the main thread has already received the 'eos' packets:
+          if (held[0] === "draw") {
+            post_packet_to_host(held, held_received, protocol ? protocol.receive_queue_size : 0);
+          }
+        }
+      }, UNASSIGNED_TIMEOUT);
+      pending = {packets, timer};
+      unassigned_packets.set(wid, pending);
+    }
+    pending.packets.push([packet, received]);
+  }
+
+  function assign_decode_port(wid, index) {
+    if (index < 0 || !decode_ports || index >= decode_ports.length) {
+      decode_assignments.delete(wid);
+      return;
+    }
+    decode_assignments.set(wid, index);
+    const pending = unassigned_packets.get(wid);
+    if (pending) {
+      clearTimeout(pending.timer);
+      unassigned_packets.delete(wid);
+      for (const [packet] of pending.packets) {
+        forward_packet(decode_ports[index], packet);
+      }
+    }
+  }
+
+  function set_decode_ports(ports) {
+    decode_ports = ports;
+    decode_assignments.clear();
+    for (const pending of unassigned_packets.values()) {
+      clearTimeout(pending.timer);
+    }
+    unassigned_packets.clear();
+  }
+
+  function handle_packet(packet, received) {
+    const ptype = packet[0];
+    if (decode_ports && (ptype === "draw" || ptype === "eos")) {
+      const index = decode_assignments.get(packet[1]);
+      if (index === undefined) {
+        hold_packet(packet, received);
+      } else {
+        forward_packet(decode_ports[index], packet);
+      }
+      if (ptype === "draw") {
+        return;
+      }
+      //the window still needs to process the 'eos'
+    }
+    post_packet_to_host(packet, received, protocol ? protocol.receive_queue_size : 0);
+  }
+
+  function make_protocol(uri) {
+    const webtransport = uri.startsWith("https:");
+    if (protocol && (protocol instanceof XpraWebTransportProtocol) === webtransport) {
+      return protocol;
+    }
+    if (protocol) {
+      protocol.close();
+    }
+    protocol = webtransport ? new XpraWebTransportProtocol() : new XpraProtocol();
+    protocol.is_worker = true;
+    protocol.set_packet_handler(handle_packet);
+    return protocol;
+  }
+
   // attach listeners from main thread
   self.addEventListener(
     "message",
@@ -710,7 +1181,7 @@ if (
       const data = e.data;
       switch (data.c) {
         case "o":
-          protocol.open(data.u);
+          make_protocol(data.u).open(data.u);
           break;
         case "s":
           protocol.send(data.p);
@@ -721,9 +1192,44 @@ if (
         case "z":
           protocol.set_cipher_in(data.p, data.k);
           break;
+        case "k":
+          protocol.set_compressor(data.p);
+          break;
+        case "d":
+          set_decode_ports(data.p);
+          time_offset = performance.timeOrigin - data.o;
+          //the decode workers will hold the packets we forward
+          //until the main thread has sent it the ones it received before this marker:
+          postMessage({
+            c: "f"
+          });
+          break;
+        case "a":
+          assign_decode_port(data.w, data.i);
+          break;
+        case "T":
+          if (protocol) {
+            protocol.start_trace();
+          }
+          break;
+        case "S":
+          if (protocol) {
+            protocol.stop_trace((trace) => postMessage({
+              c: "S",
+              d: trace
+            }, trace ? [trace.buffer] : []));
+          } else {
+            postMessage({
+              c: "S",
+              d: null
+            });
+          }
+          break;
         case "c":
           // close the connection
-          protocol.close();
+          if (protocol) {
+            protocol.close();
+          }
           break;
         case "t":
           // terminate the worker
@@ -2,11 +2,79 @@
  * Copyright (c) 2021 Antoine Martin <antoine@xpra.org>
  */
 
+//the smallest size class of the buffer pool:
+const BUFFER_POOL_MIN_SIZE = 4096;
+//the number of free buffers we keep for each size class:
+const BUFFER_POOL_DEPTH = 4;
+//we can only use 32-bit words for converting pixels on little endian platforms:
+const LITTLE_ENDIAN = new Uint8Array(new Uint32Array([1]).buffer)[0] === 1;
+const OPAQUE = 0xff_00_00_00;
+
+/*
+Recycles the temporary pixel buffers,
+grouped in power of two size classes.
+Only the buffers allocated by the pool are ever returned to it.
+*/
+class XpraBufferPool {
+  constructor() {
+    this.free = new Map();
+    this.allocated = new WeakSet();
+  }
+
+  size_class(size) {
+    let size_class = BUFFER_POOL_MIN_SIZE;
+    while (size_class < size) {
+      size_class *= 2;
+    }
+    return size_class;
+  }
+
+  acquire(size) {
+    //returns a Uint8Array of `size` bytes, starting at offset zero in its buffer
+    const size_class = this.size_class(size);
+    const free = this.free.get(size_class);
+    let buffer = free ? free.pop() : null;
+    if (!buffer) {
+      buffer = new ArrayBuffer(size_class);
+      this.allocated.add(buffer);
+    }
+    return new Uint8Array(buffer, 0, size);
+  }
+
+  release(array) {
+    const buffer = array ? array.buffer : null;
+    //ignore foreign buffers and the ones that have been transferred:
+    if (!buffer || !this.allocated.has(buffer) || buffer.byteLength === 0) {
+      return;
+    }
+    let free = this.free.get(buffer.byteLength);
+    if (!free) {
+      free = [];
+      this.free.set(buffer.byteLength, free);
+    }
+    if (free.length < BUFFER_POOL_DEPTH && !free.includes(buffer)) {
+      free.push(buffer);
+    }
+  }
+}
+
+const rgb_buffer_pool = new XpraBufferPool();
+
+function uint32_view(data) {
+  //a 32-bit view of the same bytes, only if the data is aligned:
+  if (!LITTLE_ENDIAN || data.byteOffset % 4 !== 0) {
+    return null;
+  }
+  return new Uint32Array(data.buffer, data.byteOffset, Math.floor(data.length / 4));
+}
+
 //deals with zlib or lz4 pixel compression
 //as well as converting rgb24 to rb32 and
 //re-striding the pixel data if needed so that lines are not padded
 //(that is: the rowstride must be width*4)
 //this function modifies the packet data directly
+//the array returned may come from `rgb_buffer_pool`,
+//the caller should release it once the pixels have been used
 function decode_rgb(packet) {
   const width = packet[4];
   const height = packet[5];
@@ -17,49 +85,39 @@ function decode_rgb(packet) {
   if (options["zlib"] > 0) {
     throw "zlib compression is not supported";
   }
+  let inflated = null;
   if (options["lz4"] > 0) {
-    data = lz4.decode(data);
+    inflated = rgb_buffer_pool.acquire(lz4.decoded_length(data));
+    data = lz4.decode(data, inflated);
     delete options["lz4"];
   }
   if (coding === "rgb24") {
     packet[9] = width * 4;
     packet[6] = "rgb32";
-    return rgb24_to_rgb32(data, width, height, rowstride);
+    const rgb32 = rgb24_to_rgb32(data, width, height, rowstride);
+    rgb_buffer_pool.release(inflated);
+    return rgb32;
   }
   //coding=rgb32
   if (rowstride === width * 4) {
-    return new Uint8Array(data);
+    return data;
   }
-  //re-striding
-  //might be quicker to copy 32bit at a time using Uint32Array
-  //and then casting the result?
-  const uint = new Uint8Array(width * height * 4);
-  let psrc = 0;
-  let pdst = 0;
+  //re-striding, one row at a time:
+  const row_length = width * 4;
+  const uint = rgb_buffer_pool.acquire(row_length * height);
   for (let row_index = 0; row_index < height; row_index++) {
-    psrc = row_index * rowstride;
-    pdst = row_index * width * 4;
-    for (let column_index = 0; column_index < width * 4; column_index++) {
-      uint[pdst++] = data[psrc++];
-    }
+    const psrc = row_index * rowstride;
+    uint.set(data.subarray(psrc, psrc + row_length), row_index * row_length);
   }
+  rgb_buffer_pool.release(inflated);
   return uint;
 }
 
 function rgb24_to_rgb32(data, width, height, rowstride) {
-  const uint = new Uint8Array(width * height * 4);
-  let source_index = 0;
-  let target_index = 0;
-  if (rowstride === width * 3) {
-    //faster path, single loop:
-    const source_length = data.length;
-    while (source_index < source_length) {
-      uint[target_index++] = data[source_index++];
-      uint[target_index++] = data[source_index++];
-      uint[target_index++] = data[source_index++];
-      uint[target_index++] = 255;
-    }
-  } else {
+  const uint = rgb_buffer_pool.acquire(width * height * 4);
+  if (!LITTLE_ENDIAN) {
+    let source_index = 0;
+    let target_index = 0;
     for (let row_index = 0; row_index < height; row_index++) {
       source_index = row_index * rowstride;
       for (let column_index = 0; column_index < width; column_index++) {
@@ -69,6 +127,43 @@ function rgb24_to_rgb32(data, width, height, rowstride) {
         uint[target_index++] = 255;
       }
     }
+    return uint;
+  }
+  const target = new Uint32Array(uint.buffer, 0, width * height);
+  const source = uint32_view(data);
+  if (rowstride === width * 3) {
+    //faster path, the rows are contiguous:
+    rgb24_to_rgb32_run(data, source, 0, target, 0, width * height);
+  } else {
+    for (let row_index = 0; row_index < height; row_index++) {
+      rgb24_to_rgb32_run(data, source, row_index * rowstride, target, row_index * width, width);
+    }
   }
   return uint;
 }
+
+function rgb24_to_rgb32_run(data, source, source_index, target, target_index, pixels) {
+  //converts `pixels` rgb24 pixels starting at byte `source_index`
+  //into 32-bit words starting at `target_index`
+  let count = 0;
+  if (source && source_index % 4 === 0) {
+    //4 pixels at a time, from 3 words:
+    let word_index = source_index / 4;
+    const groups = Math.floor(pixels / 4);
+    for (let group = 0; group < groups; group++) {
+      const w0 = source[word_index++];
+      const w1 = source[word_index++];
+      const w2 = source[word_index++];
+      target[target_index++] = w0 | OPAQUE;
+      target[target_index++] = (w0 >>> 24) | (w1 << 8) | OPAQUE;
+      target[target_index++] = (w1 >>> 16) | (w2 << 16) | OPAQUE;
+      target[target_index++] = (w2 >>> 8) | OPAQUE;
+    }
+    count = groups * 4;
+    source_index += count * 3;
+  }
+  for (; count < pixels; count++) {
+    target[target_index++] = data[source_index] | (data[source_index + 1] << 8) | (data[source_index + 2] << 16) | OPAQUE;
+    source_index += 3;
+  }
+}
@@ -0,0 +1,96 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Paints 'scroll' packets,
+ * used by both the windows and the offscreen decode worker.
+ */
+
+/*
+All the rectangles of a 'scroll' packet are relative to the same
+reference picture: the window contents as they were before any of them
+was applied. The list is not ordered so that it can be applied in place,
+so the rectangles are copied from a snapshot of the area they read from,
+the cost grows with the scrolled area rather than the window size.
+*/
+class XpraScrollPainter {
+  constructor() {
+    // grows to fit the largest area scrolled, never shrinks:
+    this.scratch_canvas = null;
+    this.scratch_context = null;
+  }
+
+  get_scratch(width, height) {
+    let scratch = this.scratch_canvas;
+    if (!scratch || scratch.width < width || scratch.height < height) {
+      width = Math.max(width, scratch ? scratch.width : 0);
+      height = Math.max(height, scratch ? scratch.height : 0);
+      if (typeof OffscreenCanvas === "undefined") {
+        scratch = document.createElement("canvas");
+        scratch.width = width;
+        scratch.height = height;
+      } else {
+        scratch = new OffscreenCanvas(width, height);
+      }
+      this.scratch_canvas = scratch;
+      this.scratch_context = scratch.getContext("2d");
+      this.scratch_context.imageSmoothingEnabled = false;
+    }
+    return this.scratch_context;
+  }
+
+  static get_bounds(scrolls, width, height) {
+    //the area read by the scroll rectangles, clipped to the canvas
+    let x1 = width;
+    let y1 = height;
+    let x2 = 0;
+    let y2 = 0;
+    for (const [sx, sy, sw, sh] of scrolls) {
+      x1 = Math.min(x1, Math.max(0, sx));
+      y1 = Math.min(y1, Math.max(0, sy));
+      x2 = Math.max(x2, Math.min(width, sx + sw));
+      y2 = Math.max(y2, Math.min(height, sy + sh));
+    }
+    return [x1, y1, Math.max(0, x2 - x1), Math.max(0, y2 - y1)];
+  }
+
+  paint(context, scrolls, reference) {
+    //`reference` is a canvas with the contents before the scroll, if we have one,
+    //otherwise we take a snapshot of the area the rectangles read from
+    const canvas = context.canvas;
+    const width = canvas.width;
+    const height = canvas.height;
+    let source = reference;
+    let ox = 0;
+    let oy = 0;
+    if (!source) {
+      const [bx, by, bw, bh] = XpraScrollPainter.get_bounds(scrolls, width, height);
+      if (bw === 0 || bh === 0) {
+        return;
+      }
+      const scratch_context = this.get_scratch(bw, bh);
+      scratch_context.clearRect(0, 0, bw, bh);
+      scratch_context.drawImage(canvas, bx, by, bw, bh, 0, 0, bw, bh);
+      source = this.scratch_canvas;
+      ox = bx;
+      oy = by;
+    }
+    context.imageSmoothingEnabled = false;
+    for (const [sx, sy, sw, sh, xdelta, ydelta] of scrolls) {
+      //clip to the canvas, the scratch canvas may be larger than the area we copied:
+      const x1 = Math.max(0, sx);
+      const y1 = Math.max(0, sy);
+      const w = Math.min(width, sx + sw) - x1;
+      const h = Math.min(height, sy + sh) - y1;
+      if (w <= 0 || h <= 0) {
+        continue;
+      }
+      context.drawImage(source,
+        x1 - ox, y1 - oy, w, h,
+        x1 + xdelta, y1 + ydelta, w, h,
+      );
+    }
+  }
+}
@@ -0,0 +1,165 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Client performance counters:
+ * the samples are stored in fixed size ring buffers,
+ * they are only sorted and summarized when the statistics are requested.
+ */
+
+// the number of samples kept by each histogram:
+const TELEMETRY_SAMPLES = 256;
+// how often we sample the queue depths and the main thread's responsiveness:
+const TELEMETRY_SAMPLE_INTERVAL = 250;
+// the periods of the client load averages, in seconds, like unix load averages:
+const LOAD_AVERAGE_PERIODS = [60, 300, 900];
+
+class XpraHistogram {
+  constructor(size) {
+    this.samples = new Float64Array(size || TELEMETRY_SAMPLES);
+    this.index = 0;
+    // the total number of samples recorded:
+    this.count = 0;
+  }
+
+  add(value) {
+    this.samples[this.index] = value;
+    this.index = (this.index + 1) % this.samples.length;
+    this.count++;
+  }
+
+  get_stats() {
+    //summary of the samples still in the ring buffer:
+    const n = Math.min(this.count, this.samples.length);
+    if (n === 0) {
+      return null;
+    }
+    const sorted = this.samples.slice(0, n).sort();
+    let total = 0;
+    for (const value of sorted) {
+      total += value;
+    }
+    const round = (value) => Math.round(value * 10) / 10;
+    const percentile = (p) => round(sorted[Math.min(n - 1, Math.floor(n * p))]);
+    return {
+      count: this.count,
+      min: round(sorted[0]),
+      avg: round(total / n),
+      p50: percentile(0.5),
+      p90: percentile(0.9),
+      p99: percentile(0.99),
+      max: round(sorted[n - 1]),
+    };
+  }
+}
+
+class XpraTelemetry {
+  constructor() {
+    this.histograms = new Map();
+    this.counters = new Map();
+    // name -> [function, counts towards the load]
+    this.gauges = new Map();
+    this.load = LOAD_AVERAGE_PERIODS.map(() => 0);
+    this.sample_timer = 0;
+    this.last_sample = 0;
+    // time spent in long tasks since the last sample:
+    this.long_task_time = 0;
+    this.long_task_observer = null;
+  }
+
+  record(name, value) {
+    let histogram = this.histograms.get(name);
+    if (!histogram) {
+      histogram = new XpraHistogram();
+      this.histograms.set(name, histogram);
+    }
+    histogram.add(value);
+  }
+
+  increment(name, count) {
+    this.counters.set(name, (this.counters.get(name) || 0) + (count === undefined ? 1 : count));
+  }
+
+  add_gauge(name, get_value, load) {
+    //the value is sampled periodically,
+    //`load` gauges are work queued for the main thread and count towards the client load
+    this.gauges.set(name, [get_value, Boolean(load)]);
+  }
+
+  start() {
+    if (this.sample_timer) {
+      return;
+    }
+    this.last_sample = performance.now();
+    this.sample_timer = setInterval(() => this.sample(), TELEMETRY_SAMPLE_INTERVAL);
+    const entry_types = (typeof PerformanceObserver === "undefined") ? [] : (PerformanceObserver.supportedEntryTypes || []);
+    if (entry_types.includes("longtask")) {
+      this.long_task_observer = new PerformanceObserver((list) => {
+        for (const entry of list.getEntries()) {
+          this.record("main.long-task", entry.duration);
+          this.increment("main.long-tasks");
+          this.long_task_time += entry.duration;
+        }
+      });
+      this.long_task_observer.observe({entryTypes: ["longtask"]});
+    }
+  }
+
+  stop() {
+    if (this.sample_timer) {
+      clearInterval(this.sample_timer);
+      this.sample_timer = 0;
+    }
+    if (this.long_task_observer) {
+      this.long_task_observer.disconnect();
+      this.long_task_observer = null;
+    }
+  }
+
+  sample() {
+    const now = performance.now();
+    const elapsed = now - this.last_sample;
+    this.last_sample = now;
+    if (elapsed <= 0) {
+      return;
+    }
+    //the timer fires late when the main thread is busy:
+    const lag = Math.max(0, elapsed - TELEMETRY_SAMPLE_INTERVAL);
+    this.record("main.lag", lag);
+    const busy = Math.min(1, Math.max(lag, this.long_task_time) / elapsed);
+    this.long_task_time = 0;
+    let queued = 0;
+    for (const [name, [get_value, load]] of this.gauges) {
+      const value = get_value() || 0;
+      this.record(`queue.${name}`, value);
+      if (load) {
+        queued += value;
+      }
+    }
+    //exponentially damped moving averages, like unix load averages:
+    const sample = busy + queued;
+    LOAD_AVERAGE_PERIODS.forEach((period, index) => {
+      const decay = Math.exp(-elapsed / 1000 / period);
+      this.load[index] = this.load[index] * decay + sample * (1 - decay);
+    });
+  }
+
+  get_load() {
+    //in the format used by the server: the load average multiplied by 1000
+    return this.load.map((value) => Math.round(value * 1000));
+  }
+
+  get_info() {
+    const histograms = {};
+    for (const [name, histogram] of this.histograms) {
+      histograms[name] = histogram.get_stats();
+    }
+    return {
+      histograms,
+      counters: Object.fromEntries(this.counters),
+      load: this.get_load(),
+    };
+  }
+}
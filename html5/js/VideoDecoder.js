@@ -27,9 +27,11 @@ class XpraVideoDecoder {
     this.had_first_key = false;
     this.draining = false;
 
-    this.decoder_queue = [];
-    this.decoded_frames = [];
-    this.erroneous_frame = null;
+    // the frames submitted to the decoder, by timestamp,
+    // each one with the callbacks of the promise returned by `queue_frame`:
+    this.pending_frames = new Map();
+    // callbacks waiting for the decoder's queue to shrink:
+    this.dequeue_waiters = [];
 
     this.coding = null;
     this.codec = null;
@@ -37,9 +39,11 @@ class XpraVideoDecoder {
     // the server signals it per frame and it defaults to full-range:
     this.full_range = true;
     this.vp9_params = null;
-    this.frameWaitTimeout = 1; // Interval for wait loop while frame is being decoded
 
+    // skip painting frames when this many are still waiting to be decoded:
     this.frame_threshold = 250;
+    // wait before submitting more chunks when the decoder has this many queued:
+    this.max_decode_queue_size = 8;
   }
 
   prepareVP9params(csc) {
@@ -75,6 +79,8 @@ class XpraVideoDecoder {
       output: this._on_decoded_frame.bind(this),
       error: this._on_decoder_error.bind(this),
     });
+    // not available in older browsers, the decoded frames also wake up the waiters:
+    this.videoDecoder.addEventListener("dequeue", () => this._wake_dequeue_waiters());
 
     // ToDo: hardwareAcceleration can be "no-preference" / "prefer-hardware" / "prefer-software"
     // Figure out when "prefer-hardware" is the right choise and when not (ie: no GPU, remote session like RDP?)
@@ -101,149 +107,152 @@ class XpraVideoDecoder {
     throw `No codec defined for coding ${coding}`;
   }
 
-  _on_decoded_frame(videoFrame) {
-    if (this.decoder_queue.length === 0) {
-      videoFrame.close();
-      return;
+  _wake_dequeue_waiters() {
+    const waiters = this.dequeue_waiters;
+    this.dequeue_waiters = [];
+    for (const resolve of waiters) {
+      resolve();
     }
+  }
+
+  _wait_for_dequeue() {
+    return new Promise((resolve) => this.dequeue_waiters.push(resolve));
+  }
 
+  _on_decoded_frame(videoFrame) {
+    this._wake_dequeue_waiters();
     // Find the frame
     const frame_timestamp = videoFrame.timestamp;
-    let current_frame = this.decoder_queue.filter(
-      (q) => q.p[10]["frame"] === frame_timestamp
-    );
-    if (current_frame.length === 1) {
-      // We found our frame!
-      this.decoder_queue = this.decoder_queue.filter(
-        (q) => q.p[10]["frame"] !== frame_timestamp
-      );
-      current_frame = current_frame[0];
-    } else {
+    const current_frame = this.pending_frames.get(frame_timestamp);
+    if (!current_frame) {
       // We decoded a frame the is no longer queued??
-      // TODO: handle error??
       videoFrame.close();
       return;
     }
+    // the frames submitted before this one will not be output anymore:
+    for (const [timestamp, skipped] of this.pending_frames) {
+      if (skipped === current_frame) {
+        break;
+      }
+      this.pending_frames.delete(timestamp);
+      this._throttle(skipped);
+    }
+    this.pending_frames.delete(frame_timestamp);
 
     if (frame_timestamp === 0) {
       this.last_timestamp = 0;
     }
 
     if (
-      this.decoder_queue.length > this.frame_threshold ||
+      this.pending_frames.size > this.frame_threshold ||
       this.last_timestamp > frame_timestamp
     ) {
       // Skip if the decoders queue is growing too big or this frames timestamp is smaller then the last one painted.
       videoFrame.close();
-
-      const packet = current_frame.p;
-      packet[6] = "throttle";
-      packet[7] = null;
-      this.decoded_frames.push(packet);
+      this._throttle(current_frame);
       return;
     }
 
-    this.last_timestamp = frame_timestamp;
-    const packet = current_frame.p;
-
     // Latest possible check for draining
     if (this.draining) {
       videoFrame.close();
+      current_frame.reject(new Error("video decoder is draining"));
       return;
     }
 
+    this.last_timestamp = frame_timestamp;
+    const packet = current_frame.packet;
     packet[6] = `frame:${packet[6]}`;
     packet[7] = videoFrame;
-    this.decoded_frames.push(packet);
+    current_frame.resolve(packet);
+  }
+
+  _throttle(frame) {
+    const packet = frame.packet;
+    packet[6] = "throttle";
+    packet[7] = null;
+    frame.resolve(packet);
+  }
+
+  _reject_pending_frames(message) {
+    const pending = [...this.pending_frames.values()];
+    this.pending_frames.clear();
+    for (const frame of pending) {
+      frame.reject(new Error(message));
+    }
+    this._wake_dequeue_waiters();
   }
 
   _on_decoder_error(error) {
-    // TODO: Handle error? Or just assume we will catch up?
-    this.erroneous_frame = `Error decoding frame: ${error}`;
-    console.error(this.erroneous_frame);
+    // the decoder is closed after an error,
+    // it will be re-initialized for the next frame:
+    const message = `Error decoding frame: ${error}`;
+    console.error(message);
+    this.initialized = false;
+    this.had_first_key = false;
+    this._reject_pending_frames(message);
   }
 
-  queue_frame(packet) {
-    // eslint-disable-next-line no-async-promise-executor
-    return new Promise(async (resolve, reject) => {
-      const options = packet[10] || {};
-      const data = packet[7];
-      const packet_sequence = packet[8];
+  async queue_frame(packet) {
+    const options = packet[10] || {};
+    const data = packet[7];
+    const packet_sequence = packet[8];
 
-      // the colour range can change mid-stream; the server emits a keyframe carrying the new
-      // range, so re-create the decoder with the matching colour space before decoding it:
-      const full_range = XpraVideoDecoder.full_range_from_options(options);
-      if (this.initialized && full_range !== this.full_range && this.coding) {
-        this._close();
-        this.init(this.coding, options);
-      }
+    // the colour range can change mid-stream; the server emits a keyframe carrying the new
+    // range, so re-create the decoder with the matching colour space before decoding it:
+    const full_range = XpraVideoDecoder.full_range_from_options(options);
+    if (this.initialized && full_range !== this.full_range && this.coding) {
+      this._close();
+      this.init(this.coding, options);
+    }
 
-      // H264 needs key frames
-      if (
-        this.codec.startsWith("avc1") &&
-        !this.had_first_key &&
-        !(options["type"] &&
-        options["type"] == "IDR")
-      ) {
-        reject(
-          new Error(
-            `first h264 frame must be a key frame but packet ${packet_sequence} is not: ${options}`
-          )
-        );
-        return;
-      }
+    // H264 needs key frames
+    if (
+      this.codec.startsWith("avc1") &&
+      !this.had_first_key &&
+      !(options["type"] &&
+      options["type"] == "IDR")
+    ) {
+      throw new Error(
+        `first h264 frame must be a key frame but packet ${packet_sequence} is not: ${options}`
+      );
+    }
 
-      if (this.videoDecoder.state === "closed") {
-        reject(new Error("video decoder is closed"));
-        return;
-      }
-      if (this.draining) {
-        reject(new Error("video decoder is draining"));
-        return;
-      }
+    // backpressure: don't let the decoder's own queue grow unbounded
+    while (
+      this.videoDecoder.state === "configured" &&
+      !this.draining &&
+      this.videoDecoder.decodeQueueSize >= this.max_decode_queue_size
+    ) {
+      await this._wait_for_dequeue();
+    }
 
-      this.had_first_key = true;
-      this.decoder_queue.push({
-        p: packet
+    if (this.videoDecoder.state === "closed") {
+      throw new Error("video decoder is closed");
+    }
+    if (this.draining) {
+      throw new Error("video decoder is draining");
+    }
+
+    this.had_first_key = true;
+    const timestamp = options["frame"];
+    const chunk = new EncodedVideoChunk({
+      type: options["type"] === "IDR" ? "key" : "delta",
+      data,
+      timestamp,
+    });
+    return new Promise((resolve, reject) => {
+      this.pending_frames.set(timestamp, {
+        packet,
+        resolve,
+        reject
       });
-      const init = {
-        type: options["type"] === "IDR" ? "key" : "delta",
-        data,
-        timestamp: options["frame"],
-      };
-      const chunk = new EncodedVideoChunk(init);
       try {
         this.videoDecoder.decode(chunk);
       } catch (error) {
-        reject(
-            new Error("failed to decode chunk: " + error)
-        );
+        this.pending_frames.delete(timestamp);
+        reject(new Error(`failed to decode chunk: ${error}`));
       }
-
-      let frame_out = this.decoded_frames.filter(
-        (p) => p[8] === packet_sequence
-      );
-      while (frame_out.length === 0) {
-        // Await our frame
-        await new Promise((r) => setTimeout(r, this.frameWaitTimeout));
-        if (this.erroneous_frame != null) {
-          // The last frame was erroneous, break the wait loop
-          break;
-        }
-        frame_out = this.decoded_frames.filter((p) => p[8] === packet_sequence);
-      }
-
-      if (this.erroneous_frame != null) {
-        // Last frame was erroneous. Reject the promise and reset the state.
-        const msg = this.erroneous_frame;
-        this.erroneous_frame = null;
-        reject(new Error(msg));
-      }
-      // Remove the frame from decoded frames list
-      this.decoded_frames = this.decoded_frames.filter(
-        (p) => p[8] !== packet_sequence
-      );
-      resolve(frame_out[0]);
     });
   }
 
@@ -254,7 +263,7 @@ class XpraVideoDecoder {
       }
       this.had_first_key = false;
       this.draining = true;
-      this.decoder_queue = [];
+      this._reject_pending_frames("video decoder is closed");
     }
     this.initialized = false;
   }
@@ -3,8 +3,11 @@
  *
  * Licensed under MPL 2.0
  *
- * xpra wire protocol for WebTransport
+ * xpra wire protocol for WebTransport,
+ * runs in the protocol worker when available
  *
+ * requires:
+ *  Protocol.js
  */
 
 /*
@@ -13,14 +16,23 @@ The main Xpra wire protocol
 class XpraWebTransportProtocol {
   constructor() {
     this.verify_connected_timer = 0;
+    this.is_worker = false;
     this.packet_handler = null;
     this.webtransport = null;
     this.stream = null;
     this.writer = null;
     this.raw_packets = [];
-    this.rQ = []; // Receive queue
+    this.rQ = new XpraReceiveQueue(); // Receive queue
     this.sQ = []; // Send queue
-    this.header = [];
+    this.send_buffer = new XpraSendBuffer();
+    this.send_timer = 0;
+    this.compressor = null;
+    this.compress_hash_table = null;
+    this.header = null;
+    this.receive_timer = 0;
+    this.trace = null;
+    //when the last chunk was received, using a clock we can compare across workers:
+    this.receive_time = 0;
 
     //Queue processing via intervals
     this.process_interval = 0; //milliseconds
@@ -37,9 +49,9 @@ class XpraWebTransportProtocol {
     const me = this;
     // (re-)init
     this.raw_packets = [];
-    this.rQ = [];
+    this.rQ.clear();
     this.sQ = [];
-    this.header = [];
+    this.header = null;
     this.webtransport = null;
     this.stream = null;
 
@@ -98,7 +110,6 @@ class XpraWebTransportProtocol {
 
   async read_loop() {
     const reader = this.stream.readable.getReader();
-    const me = this;
     while (true) {
       const {
         value,
@@ -107,8 +118,22 @@ class XpraWebTransportProtocol {
       if (done) {
         break;
       }
+      if (this.trace) {
+        this.trace.record(value);
+      }
+      this.receive_time = performance.timeOrigin + performance.now();
       this.rQ.push(value);
-      setTimeout(() => me.process_receive_queue(), this.process_interval);
+      this.schedule_receive_queue();
+    }
+  }
+
+  schedule_receive_queue() {
+    //a single task drains everything received until it runs:
+    if (!this.receive_timer) {
+      this.receive_timer = setTimeout(() => {
+        this.receive_timer = 0;
+        this.process_receive_queue();
+      }, this.process_interval);
     }
   }
 
@@ -124,59 +149,43 @@ class XpraWebTransportProtocol {
     if (wt) {
       wt.closed.then(() => {
           console.log("closed WebTransport connection");
-          handle(["close", "WebTransport closed"])
+          this.packet_handler(["close", "WebTransport closed"])
         })
         .catch((e) => {
           console.log("error closing WebTransport connection: " + e);
-          handle(["close", "error closing WebTransport connection", e.toString()])
+          this.packet_handler(["close", "error closing WebTransport connection", e.toString()])
         });
     }
     this.webtransport = null;
   }
 
+  terminate() {
+    //only the worker host needs to do anything here
+  }
+
   process_receive_queue() {
     while (this.webtransport && this.do_process_receive_queue());
   }
 
+  get receive_queue_size() {
+    return this.rQ.length;
+  }
+
   do_process_receive_queue() {
-    if (this.header.length < 8 && this.rQ.length > 0) {
-      //add from receive queue data to header until we get the 8 bytes we need:
-      while (this.header.length < 8 && this.rQ.length > 0) {
-        const slice = this.rQ[0];
-        const needed = 8 - this.header.length;
-        const n = Math.min(needed, slice.length);
-        this.header.push(...slice.subarray(0, n));
-        if (slice.length > needed) {
-          //replace the slice with what is left over:
-          this.rQ[0] = slice.subarray(n);
-        } else {
-          //this slice has been fully consumed already:
-          this.rQ.shift();
-        }
+    if (!this.header) {
+      if (this.rQ.length < 8) {
+        //we need more data to continue
+        return false;
       }
-
-      //verify the header format:
-      if (this.header[0] !== 80) {
-        let message = `invalid packet header format: ${this.header[0]}`;
-        if (this.header.length > 1) {
-          let hex = "";
-          for (let p of this.header) {
-            const v = p.toString(16);
-            hex += v.length < 2 ? `0${v}` : v;
-          }
-          message += `: 0x${hex}`;
-        }
-        this.protocol_error(message);
+      const header_data = this.rQ.read(8);
+      this.header = parse_packet_header(header_data);
+      if (!this.header) {
+        this.protocol_error(packet_header_error(header_data));
         return false;
       }
     }
 
-    if (this.header.length < 8) {
-      //we need more data to continue
-      return false;
-    }
-
-    let proto_flags = this.header[1];
+    let proto_flags = this.header.proto_flags;
     const proto_crypto = proto_flags & 0x2;
     if (proto_crypto) {
       throw "crypto packets not supported";
@@ -192,57 +201,27 @@ class XpraWebTransportProtocol {
       return;
     }
 
-    const level = this.header[2];
+    const level = this.header.level;
     if (level & 0x20) {
       this.protocol_error("lzo compression is not supported");
       return false;
     }
-    const index = this.header[3];
+    const index = this.header.index;
     if (index >= 20) {
       this.protocol_error(`invalid packet index: ${index}`);
       return false;
     }
-    let packet_size = [4, 5, 6, 7].reduce(
-      (accumulator, value) => accumulator * 0x1_00 + this.header[value],
-      0
-    );
+    const packet_size = this.header.payload_size;
 
     // verify that we have enough data for the full payload:
-    let rsize = this.rQ.reduce(
-      (accumulator, value) => accumulator + value.length,
-      0
-    );
-    if (rsize < packet_size) {
+    if (this.rQ.length < packet_size) {
       return false;
     }
 
     // done parsing the header, the next packet will need a new one:
-    this.header = [];
+    this.header = null;
 
-    let packet_data;
-    if (this.rQ[0].length === packet_size) {
-      //exact match: the payload is in a buffer already:
-      packet_data = this.rQ.shift();
-    } else {
-      //aggregate all the buffers into "packet_data" until we get exactly "packet_size" bytes:
-      packet_data = new Uint8Array(packet_size);
-      rsize = 0;
-      while (rsize < packet_size) {
-        const slice = this.rQ[0];
-        const needed = packet_size - rsize;
-        if (slice.length > needed) {
-          //add part of this slice:
-          packet_data.set(slice.subarray(0, needed), rsize);
-          rsize += needed;
-          this.rQ[0] = slice.subarray(needed);
-        } else {
-          //add this slice in full:
-          packet_data.set(slice, rsize);
-          rsize += slice.length;
-          this.rQ.shift();
-        }
-      }
-    }
+    let packet_data = this.rQ.read(packet_size);
 
     //decompress it if needed:
     if (level !== 0) {
@@ -259,7 +238,8 @@ class XpraWebTransportProtocol {
 
     //save it for later? (partial raw packet)
     if (index > 0) {
-      this.raw_packets[index] = packet_data;
+      //raw chunks (ie: pixel data) are used via their ArrayBuffer:
+      this.raw_packets[index] = transferable_buffer(packet_data);
       if (this.raw_packets.length >= 4) {
         this.protocol_error(`too many raw packets: ${this.raw_packets.length}`);
         return false;
@@ -269,7 +249,9 @@ class XpraWebTransportProtocol {
       let packet = null;
       try {
         if (proto_flags === 0x10) {
-          packet = rdecode(packet_data);
+          //the byte strings are views of the packet data,
+          //so it must not share its buffer with other packets:
+          packet = rdecode(transferable_buffer(packet_data));
         } else if (proto_flags === 0x1) {
           throw `rencode legacy mode is not supported, protocol flag: ${proto_flags}`;
         } else {
@@ -289,7 +271,7 @@ class XpraWebTransportProtocol {
       }
       try {
         // pass to our packet handler
-        this.packet_handler(packet);
+        this.packet_handler(packet, this.receive_time);
       } catch (error) {
         //FIXME: maybe we should error out and disconnect here?
         console.error(`error processing packet ${packet[0]}: ${error}`);
@@ -300,48 +282,65 @@ class XpraWebTransportProtocol {
   }
 
   process_send_queue() {
+    //frames all the packets queued and writes them in one go
+    const send_buffer = this.send_buffer;
+    send_buffer.reset();
     while (this.sQ.length > 0 && this.webtransport) {
       const packet = this.sQ.shift();
       if (!packet) {
-        return;
+        break;
       }
-      let proto_flags = 0x10;
       let bdata = null;
       try {
-        bdata = rencode(packet);
+        //copied by `append` or `compress_packet_data`:
+        bdata = rencode_view(packet);
       } catch (error) {
         console.error("Error: failed to encode packet:", packet);
         console.error(error);
         continue;
       }
-      const payload_size = bdata.length;
-      const packet_data = new Uint8Array(payload_size + 8);
-      const level = 0;
-      //header:
-      packet_data[0] = "P".charCodeAt(0);
-      packet_data[1] = proto_flags;
-      packet_data[2] = level;
-      packet_data[3] = 0;
-      //size header:
-      for (let index = 0; index < 4; index++) {
-        packet_data[7 - index] = (payload_size >> (8 * index)) & 0xff;
-      }
-      packet_data.set(bdata, 8);
-      if (this.stream) {
-        this.writer.write(new Uint8Array(packet_data).buffer);
-      }
+      const [level, payload] = compress_packet_data(bdata, this.compressor, this.compress_hash_table);
+      send_buffer.append(0x10, level, payload.length, payload);
     }
+    if (send_buffer.length > 0 && this.stream) {
+      //the stream may hold on to the chunk, so it needs its own copy:
+      this.writer.write(send_buffer.view().slice());
+    }
+    send_buffer.reset();
   }
 
   send(packet) {
     this.sQ[this.sQ.length] = packet;
-    setTimeout(() => this.process_send_queue(), this.process_interval);
+    //a single task sends everything queued until it runs:
+    if (!this.send_timer) {
+      this.send_timer = setTimeout(() => {
+        this.send_timer = 0;
+        this.process_send_queue();
+      }, this.process_interval);
+    }
   }
 
   set_packet_handler(callback) {
     this.packet_handler = callback;
   }
 
+  start_trace() {
+    this.trace = new XpraTraceRecorder();
+  }
+
+  stop_trace(callback) {
+    const trace = this.trace;
+    this.trace = null;
+    callback(trace ? trace.serialize() : null);
+  }
+
+  set_compressor(compressor) {
+    this.compressor = compressor === "lz4" ? compressor : null;
+    if (this.compressor && !this.compress_hash_table) {
+      this.compress_hash_table = new Uint32Array(1 << 16);
+    }
+  }
+
   set_cipher_in(caps, key) {
     throw "not supported with WebTransport";
   }
@@ -13,11 +13,115 @@
  */
 
 const TASKBAR_HEIGHT = 0;
+// beyond this number of damaged rectangles, we use their bounding box:
+const MAX_DAMAGE_RECTANGLES = 64;
+// merge two rectangles if their bounding box is not much bigger than they are:
+const DAMAGE_MERGE_RATIO = 1.25;
 
 function dummy() {
   //this placeholder function does nothing
 }
 
+/*
+A set of rectangles clipped to the window's buffer,
+overlapping or nearby rectangles are merged as they are added.
+*/
+class XpraDamageRegion {
+  constructor(width, height) {
+    this.width = width;
+    this.height = height;
+    this.rectangles = [];
+  }
+
+  resize(width, height) {
+    this.width = width;
+    this.height = height;
+    this.rectangles = [];
+  }
+
+  clear() {
+    this.rectangles = [];
+  }
+
+  is_empty() {
+    return this.rectangles.length === 0;
+  }
+
+  intersects(x, y, w, h) {
+    for (const [rx, ry, rw, rh] of this.rectangles) {
+      if (rx < x + w && x < rx + rw && ry < y + h && y < ry + rh) {
+        return true;
+      }
+    }
+    return false;
+  }
+
+  add_all() {
+    this.rectangles = [];
+    this.add(0, 0, this.width, this.height);
+  }
+
+  add_region(region) {
+    for (const [x, y, w, h] of region.rectangles) {
+      this.add(x, y, w, h);
+    }
+  }
+
+  add(x, y, w, h) {
+    //clip to the buffer, so the rectangles can be used as drawImage source:
+    let x1 = Math.max(0, Math.floor(x));
+    let y1 = Math.max(0, Math.floor(y));
+    let x2 = Math.min(this.width, Math.ceil(x + w));
+    let y2 = Math.min(this.height, Math.ceil(y + h));
+    if (x2 <= x1 || y2 <= y1) {
+      return;
+    }
+    //absorb every rectangle we can merge with,
+    //the result may then be mergeable with rectangles we have already checked:
+    let merged = true;
+    while (merged) {
+      merged = false;
+      for (let index = 0; index < this.rectangles.length; index++) {
+        const [rx, ry, rw, rh] = this.rectangles[index];
+        const ux1 = Math.min(x1, rx);
+        const uy1 = Math.min(y1, ry);
+        const ux2 = Math.max(x2, rx + rw);
+        const uy2 = Math.max(y2, ry + rh);
+        const union_area = (ux2 - ux1) * (uy2 - uy1);
+        const area = (x2 - x1) * (y2 - y1) + rw * rh;
+        if (union_area <= area * DAMAGE_MERGE_RATIO) {
+          x1 = ux1;
+          y1 = uy1;
+          x2 = ux2;
+          y2 = uy2;
+          this.rectangles.splice(index, 1);
+          merged = true;
+          break;
+        }
+      }
+    }
+    this.rectangles.push([x1, y1, x2 - x1, y2 - y1]);
+    if (this.rectangles.length > MAX_DAMAGE_RECTANGLES) {
+      const bounds = this.bounds();
+      this.rectangles = [bounds];
+    }
+  }
+
+  bounds() {
+    let x1 = this.width;
+    let y1 = this.height;
+    let x2 = 0;
+    let y2 = 0;
+    for (const [x, y, w, h] of this.rectangles) {
+      x1 = Math.min(x1, x);
+      y1 = Math.min(y1, y);
+      x2 = Math.max(x2, x + w);
+      y2 = Math.max(y2, y + h);
+    }
+    return [x1, y1, Math.max(0, x2 - x1), Math.max(0, y2 - y1)];
+  }
+}
+
 /**
  * This is the class representing a window we draw on the canvas.
  * It has a geometry, it may have borders and a top bar.
@@ -83,6 +187,7 @@ class XpraWindow {
     this.debug_categories = client.debug_categories;
 
     this.canvas = null;
+    this.scroll_painter = new XpraScrollPainter();
     this.init_canvas();
 
     //window attributes:
@@ -157,6 +262,8 @@ class XpraWindow {
     this.spinnerdiv = jQuery(`#spinner${wid}`);
 
     this.cursor_data = null;
+    this.cursor_url = new XpraObjectURL();
+    this.icon_url = new XpraObjectURL();
     this.pointer_down = -1;
     this.pointer_last_x = 0;
     this.pointer_last_y = 0;
@@ -346,7 +453,7 @@ class XpraWindow {
     canvas.height = this.h;
     this.canvas = canvas;
     this.div.append(canvas);
-    if (this.client.offscreen_api && this.client.decode_worker) {
+    if (this.client.offscreen_api && this.client.decode_workers) {
       // Transfer canvas control.
       this.transfer_canvas(canvas);
     } else {
@@ -354,9 +461,7 @@ class XpraWindow {
       this.canvas_ctx = this.canvas.getContext("2d");
       this.canvas_ctx.imageSmoothingEnabled = false;
 
-      this.init_offscreen_canvas();
-
-      this.draw_canvas = this.offscreen_canvas;
+      this.init_back_buffers();
       this.paint_queue = [];
       this.paint_pending = 0;
     }
@@ -366,7 +471,7 @@ class XpraWindow {
 
   transfer_canvas(canvas) {
     const offscreen_handle = canvas.transferControlToOffscreen();
-    this.client.decode_worker.postMessage({
+    this.client.decode_workers.post(this.wid, {
         cmd: "canvas",
         wid: this.wid,
         canvas: offscreen_handle,
@@ -376,20 +481,59 @@ class XpraWindow {
     );
   }
 
-  init_offscreen_canvas() {
-    this.offscreen_canvas = document.createElement("canvas");
-    this.offscreen_canvas.width = this.w;
-    this.offscreen_canvas.height = this.h;
-    this.offscreen_canvas_ctx = this.offscreen_canvas.getContext("2d");
-    this.offscreen_canvas_ctx.imageSmoothingEnabled = false;
+  make_back_buffer() {
+    const canvas = document.createElement("canvas");
+    canvas.width = this.w;
+    canvas.height = this.h;
+    const context = canvas.getContext("2d");
+    context.imageSmoothingEnabled = false;
+    return [canvas, context];
+  }
+
+  init_back_buffers() {
+    //we paint into `offscreen_canvas` and present `draw_canvas`,
+    //the two buffers are flipped by `swap_buffers` and only re-created with the window:
+    [this.offscreen_canvas, this.offscreen_canvas_ctx] = this.make_back_buffer();
+    [this.draw_canvas, this.draw_canvas_ctx] = this.make_back_buffer();
+    //the areas painted into `offscreen_canvas` since the last swap:
+    this.damage = new XpraDamageRegion(this.w, this.h);
+    //the areas of `draw_canvas` not presented on the visible canvas yet:
+    this.present_damage = new XpraDamageRegion(this.w, this.h);
+  }
+
+  add_damage(x, y, w, h) {
+    this.damage.add(x, y, w, h);
+  }
+
+  invalidate() {
+    //the next `draw` will present the whole buffer
+    if (this.present_damage) {
+      this.present_damage.add_all();
+    }
+  }
+
+  get_damage_rectangles() {
+    return this.present_damage ? this.present_damage.rectangles : [];
   }
 
   swap_buffers() {
     //the up to date canvas is what we'll draw on screen:
     this.debug("draw", "swap_buffers");
-    this.draw_canvas = this.offscreen_canvas;
-    this.init_offscreen_canvas();
-    this.offscreen_canvas_ctx.drawImage(this.draw_canvas, 0, 0);
+    const front = this.offscreen_canvas;
+    const front_ctx = this.offscreen_canvas_ctx;
+    this.offscreen_canvas = this.draw_canvas;
+    this.offscreen_canvas_ctx = this.draw_canvas_ctx;
+    this.draw_canvas = front;
+    this.draw_canvas_ctx = front_ctx;
+    //the new back buffer was last updated before the frame we are presenting,
+    //so it only needs the areas painted since then:
+    const context = this.offscreen_canvas_ctx;
+    for (const [x, y, w, h] of this.damage.rectangles) {
+      context.clearRect(x, y, w, h);
+      context.drawImage(front, x, y, w, h, x, y, w, h);
+    }
+    this.present_damage.add_region(this.damage);
+    this.damage.clear();
   }
 
   register_canvas_mouse_events(canvas) {
@@ -502,8 +646,8 @@ class XpraWindow {
   }
 
   updateCanvasGeometry() {
-    if (this.client.offscreen_api && this.client.decode_worker) {
-      this.client.decode_worker.postMessage({
+    if (this.client.offscreen_api && this.client.decode_workers) {
+      this.client.decode_workers.post(this.wid, {
         cmd: "canvas-geo",
         wid: this.wid,
         w: this.w,
@@ -512,17 +656,37 @@ class XpraWindow {
       return;
     }
     // set size of both canvas if needed
+    // (resizing the visible canvas clears it, so it will need a full redraw)
+    let cleared = false;
     if (this.canvas.width !== this.w) {
       this.canvas.width = this.w;
+      cleared = true;
     }
     if (this.canvas.height !== this.h) {
       this.canvas.height = this.h;
+      cleared = true;
+    }
+    // resizing clears the back buffers,
+    // so they no longer have any contents to synchronize:
+    let resized = false;
+    for (const buffer of [this.offscreen_canvas, this.draw_canvas]) {
+      if (buffer.width !== this.w) {
+        buffer.width = this.w;
+        resized = true;
+      }
+      if (buffer.height !== this.h) {
+        buffer.height = this.h;
+        resized = true;
+      }
     }
-    if (this.offscreen_canvas.width !== this.w) {
-      this.offscreen_canvas.width = this.w;
+    if (resized) {
+      this.offscreen_canvas_ctx.imageSmoothingEnabled = false;
+      this.draw_canvas_ctx.imageSmoothingEnabled = false;
+      this.damage.resize(this.w, this.h);
+      this.present_damage.resize(this.w, this.h);
     }
-    if (this.offscreen_canvas.height !== this.h) {
-      this.offscreen_canvas.height = this.h;
+    if (cleared) {
+      this.present_damage.add_all();
     }
   }
 
@@ -547,6 +711,7 @@ class XpraWindow {
     jQuery(this.div).css("left", this.outerX);
     jQuery(this.div).css("top", this.outerY);
     this.debug("geometry", "updateCSSGeometry() left=", this.outerX, ", top=", this.outerY, ", width=", this.outerW, ", height=", this.outerH);
+    this.client.visibility.schedule();
   }
 
   focus() {
@@ -621,6 +786,7 @@ class XpraWindow {
       z += 2500;
     }
     jQuery(this.div).css("z-index", z);
+    this.client.visibility.schedule();
   }
 
   /**
@@ -863,6 +1029,7 @@ class XpraWindow {
     } else {
       jQuery(this.div).show(200);
     }
+    this.client.visibility.schedule();
   }
 
   /**
@@ -1186,6 +1353,10 @@ class XpraWindow {
   }
 
   update_icon(width, height, encoding, img_data) {
+    if (this.icon && this.icon.img_data === img_data && this.icon_url.url) {
+      //same icon as before, the object URL is still valid:
+      return this.icon_url.url;
+    }
     // Cache the icon.
     this.icon = {
       width,
@@ -1205,7 +1376,9 @@ class XpraWindow {
         }
         img_data = uint;
       }
-      source = this.construct_base64_image_url(encoding, img_data);
+      source = this.icon_url.set(image_blob(encoding, img_data));
+    } else {
+      this.icon_url.revoke();
     }
     jQuery(`#windowicon${this.wid}`).attr("src", source);
     jQuery(`#windowlistitemicon${this.wid}`).attr("src", source);
@@ -1215,6 +1388,7 @@ class XpraWindow {
   reset_cursor() {
     jQuery(`#${this.wid}`).css("cursor", "default");
     this.cursor_data = null;
+    this.cursor_url.revoke();
   }
 
   set_cursor(encoding, w, h, xhot, yhot, img_data) {
@@ -1223,7 +1397,7 @@ class XpraWindow {
       return;
     }
     const window_element = jQuery(`#${this.wid}`);
-    const cursor_url = this.construct_base64_image_url(encoding, img_data);
+    const blob = image_blob(encoding, img_data);
     const me = this;
 
     function set_cursor_url(url, x, y, w, h) {
@@ -1241,26 +1415,32 @@ class XpraWindow {
     if (zoom !== 1 && !Utilities.isMacOS()) {
       //scale it:
       this.debug("geometry", "scaling cursor by zoom factor:", zoom);
-      const temporary_img = new Image();
-      temporary_img.addEventListener("load", () => {
+      this.client.image_decoder.decode(encoding, img_data).then((image) => {
         const canvas = document.createElement("canvas");
         const context = canvas.getContext("2d");
         context.imageSmoothingEnabled = false;
         canvas.width = Math.round(w * window.devicePixelRatio);
         canvas.height = Math.round(h * window.devicePixelRatio);
-        context.drawImage(temporary_img, 0, 0, canvas.width, canvas.height);
-        const scaled_cursor_url = canvas.toDataURL();
-        set_cursor_url(
-          scaled_cursor_url,
-          Math.round(xhot * window.devicePixelRatio),
-          Math.round(yhot * window.devicePixelRatio),
-          Math.round(canvas.width),
-          Math.round(canvas.height),
-        );
-      });
-      temporary_img.src = cursor_url;
+        context.drawImage(image, 0, 0, canvas.width, canvas.height);
+        if (image.close) {
+          image.close();
+        }
+        canvas.toBlob((scaled_blob) => {
+          if (!scaled_blob) {
+            this.warn("failed to scale the cursor");
+            return;
+          }
+          set_cursor_url(
+            this.cursor_url.set(scaled_blob),
+            Math.round(xhot * window.devicePixelRatio),
+            Math.round(yhot * window.devicePixelRatio),
+            Math.round(canvas.width),
+            Math.round(canvas.height),
+          );
+        });
+      }, (error) => this.warn("failed to decode the cursor:", error));
     } else {
-      set_cursor_url(cursor_url, xhot, yhot, w, h);
+      set_cursor_url(this.cursor_url.set(blob), xhot, yhot, w, h);
     }
   }
 
@@ -1276,11 +1456,24 @@ class XpraWindow {
    * framerate e.g if the browser window/tab is not visible.
    */
   draw() {
-    //pass the 'buffer' canvas directly to visible canvas context
-    if (this.has_alpha || this.tray) {
-      this.canvas_ctx.clearRect(0, 0, this.draw_canvas.width, this.draw_canvas.height);
+    //copy the areas updated since the last call from the 'buffer' canvas to the visible canvas
+    const clear = this.has_alpha || this.tray;
+    const rectangles = this.present_damage.rectangles;
+    for (const [x, y, w, h] of rectangles) {
+      if (clear) {
+        this.canvas_ctx.clearRect(x, y, w, h);
+      }
+      this.canvas_ctx.drawImage(this.draw_canvas, x, y, w, h, x, y, w, h);
+    }
+    if (this.debug_categories.includes("draw")) {
+      //show the areas we have just presented:
+      this.canvas_ctx.strokeStyle = "magenta";
+      this.canvas_ctx.lineWidth = 1;
+      for (const [x, y, w, h] of rectangles) {
+        this.canvas_ctx.strokeRect(x + 0.5, y + 0.5, w - 1, h - 1);
+      }
     }
-    this.canvas_ctx.drawImage(this.draw_canvas, 0, 0);
+    this.present_damage.clear();
   }
 
   /**
@@ -1289,7 +1482,7 @@ class XpraWindow {
    * The image is painted into off-screen canvas.
    */
   paint() {
-    if (this.client.decode_worker) {
+    if (this.client.decode_workers) {
       //no need to synchronize paint packets here
       //the decode worker ensures that we get the packets
       //in the correct order, ready to update the canvas
@@ -1325,6 +1518,8 @@ class XpraWindow {
     this.offscreen_canvas_ctx.strokeStyle = color;
     this.offscreen_canvas_ctx.lineWidth = 2;
     this.offscreen_canvas_ctx.strokeRect(px, py, pw, ph);
+    //the line is centered on the edges:
+    this.add_damage(px - 1, py - 1, pw + 2, ph + 2);
   }
 
   do_paint(packet, decode_callback) {
@@ -1372,6 +1567,7 @@ class XpraWindow {
       //the decode worker is giving us a Bitmap object ready to use:
       me.offscreen_canvas_ctx.clearRect(x, y, img_data.width, img_data.height);
       me.offscreen_canvas_ctx.drawImage(img_data, x, y);
+      me.add_damage(x, y, img_data.width, img_data.height);
       painted();
       //this isn't really needed since we don't use the paint_queue at all
       //when decoding in the worker (bitmaps can only come from the decode worker)
@@ -1388,9 +1584,11 @@ class XpraWindow {
           return;
         }
         const rgb_data = decode_rgb(packet);
-        const img = this.offscreen_canvas_ctx.createImageData(enc_width, enc_height);
-        img.data.set(rgb_data);
+        const pixels = new Uint8ClampedArray(rgb_data.buffer, rgb_data.byteOffset, enc_width * enc_height * 4);
+        const img = new ImageData(pixels, enc_width, enc_height);
         this.offscreen_canvas_ctx.putImageData(img, x, y, 0, 0, width, height);
+        rgb_buffer_pool.release(rgb_data);
+        this.add_damage(x, y, width, height);
         painted();
         this.may_paint_now();
       } else if (coding === "jpeg" || coding.startsWith("png") || coding === "webp") {
@@ -1398,23 +1596,20 @@ class XpraWindow {
           paint_bitmap();
           return;
         }
-        const image = new Image();
-        image.addEventListener("load", () => {
-          if (image.width === 0 || image.height === 0) {
-            paint_error(`invalid image size: ${image.width}x${image.height}`);
-          } else {
-            this.offscreen_canvas_ctx.clearRect(x, y, width, height);
-            this.offscreen_canvas_ctx.drawImage(image, x, y, width, height);
-            painted();
+        const paint_coding = coding.split("/")[0]; //ie: "png/P" -> "png"
+        this.client.image_decoder.decode(paint_coding, img_data).then((image) => {
+          this.offscreen_canvas_ctx.clearRect(x, y, width, height);
+          this.offscreen_canvas_ctx.drawImage(image, x, y, width, height);
+          if (image.close) {
+            image.close();
           }
+          this.add_damage(x, y, width, height);
+          painted();
           this.may_paint_now();
-        });
-        image.onerror = () => {
-          paint_error(`failed to load ${coding} into image tag`);
+        }, (error) => {
+          paint_error(error);
           this.may_paint_now();
-        };
-        const paint_coding = coding.split("/")[0]; //ie: "png/P" -> "png"
-        image.src = this.construct_base64_image_url(paint_coding, img_data);
+        });
       } else if (coding === "h264") {
         paint_error("h264 decoding is only supported via the decode workers");
         this.may_paint_now();
@@ -1422,20 +1617,14 @@ class XpraWindow {
         // newer servers use options,
         // older ones overload the image data:
         const scrolls = options["scroll"] || img_data;
-        for (let index = 0, stop = scrolls.length; index < stop; ++index) {
-          const scroll_data = scrolls[index];
-          this.debug("draw", "scroll", index, ":", scroll_data);
-          const sx = scroll_data[0];
-          const sy = scroll_data[1];
-          const sw = scroll_data[2];
-          const sh = scroll_data[3];
-          const xdelta = scroll_data[4];
-          const ydelta = scroll_data[5];
-          this.offscreen_canvas_ctx.drawImage(
-            this.draw_canvas,
-            sx, sy, sw, sh,
-            sx + xdelta, sy + ydelta, sw, sh
-          );
+        this.debug("draw", "scroll:", scrolls);
+        //the presented buffer can be used as reference,
+        //unless the area we read from has been painted since the last swap:
+        const [bx, by, bw, bh] = XpraScrollPainter.get_bounds(scrolls, this.w, this.h);
+        const reference = this.damage.intersects(bx, by, bw, bh) ? null : this.draw_canvas;
+        this.scroll_painter.paint(this.offscreen_canvas_ctx, scrolls, reference);
+        for (const [sx, sy, sw, sh, xdelta, ydelta] of scrolls) {
+          this.add_damage(sx + xdelta, sy + ydelta, sw, sh);
           if (this.debug_categories.includes("draw")) {
             this.paint_box("brown", sx + xdelta, sy + ydelta, sw, sh);
           }
@@ -1452,15 +1641,12 @@ class XpraWindow {
     }
   }
 
-  construct_base64_image_url(encoding, imageDataArrayBuffer) {
-    const imageDataBase64 = Utilities.ArrayBufferToBase64(imageDataArrayBuffer);
-    return `data:image/${encoding};base64,${imageDataBase64}`;
-  }
-
   /**
    * Close the window and free all resources
    */
   destroy() {
+    this.cursor_url.revoke();
+    this.icon_url.revoke();
     // remove div
     this.div.remove();
   }
@@ -0,0 +1,196 @@
+/*
+ * This file is part of Xpra.
+ * Copyright (C) 2026 Antoine Martin <antoine@xpra.org>
+ * Licensed under MPL 2.0, see:
+ * http://www.mozilla.org/MPL/2.0/
+ *
+ * Tracks which windows the user can actually see:
+ * the server slows down the updates of the windows that are minimized,
+ * outside the viewport or covered by other windows,
+ * and refreshes them as soon as they become visible again.
+ */
+
+// how long we wait for the layout to settle before evaluating the windows:
+const VISIBILITY_CHECK_DELAY = 100;
+// the batch delay requested for the windows that cannot be seen, in milliseconds:
+const HIDDEN_WINDOW_BATCH_DELAY = 1000;
+// give up and assume the window is visible when it is split into more pieces than this:
+const OCCLUSION_MAX_RECTANGLES = 64;
+
+function subtract_rectangle(rect, other) {
+  //returns the parts of `rect` not covered by `other`,
+  //both are `[left, top, right, bottom]`
+  const [left, top, right, bottom] = rect;
+  const [oleft, otop, oright, obottom] = other;
+  if (oleft >= right || oright <= left || otop >= bottom || obottom <= top) {
+    return [rect];
+  }
+  const pieces = [];
+  if (otop > top) {
+    pieces.push([left, top, right, otop]);
+  }
+  if (obottom < bottom) {
+    pieces.push([left, obottom, right, bottom]);
+  }
+  const mtop = Math.max(top, otop);
+  const mbottom = Math.min(bottom, obottom);
+  if (oleft > left) {
+    pieces.push([left, mtop, oleft, mbottom]);
+  }
+  if (oright < right) {
+    pieces.push([oright, mtop, right, mbottom]);
+  }
+  return pieces;
+}
+
+function is_covered(rect, occluders) {
+  let pieces = [rect];
+  for (const occluder of occluders) {
+    pieces = pieces.flatMap((piece) => subtract_rectangle(piece, occluder));
+    if (pieces.length === 0) {
+      return true;
+    }
+    if (pieces.length > OCCLUSION_MAX_RECTANGLES) {
+      return false;
+    }
+  }
+  return false;
+}
+
+class XpraVisibilityTracker {
+  constructor(client) {
+    this.client = client;
+    this.timer = 0;
+    // the windows the server is throttling:
+    this.hidden = new Set();
+    // wid -> intersects the viewport:
+    this.in_viewport = new Map();
+    this.observer = null;
+    if (typeof IntersectionObserver !== "undefined") {
+      this.observer = new IntersectionObserver((entries) => this.on_intersection(entries));
+    }
+  }
+
+  add(win) {
+    if (this.observer) {
+      this.observer.observe(win.div);
+    }
+    this.schedule();
+  }
+
+  remove(win) {
+    if (this.observer) {
+      this.observer.unobserve(win.div);
+    }
+    this.hidden.delete(win.wid);
+    this.in_viewport.delete(win.wid);
+    this.schedule();
+  }
+
+  on_intersection(entries) {
+    for (const entry of entries) {
+      this.in_viewport.set(Number(entry.target.id), entry.isIntersecting);
+    }
+    this.schedule();
+  }
+
+  schedule() {
+    //called whenever the windows may have been moved, restacked, minimized or resized
+    if (!this.timer) {
+      this.timer = setTimeout(() => {
+        this.timer = 0;
+        this.update();
+      }, VISIBILITY_CHECK_DELAY);
+    }
+  }
+
+  reset() {
+    //the server has been asked to refresh all the windows,
+    //so we have to throttle the hidden ones again:
+    this.hidden.clear();
+    this.schedule();
+  }
+
+  stop() {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = 0;
+    }
+    if (this.observer) {
+      this.observer.disconnect();
+    }
+    this.hidden.clear();
+    this.in_viewport.clear();
+  }
+
+  get_occluders() {
+    //the opaque windows that can hide the windows below them,
+    //as `[z-index, rectangle]`
+    const occluders = [];
+    for (const win of Object.values(this.client.id_to_window)) {
+      if (win.minimized || win.tray || win.has_alpha || Number(win.div.style.opacity || 1) < 1) {
+        continue;
+      }
+      const box = win.div.getBoundingClientRect();
+      occluders.push([Number(win.div.style.zIndex) || 0, [box.left, box.top, box.right, box.bottom]]);
+    }
+    //the window preview only shows snapshots of the windows below it:
+    const preview = document.querySelector(WINDOW_PREVIEW_SELECTOR);
+    if (preview && preview.offsetParent !== null) {
+      const box = preview.getBoundingClientRect();
+      occluders.push([Infinity, [box.left, box.top, box.right, box.bottom]]);
+    }
+    return occluders;
+  }
+
+  is_visible(win, occluders) {
+    if (win.minimized) {
+      return false;
+    }
+    if (this.in_viewport.get(win.wid) === false) {
+      return false;
+    }
+    const z = Number(win.div.style.zIndex) || 0;
+    const box = win.div.getBoundingClientRect();
+    const above = occluders.filter(([oz]) => oz > z).map(([, rect]) => rect);
+    return !is_covered([box.left, box.top, box.right, box.bottom], above);
+  }
+
+  update() {
+    const client = this.client;
+    if (!client.throttle_hidden_windows || !client.connected || document.hidden) {
+      //when the whole page is hidden, the client throttles all the windows
+      return;
+    }
+    const occluders = this.get_occluders();
+    for (const win of Object.values(client.id_to_window)) {
+      if (win.tray) {
+        continue;
+      }
+      const wid = win.wid;
+      const visible = this.is_visible(win, occluders);
+      if (visible && this.hidden.has(wid)) {
+        this.hidden.delete(wid);
+        client.debug("draw", "window", wid, "is visible again");
+        client.request_refresh(wid);
+      } else if (!visible && !this.hidden.has(wid)) {
+        this.hidden.add(wid);
+        client.debug("draw", "window", wid, "is hidden, throttling it");
+        client.send_control_refresh(1, {
+          "batch": {
+            "reset": true,
+            "delay": HIDDEN_WINDOW_BATCH_DELAY,
+            "locked": true,
+            "always": true,
+          },
+        }, wid);
+      }
+    }
+  }
+
+  get_info() {
+    return {
+      hidden: [...this.hidden],
+    };
+  }
+}
@@ -738,7 +738,8 @@ lz4.compress = function compress (src, maxSize) {
 
 /********************************************************************************/
 //convenience function added for xpra:
-lz4.decode = function(data) {
+//(the optional `output` array is used if it is big enough)
+lz4.decode = function(data, output) {
 	const length = data[0] | (data[1] << 8) | (data[2] << 16) | (data[3] << 24);
 	if (length<=0) {
 		throw "invalid length: "+length;
@@ -746,7 +747,38 @@ lz4.decode = function(data) {
 	if (length>1024*1024*1024) {
 		throw "length too long: "+length;
 	}
-	const inflated = new Uint8Array(length);
-	lz4.decompressBlock(data, inflated, 4, length, 0);
+	let inflated;
+	if (output && output.length >= length) {
+		inflated = output.subarray(0, length);
+	} else {
+		inflated = new Uint8Array(length);
+	}
+	lz4.decompressBlock(data, inflated, 4, data.length - 4, 0);
 	return inflated;
 }
+
+//the size of the data once decoded, so the caller can provide the output array:
+lz4.decoded_length = function(data) {
+	return data[0] | (data[1] << 8) | (data[2] << 16) | (data[3] << 24);
+}
+
+//the inverse of `decode`: the uncompressed size (little endian) followed by an lz4 block,
+//returns null if the data does not compress
+//(the optional `hash_table` is re-used between calls)
+lz4.encode = function(data, hash_table) {
+	const table = hash_table || new Uint32Array(hashSize);
+	table.fill(0);
+	const block = new Uint8Array(lz4.compressBound(data.length));
+	const size = lz4.compressBlock(data, block, 0, data.length, table);
+	if (size === 0 || size + 4 >= data.length) {
+		return null;
+	}
+	const encoded = new Uint8Array(4 + size);
+	const length = data.length;
+	encoded[0] = length & 0xff;
+	encoded[1] = (length >> 8) & 0xff;
+	encoded[2] = (length >> 16) & 0xff;
+	encoded[3] = (length >> 24) & 0xff;
+	encoded.set(block.subarray(0, size), 4);
+	return encoded;
+}
@@ -43,292 +43,307 @@ Number.isSafeInteger = Number.isSafeInteger || function (value) {
    return Number.isInteger(value) && Math.abs(value) <= Number.MAX_SAFE_INTEGER;
 };
 
-function utf8ByteArrayToString(bytes) {
-	let out = [], pos = 0, c = 0;
-	while (pos < bytes.length) {
-		const c1 = bytes[pos++];
-		if (c1 < 128) {
-			out[c++] = String.fromCharCode(c1);
-		} else if (c1 > 191 && c1 < 224) {
-			const c2 = bytes[pos++];
-			out[c++] = String.fromCharCode((c1 & 31) << 6 | c2 & 63);
-		} else if (c1 > 239 && c1 < 365) {
-			// Surrogate Pair
-			const c2 = bytes[pos++];
-			const c3 = bytes[pos++];
-			const c4 = bytes[pos++];
-			const u = ((c1 & 7) << 18 | (c2 & 63) << 12 | (c3 & 63) << 6 | c4 & 63) - 0x10000;
-			out[c++] = String.fromCharCode(0xD800 + (u >> 10));
-			out[c++] = String.fromCharCode(0xDC00 + (u & 1023));
-		} else {
-			const c2 = bytes[pos++];
-			const c3 = bytes[pos++];
-			out[c++] = String.fromCharCode((c1 & 15) << 12 | (c2 & 63) << 6 | c3 & 63);
+//the encode buffer starts with this size and grows as needed:
+const RENCODE_INITIAL_SIZE = 4096;
+//we free the encode buffer if it has grown bigger than this:
+const RENCODE_MAX_KEPT_SIZE = 1024*1024;
+//strings shorter than this are converted without TextEncoder / TextDecoder:
+const RENCODE_SHORT_STRING = 32;
+
+const utf8_encoder = new TextEncoder();
+const utf8_decoder = new TextDecoder("utf-8");
+
+/*
+A single growable buffer, re-used for encoding every packet.
+*/
+class EncodeBuffer {
+	constructor(size) {
+		this.buf = new Uint8Array(size);
+		this.pos = 0;
+	}
+
+	reserve(len) {
+		const needed = this.pos + len;
+		if (needed <= this.buf.length) {
+			return;
+		}
+		let size = this.buf.length * 2;
+		while (size < needed) {
+			size *= 2;
 		}
+		const buf = new Uint8Array(size);
+		buf.set(this.buf.subarray(0, this.pos));
+		this.buf = buf;
 	}
-	return out.join('');
-}
 
-function stringToUtf8ByteArray(str) {
-	let out = [], p = 0;
-	for (let i = 0; i < str.length; i++) {
-		let c = str.charCodeAt(i);
-		if (c < 128) {
-			out[p++] = c;
-		} else if (c < 2048) {
-			out[p++] = (c >> 6) | 192;
-			out[p++] = (c & 63) | 128;
-		} else if (
-			((c & 0xFC00) == 0xD800) && (i + 1) < str.length &&
-			((str.charCodeAt(i + 1) & 0xFC00) == 0xDC00)) {
-			// Surrogate Pair
-			c = 0x10000 + ((c & 0x03FF) << 10) + (str.charCodeAt(++i) & 0x03FF);
-			out[p++] = (c >> 18) | 240;
-			out[p++] = ((c >> 12) & 63) | 128;
-			out[p++] = ((c >> 6) & 63) | 128;
-			out[p++] = (c & 63) | 128;
-		} else {
-			out[p++] = (c >> 12) | 224;
-			out[p++] = ((c >> 6) & 63) | 128;
-			out[p++] = (c & 63) | 128;
+	byte(b) {
+		if (this.pos >= this.buf.length) {
+			this.reserve(1);
 		}
+		this.buf[this.pos++] = b;
 	}
-	return out;
-}
 
-function rencode_string(str) {
-	const bytes = stringToUtf8ByteArray(str);
-	const len = bytes.length;
-	if (len < RENCODE.STR_FIXED_COUNT) {
-		const u8a = new Uint8Array(len+1);
-		u8a[0] = RENCODE.STR_FIXED_START+len;
+	ascii(str) {
+		//for numbers and length prefixes:
+		const len = str.length;
+		this.reserve(len);
 		for (let i=0; i<len; ++i) {
-			u8a[i+1] = bytes[i];
+			this.buf[this.pos++] = str.charCodeAt(i);
+		}
+	}
+}
+
+const rencode_buffer = new EncodeBuffer(RENCODE_INITIAL_SIZE);
+
+function rencode_string(enc, str) {
+	const str_len = str.length;
+	if (str_len < RENCODE.STR_FIXED_COUNT) {
+		//try the common case first: a short ascii string
+		enc.reserve(str_len+1);
+		const buf = enc.buf;
+		const start = enc.pos;
+		let i = 0;
+		for (; i<str_len; ++i) {
+			const c = str.charCodeAt(i);
+			if (c >= 128) {
+				break;
+			}
+			buf[start+1+i] = c;
+		}
+		if (i === str_len) {
+			buf[start] = RENCODE.STR_FIXED_START+str_len;
+			enc.pos += str_len+1;
+			return;
 		}
-		return u8a;
 	}
-	const len_str = len.toString();
-	const len_len = len_str.length;
-	const u8a = new Uint8Array(len_len+1+len);
-	for (let i=0; i<len_len; ++i) {
-		u8a[i] = len_str.charCodeAt(i);
+	//each UTF-16 code unit encodes to at most 3 bytes,
+	//leave enough room for the longest header we may need:
+	const max_len = str_len*3;
+	const max_header = max_len.toString().length+1;
+	enc.reserve(max_header+max_len);
+	const start = enc.pos;
+	const written = utf8_encoder.encodeInto(str, enc.buf.subarray(start+max_header, start+max_header+max_len)).written;
+	let header_len;
+	if (written < RENCODE.STR_FIXED_COUNT) {
+		enc.buf[start] = RENCODE.STR_FIXED_START+written;
+		header_len = 1;
 	}
-	const SEPARATOR = ":";
-	u8a[len_len] = SEPARATOR.charCodeAt(0);
-	for (let i=0; i<len_str; ++i) {
-		u8a[len_len+1+i] = bytes[i];
+	else {
+		const len_str = written.toString();
+		header_len = len_str.length+1;
+		for (let i=0; i<len_str.length; ++i) {
+			enc.buf[start+i] = len_str.charCodeAt(i);
+		}
+		enc.buf[start+len_str.length] = RENCODE.COLON_CHARCODE;
 	}
-	return u8a;
+	if (header_len < max_header) {
+		enc.buf.copyWithin(start+header_len, start+max_header, start+max_header+written);
+	}
+	enc.pos = start+header_len+written;
 }
 
-function rencode_int(i) {
-	let u8a = null;
+function rencode_int(enc, i) {
+	//the values are stored in a Uint8Array,
+	//which wraps them exactly like the signed bytes they represent
 	if (0 <= i && i < RENCODE.INT_POS_FIXED_COUNT) {
-		u8a = new Uint8Array([RENCODE.INT_POS_FIXED_START + i])
+		enc.byte(RENCODE.INT_POS_FIXED_START + i);
 	}
 	else if (-RENCODE.INT_NEG_FIXED_COUNT <= i && i < 0) {
-		u8a = new Uint8Array(new Int8Array([RENCODE.INT_NEG_FIXED_START - 1 -i]).buffer);
+		enc.byte(RENCODE.INT_NEG_FIXED_START - 1 -i);
 	}
 	else if (-128 <= i && i < 128) {
-		u8a = new Uint8Array(new Int8Array([RENCODE.CHR_INT1, i]).buffer);
+		enc.reserve(2);
+		enc.buf[enc.pos++] = RENCODE.CHR_INT1;
+		enc.buf[enc.pos++] = i;
 	}
 	else if (-32768 <= i && i < 32768) {
-		u8a = new Uint8Array(new Int8Array([RENCODE.CHR_INT2, Math.floor(i/256) % 256, i%256]).buffer);
+		enc.reserve(3);
+		enc.buf[enc.pos++] = RENCODE.CHR_INT2;
+		enc.buf[enc.pos++] = Math.floor(i/256) % 256;
+		enc.buf[enc.pos++] = i%256;
 	}
 	else if (-2147483648 <= i && i< 2147483648) {
-		const i8a = new Int8Array(5);
-		i8a[0] = RENCODE.CHR_INT4;
-		i8a[1] = Math.floor(i/256/256/256);
-		i8a[2] = Math.floor(i/256/256) % 256;
-		i8a[3] = Math.floor(i/256) % 256;
-		i8a[4] = i%256;
-		u8a = new Uint8Array(i8a.buffer);
+		enc.reserve(5);
+		enc.buf[enc.pos++] = RENCODE.CHR_INT4;
+		enc.buf[enc.pos++] = Math.floor(i/256/256/256);
+		enc.buf[enc.pos++] = Math.floor(i/256/256) % 256;
+		enc.buf[enc.pos++] = Math.floor(i/256) % 256;
+		enc.buf[enc.pos++] = i%256;
 	}
 	else if (-9223372036854775808 <= i && i < 9223372036854775808) {
-		const i8a = new Int8Array(9);
-		i8a[0] = RENCODE.CHR_INT8;
+		enc.reserve(9);
+		enc.buf[enc.pos] = RENCODE.CHR_INT8;
 		for (let j=0; j<8; ++j) {
-			i8a[8-j] = i%256;
+			enc.buf[enc.pos+8-j] = i%256;
 			i = Math.floor(i/256);
 		}
-		u8a = new Uint8Array(i8a.buffer);
+		enc.pos += 9;
 	}
 	else {
 		const str = i.toString();
 		if (str.length >= RENCODE.MAX_INT_LENGTH) {
 			throw "number too big: "+i;
 		}
-		const str_len = str.length;
-		u8a = new Uint8Array(str_len+2);
-		u8a[0] = RENCODE.CHR_INT;
-		for (let j=0; j<str_len; ++j) {
-			u8a[1+j] = str[j];
-		}
-		u8a[str_len+1] = RENCODE.CHR_TERM;
-	}
-	return u8a;
-}
-
-
-function rencode_merge_arrays(rlist) {
-	let len = 0;
-	for (let i=0; i<rlist.length; ++i) {
-		len += rlist[i].length;
-	}
-	const u8a = new Uint8Array(len);
-	let index = 0;
-	for (let i=0; i<rlist.length; ++i) {
-		u8a.set(rlist[i], index);
-		index += rlist[i].length;
+		enc.byte(RENCODE.CHR_INT);
+		enc.ascii(str);
+		enc.byte(RENCODE.CHR_TERM);
 	}
-	return u8a;
 }
 
-function rencode_uint8(a) {
+function rencode_uint8(enc, a) {
 	const len = a.length;
-	const len_str = len.toString();
-	const len_len = len_str.length;
-	const u8a = new Uint8Array(len_len+1+len);
-	for (let i=0; i<len_len; ++i) {
-		u8a[i] = len_str.charCodeAt(i);
-	}
-	const SEPARATOR = "/";
-	u8a[len_len] = SEPARATOR.charCodeAt(0);
-	u8a.set(a, len_len+1);
-	return u8a;
+	enc.ascii(len.toString());
+	enc.byte(RENCODE.SLASH_CHARCODE);
+	enc.reserve(len);
+	enc.buf.set(a, enc.pos);
+	enc.pos += len;
 }
 
-function rencode_list(l) {
+function rencode_list(enc, l) {
 	const list_len = l.length;
-	const rlist = [];
 	if (list_len < RENCODE.LIST_FIXED_COUNT) {
-		rlist.push(new Uint8Array([RENCODE.LIST_FIXED_START + list_len]));
+		enc.byte(RENCODE.LIST_FIXED_START + list_len);
 		for (let i=0; i<list_len; ++i) {
-			rlist.push(rencode(l[i]));
+			rencode_value(enc, l[i]);
 		}
 	}
 	else {
-		rlist.push(new Uint8Array([RENCODE.CHR_LIST]));
+		enc.byte(RENCODE.CHR_LIST);
 		for (let i=0; i<list_len; ++i) {
-			rlist.push(rencode(l[i]));
-		}
-		rlist.push(new Uint8Array([RENCODE.CHR_TERM]));
-	}
-	return rencode_merge_arrays(rlist);
-}
-
-function rencode_map(m) {
-	const map_len = m.size;
-	const rlist = [];
-	if (map_len < RENCODE.DICT_FIXED_COUNT) {
-		rlist.push(new Uint8Array([RENCODE.DICT_FIXED_START + map_len]));
-		for (const [key, value] of m) {
-			rlist.push(rencode(key));
-			rlist.push(rencode(value));
-		}
-	}
-	else {
-		rlist.push(new Uint8Array([RENCODE.CHR_DICT]));
-		for (const [key, value] of m) {
-			rlist.push(rencode(key));
-			rlist.push(rencode(value));
+			rencode_value(enc, l[i]);
 		}
-		rlist.push(new Uint8Array([RENCODE.CHR_TERM]));
+		enc.byte(RENCODE.CHR_TERM);
 	}
-	return rencode_merge_arrays(rlist);
 }
 
-function rencode_dict(dict) {
-	const dict_len = Object.keys(dict).length;
-	const rlist = [];
-	if (dict_len < RENCODE.DICT_FIXED_COUNT) {
-		rlist.push(new Uint8Array([RENCODE.DICT_FIXED_START + dict_len]));
-		for(const key in dict) {
-			const value = dict[key];
-			rlist.push(rencode(key));
-			rlist.push(rencode(value));
-		}
+function rencode_map(enc, m) {
+	const fixed = m.size < RENCODE.DICT_FIXED_COUNT;
+	enc.byte(fixed ? RENCODE.DICT_FIXED_START + m.size : RENCODE.CHR_DICT);
+	for (const [key, value] of m) {
+		rencode_value(enc, key);
+		rencode_value(enc, value);
 	}
-	else {
-		rlist.push(new Uint8Array([RENCODE.CHR_DICT]));
-		for(const key in dict) {
-			const value = dict[key];
-			rlist.push(rencode(key));
-			rlist.push(rencode(value));
-		}
-		rlist.push(new Uint8Array([RENCODE.CHR_TERM]));
+	if (!fixed) {
+		enc.byte(RENCODE.CHR_TERM);
 	}
-	return rencode_merge_arrays(rlist);
 }
 
-function rencode_bool(v) {
-	if (v) {
-		return new Uint8Array([RENCODE.CHR_TRUE]);
+function rencode_dict(enc, dict) {
+	const keys = Object.keys(dict);
+	const fixed = keys.length < RENCODE.DICT_FIXED_COUNT;
+	enc.byte(fixed ? RENCODE.DICT_FIXED_START + keys.length : RENCODE.CHR_DICT);
+	for (const key in dict) {
+		rencode_value(enc, key);
+		rencode_value(enc, dict[key]);
 	}
-	else {
-		return new Uint8Array([RENCODE.CHR_FALSE]);
+	if (!fixed) {
+		enc.byte(RENCODE.CHR_TERM);
 	}
 }
 
-function rencode_none() {
-	return new Uint8Array([RENCODE.CHR_NONE]);
-}
-
-function rencode(obj) {
+function rencode_value(enc, obj) {
 	const type = typeof obj;
 	if (type === 'object') {
 		if (obj === null) {
-			return rencode_none();
+			enc.byte(RENCODE.CHR_NONE);
+		}
+		else if (obj instanceof Map) {
+			rencode_map(enc, obj);
 		}
-		if (obj instanceof Map) {
-			return rencode_map(obj);
+		else if (obj.constructor === Uint8Array) {
+			rencode_uint8(enc, obj);
 		}
-		if (obj.constructor === Uint8Array) {
-			return rencode_uint8(obj);
+		else if (typeof obj.length === 'undefined') {
+			rencode_dict(enc, obj);
 		}
-		if (typeof obj.length === 'undefined') {
-			return rencode_dict(obj);
+		else {
+			rencode_list(enc, obj);
 		}
-		return rencode_list(obj);
+		return;
 	}
 	switch(type) {
-		case "string":		return rencode_string(obj);
-		case "number":		return rencode_int(obj);
-		case "list":		return rencode_list(obj);
-		case "dictionary":	return rencode_dict(obj);
-		case "boolean":		return rencode_bool(obj?1:0);
+		case "string":		rencode_string(enc, obj); break;
+		case "number":		rencode_int(enc, obj); break;
+		case "boolean":		enc.byte(obj ? RENCODE.CHR_TRUE : RENCODE.CHR_FALSE); break;
 		default:	throw "invalid object type in source: "+type;
 	}
 }
 
+/*
+Returns a view of the shared encode buffer,
+only valid until the next call: the caller must copy it (ie: into a packet)
+*/
+function rencode_view(obj) {
+	const enc = rencode_buffer;
+	if (enc.buf.length > RENCODE_MAX_KEPT_SIZE) {
+		enc.buf = new Uint8Array(RENCODE_INITIAL_SIZE);
+	}
+	enc.pos = 0;
+	try {
+		rencode_value(enc, obj);
+	}
+	catch (e) {
+		enc.pos = 0;
+		throw e;
+	}
+	return enc.buf.subarray(0, enc.pos);
+}
+
+function rencode(obj) {
+	return rencode_view(obj).slice();
+}
+
+function rdecode_utf8(buf, start, len) {
+	if (len < RENCODE_SHORT_STRING) {
+		let ascii = true;
+		for (let i=start; i<start+len; ++i) {
+			if (buf[i] >= 128) {
+				ascii = false;
+				break;
+			}
+		}
+		if (ascii) {
+			return String.fromCharCode.apply(null, buf.subarray(start, start+len));
+		}
+	}
+	return utf8_decoder.decode(buf.subarray(start, start+len));
+}
+
 function rdecode_string(dec) {
+	const buf = dec.buf;
 	let len = 0;
-	while (dec.buf[dec.pos+len]!=RENCODE.COLON_CHARCODE && dec.buf[dec.pos+len]!=RENCODE.SLASH_CHARCODE) {
+	let str_len = 0;
+	let c = buf[dec.pos];
+	while (c!=RENCODE.COLON_CHARCODE && c!=RENCODE.SLASH_CHARCODE) {
+		if (c < 48 || c > 57) {
+			const str_len_str = String.fromCharCode.apply(null, buf.subarray(dec.pos, dec.pos+len+1));
+			throw "invalid string length: '"+str_len_str+"'";
+		}
+		str_len = str_len*10 + c - 48;
 		len++;
+		c = buf[dec.pos+len];
 	}
-	const str_len_str = String.fromCharCode.apply(null, dec.buf.subarray(dec.pos, dec.pos+len));
-	const str_len = parseInt(str_len_str);
-	if (isNaN(str_len)) {
-		throw "invalid string length: '"+str_len_str+"'";
-	}
-	const binary = dec.buf[dec.pos+len]==RENCODE.SLASH_CHARCODE;
+	const binary = c==RENCODE.SLASH_CHARCODE;
 	dec.pos += len+1;
-	const bytes = dec.buf.subarray(dec.pos, dec.pos+str_len);
+	const start = dec.pos;
 	dec.pos += str_len;
+	if (dec.pos > buf.length) {
+		throw "reached end of buffer";
+	}
 	if (binary) {
-		return new Uint8Array(bytes);
+		//a view of the packet data, not a copy:
+		return buf.subarray(start, start+str_len);
 	}
 	if (str_len==0) {
 		return "";
 	}
-
-	return utf8ByteArrayToString(bytes)
+	return rdecode_utf8(buf, start, str_len);
 }
 function Uint8ToString(u8a){
 	if (typeof u8a == "string") {
 		return u8a;
 	}
-	
+
 	const CHUNK_SZ = 0x8000;
 	const c = [];
 	for (let i=0; i < u8a.length; i+=CHUNK_SZ) {
@@ -336,26 +351,6 @@ function Uint8ToString(u8a){
 	}
 	return c.join("");
 }
-function rdecode_list(dec) {
-	dec.pos++;
-	const list = [];
-	while (dec.buf[dec.pos]!=RENCODE.CHR_TERM) {
-		list.push(_rdecode(dec));
-	}
-	dec.pos++;
-	return list;
-}
-function rdecode_dict(dec) {
-	dec.pos++;
-	const dict = {};
-	while (dec.buf[dec.pos]!=RENCODE.CHR_TERM) {
-		const key = _rdecode(dec);
-		const value = _rdecode(dec);
-		dict[key] = value;
-	}
-	dec.pos++;
-	return dict;
-}
 function rdecode_int(dec) {
 	dec.pos++;
 	let len = 0;
@@ -370,147 +365,114 @@ function rdecode_int(dec) {
 	}
 	return i;
 }
-function rdecode_intb(dec) {
-	//this magically makes the value signed:
-	let b = dec.buf[dec.pos+1]<<24>>24;
-	dec.pos += 2;
-	return b;
-}
-function rdecode_inth(dec) {
-	const slice = dec.buf.slice(dec.pos+1, dec.pos+3)
-	const dv = new DataView(slice.buffer);
-	const s = dv.getInt16(0);
-	dec.pos += 3;
-	return s;
-}
-function rdecode_intl(dec) {
-	const slice = dec.buf.slice(dec.pos+1, dec.pos+5)
-	const dv = new DataView(slice.buffer);
-	const s = dv.getInt32(0);
-	dec.pos += 5;
-	return s;
-}
 function rdecode_intq(dec) {
-	const slice = dec.buf.slice(dec.pos+1, dec.pos+9)
-	const dv = new DataView(slice.buffer);
+	const buf = dec.buf;
+	const dv = new DataView(buf.buffer, buf.byteOffset+dec.pos+1, 8);
 	const s = dv.getBigInt64(0);
 	dec.pos += 9;
-	if (!Number.isSafeInteger(s)) {
-		//console.warn("value is not a safe integer: ", s);
-	}
-	return parseInt(s);
-}
-function rdecode_true(dec) {
-	dec.pos++;
-	return true;
-}
-function rdecode_false(dec) {
-	dec.pos++;
-	return false;
-}
-function rdecode_none(dec) {
-	dec.pos++;
-	return null;
+	return Number(s);
 }
 
-const decode_func = new Map();
-for(let i=0; i<10; i++) {
-	const charcode = i.toString().charCodeAt(0);
-	decode_func[charcode] = rdecode_string;
+class DecodeBuffer {
+  constructor(u8a) {
+	this.buf = u8a;
+	this.pos = 0;
+  }
 }
 
-decode_func[RENCODE.CHR_LIST] = rdecode_list
-decode_func[RENCODE.CHR_DICT] = rdecode_dict
-decode_func[RENCODE.CHR_INT] = rdecode_int
-decode_func[RENCODE.CHR_INT1] = rdecode_intb
-decode_func[RENCODE.CHR_INT2] = rdecode_inth
-decode_func[RENCODE.CHR_INT4] = rdecode_intl
-decode_func[RENCODE.CHR_INT8] = rdecode_intq
-decode_func[RENCODE.CHR_TRUE] = rdecode_true
-decode_func[RENCODE.CHR_FALSE] = rdecode_false
-decode_func[RENCODE.CHR_NONE] = rdecode_none
-
-
-function make_fixed_length_string_decoder(len) {
-	function fixed_length_string_decoder(dec) {
-		dec.pos++;
-		const u8a = dec.buf.subarray(dec.pos, dec.pos+len);
-		dec.pos += len;
-		return utf8ByteArrayToString(u8a);
+function _rdecode(dec) {
+	const buf = dec.buf;
+	if (dec.pos>=buf.length) {
+		throw "reached end of buffer"
 	}
-	return fixed_length_string_decoder;
-}
-for(let i=0; i<RENCODE.STR_FIXED_COUNT; i++) {
-	decode_func[RENCODE.STR_FIXED_START + i] = make_fixed_length_string_decoder(i);
-}
-
-function make_fixed_length_list_decoder(len) {
-	function fixed_length_list_decoder(dec) {
+	const typecode = buf[dec.pos];
+	if (typecode >= RENCODE.LIST_FIXED_START) {
+		const len = typecode - RENCODE.LIST_FIXED_START;
 		dec.pos++;
-		let list = [];
+		const list = new Array(len);
 		for (let i=0; i<len; i++) {
-			list.push(_rdecode(dec));
+			list[i] = _rdecode(dec);
+		}
+		return list;
+	}
+	if (typecode >= RENCODE.STR_FIXED_START) {
+		const len = typecode - RENCODE.STR_FIXED_START;
+		const start = dec.pos+1;
+		dec.pos = start+len;
+		if (dec.pos > buf.length) {
+			throw "reached end of buffer";
 		}
-		return list
+		return rdecode_utf8(buf, start, len);
 	}
-	return fixed_length_list_decoder;
-}
-for(let i=0; i<RENCODE.LIST_FIXED_COUNT; i++) {
-	decode_func[RENCODE.LIST_FIXED_START + i] = make_fixed_length_list_decoder(i);
-}
-
-function make_fixed_length_dict_decoder(len) {
-	function fixed_length_dict_decoder(dec) {
+	if (typecode < RENCODE.INT_POS_FIXED_START + RENCODE.INT_POS_FIXED_COUNT) {
+		dec.pos++;
+		return typecode - RENCODE.INT_POS_FIXED_START;
+	}
+	if (typecode >= RENCODE.INT_NEG_FIXED_START && typecode < RENCODE.INT_NEG_FIXED_START + RENCODE.INT_NEG_FIXED_COUNT) {
+		dec.pos++;
+		return RENCODE.INT_NEG_FIXED_START - 1 - typecode;
+	}
+	if (typecode >= RENCODE.DICT_FIXED_START && typecode < RENCODE.DICT_FIXED_START + RENCODE.DICT_FIXED_COUNT) {
+		const len = typecode - RENCODE.DICT_FIXED_START;
 		dec.pos++;
 		const dict = {};
-		for(let i=0; i<len; i++) {
+		for (let i=0; i<len; i++) {
 			const key = _rdecode(dec);
-			const value = _rdecode(dec);
-			dict[key] = value;
+			dict[key] = _rdecode(dec);
 		}
 		return dict;
 	}
-	return fixed_length_dict_decoder;
-}
-for(let i=0; i<RENCODE.DICT_FIXED_COUNT; i++) {
-	decode_func[RENCODE.DICT_FIXED_START + i] = make_fixed_length_dict_decoder(i);
-}
-
-function make_int_fixed_decoder(i) {
-	function int_fixed_decoder(dec) {
-		dec.pos++;
-		return i;
-	}
-	return int_fixed_decoder;
-}
-for(let i=0; i<RENCODE.INT_POS_FIXED_COUNT; i++) {
-	decode_func[RENCODE.INT_POS_FIXED_START + i] = make_int_fixed_decoder(i)
-}
-for(let i=0; i<RENCODE.INT_NEG_FIXED_COUNT; i++) {
-	decode_func[RENCODE.INT_NEG_FIXED_START + i] = make_int_fixed_decoder(-1 - i)
-}
-
-
-class DecodeBuffer {
-  constructor(u8a) {
-	this.buf = u8a;
-	this.pos = 0;
-  }
-}
-
-function _rdecode(dec) {
-	if (dec.pos>=dec.buf.length) {
-		throw "reached end of buffer"
-	}
-	const typecode = dec.buf[dec.pos];
-	const decode = decode_func[typecode];
-	if (decode === null || decode === undefined) {
-		//console.log("buffer pos:", dec.pos);
-		//console.log("buffer:", dec.buf.subarray(dec.pos, dec.pos+20))
-		//const str = String.fromCharCode.apply(null, dec.buf.subarray(dec.pos, dec.pos+20));
-		throw "no decoder for typecode "+typecode+" at position "+dec.pos;
+	if (typecode >= 48 && typecode <= 57) {
+		//'0' to '9': the length prefix of a string
+		return rdecode_string(dec);
+	}
+	const pos = dec.pos;
+	switch (typecode) {
+		case RENCODE.CHR_LIST: {
+			dec.pos++;
+			const list = [];
+			while (buf[dec.pos]!=RENCODE.CHR_TERM) {
+				list.push(_rdecode(dec));
+			}
+			dec.pos++;
+			return list;
+		}
+		case RENCODE.CHR_DICT: {
+			dec.pos++;
+			const dict = {};
+			while (buf[dec.pos]!=RENCODE.CHR_TERM) {
+				const key = _rdecode(dec);
+				dict[key] = _rdecode(dec);
+			}
+			dec.pos++;
+			return dict;
+		}
+		case RENCODE.CHR_INT:
+			return rdecode_int(dec);
+		case RENCODE.CHR_INT1:
+			dec.pos += 2;
+			//this magically makes the value signed:
+			return buf[pos+1]<<24>>24;
+		case RENCODE.CHR_INT2:
+			dec.pos += 3;
+			return (buf[pos+1]<<8 | buf[pos+2])<<16>>16;
+		case RENCODE.CHR_INT4:
+			dec.pos += 5;
+			return buf[pos+1]<<24 | buf[pos+2]<<16 | buf[pos+3]<<8 | buf[pos+4];
+		case RENCODE.CHR_INT8:
+			return rdecode_intq(dec);
+		case RENCODE.CHR_TRUE:
+			dec.pos++;
+			return true;
+		case RENCODE.CHR_FALSE:
+			dec.pos++;
+			return false;
+		case RENCODE.CHR_NONE:
+			dec.pos++;
+			return null;
+		default:
+			throw "no decoder for typecode "+typecode+" at position "+dec.pos;
 	}
-	return decode(dec);
 }
 
 function rdecode(buf) {
@@ -568,6 +530,7 @@ function rencode_selftest() {
 		test_value(-27123, [63, 150, 13]);
 		test_value('\x00', [129, 0]);
 		test_value("fööbar", [136, 102, 195, 182, 195, 182, 98, 97, 114]);
+		test_value("é".repeat(40), [56, 48, 58].concat(Array(40).fill([195, 169]).flat()));
 		return true;
 	}
 	catch (e) {
@@ -1,11 +1,141 @@
-/* global self ReadableStream Response */
+/* global self ReadableStream Response caches crypto */
 
-self.addEventListener("install", () => {
-  self.skipWaiting();
+/*
+The client files are cached when the service worker is installed,
+so that new sessions can start without downloading them again.
+setup.py prepends the list of files with their sha256 checksums:
+self.PRECACHE_MANIFEST = {"version": "..", "files": {"index.html": "<sha256>", ..}}
+A new version is cached whenever this script changes,
+and it only replaces the previous one once all the files have been downloaded.
+*/
+const PRECACHE = self.PRECACHE_MANIFEST || null;
+const CACHE_PREFIX = "xpra-html5-";
+const CACHE_NAME = PRECACHE ? CACHE_PREFIX + PRECACHE.version : "";
+// the checksums of the files in each cache are stored under this name:
+const CACHE_MANIFEST = "precache-manifest.json";
+
+function precache_url(path) {
+  return new URL(path, self.registration.scope).href;
+}
+
+const PRECACHE_URLS = new Set(PRECACHE ? Object.keys(PRECACHE.files).map(precache_url) : []);
+
+function sha256_hex(buffer) {
+  return crypto.subtle.digest("SHA-256", buffer).then((digest) =>
+    Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("")
+  );
+}
+
+async function get_cached_files() {
+  //path -> [cache, sha256] for the files we have from the previous versions
+  const cached = new Map();
+  for (const name of await caches.keys()) {
+    if (!name.startsWith(CACHE_PREFIX) || name === CACHE_NAME) {
+      continue;
+    }
+    const cache = await caches.open(name);
+    const response = await cache.match(precache_url(CACHE_MANIFEST));
+    if (!response) {
+      //incomplete
+      continue;
+    }
+    const files = await response.json();
+    for (const [path, sha256] of Object.entries(files)) {
+      if (sha256) {
+        cached.set(path, [cache, sha256]);
+      }
+    }
+  }
+  return cached;
+}
+
+async function precache_file(cache, cached, path, sha256) {
+  const url = precache_url(path);
+  const previous = cached.get(path);
+  if (sha256 && previous && previous[1] === sha256) {
+    const response = await previous[0].match(url);
+    if (response) {
+      return cache.put(url, response);
+    }
+  }
+  //the server sends the precompressed variant of the file if it has one,
+  //we get the decompressed contents:
+  const response = await fetch(url, { cache: "no-cache" });
+  if (!response.ok) {
+    throw new Error(`failed to download ${path}: ${response.status}`);
+  }
+  if (sha256) {
+    const value = await sha256_hex(await response.clone().arrayBuffer());
+    if (value !== sha256) {
+      throw new Error(`sha256 checksum mismatch for ${path}`);
+    }
+  }
+  return cache.put(url, response);
+}
+
+async function precache() {
+  if (!PRECACHE) {
+    return;
+  }
+  const cached = await get_cached_files();
+  const cache = await caches.open(CACHE_NAME);
+  try {
+    await Promise.all(Object.entries(PRECACHE.files).map(([path, sha256]) =>
+      precache_file(cache, cached, path, sha256)
+    ));
+    //the cache is only complete once it has a manifest:
+    await cache.put(precache_url(CACHE_MANIFEST), new Response(JSON.stringify(PRECACHE.files), {
+      headers: { "Content-Type": "application/json" },
+    }));
+  } catch (error) {
+    //keep using the previous version:
+    await caches.delete(CACHE_NAME);
+    throw error;
+  }
+}
+
+async function remove_old_caches() {
+  //keep the previous version, the pages loaded from it may still load some of its files:
+  const names = (await caches.keys()).filter((name) => name.startsWith(CACHE_PREFIX) && name !== CACHE_NAME);
+  const keep = PRECACHE ? names.slice(-1) : [];
+  await Promise.all(names.filter((name) => !keep.includes(name)).map((name) => caches.delete(name)));
+}
+
+function precache_fetch(event) {
+  const request = event.request;
+  if (!PRECACHE || request.method !== "GET") {
+    return null;
+  }
+  const url = new URL(request.url);
+  //the client options are passed as query parameters:
+  url.search = "";
+  url.hash = "";
+  //the client is usually opened using the root URL:
+  const href = request.mode === "navigate" && url.href === self.registration.scope ?
+    precache_url("index.html") : url.href;
+  const precached = PRECACHE_URLS.has(href);
+  //the bundles have a unique name, they may be requested by a page from the previous version:
+  if (!precached && !(href.startsWith(self.registration.scope) && url.pathname.includes("/js/bundle-"))) {
+    return null;
+  }
+  event.respondWith(
+    caches.match(href, { cacheName: CACHE_NAME })
+      .then((response) => response || caches.match(href))
+      .then((response) => response || fetch(request))
+  );
+  return null;
+}
+
+self.addEventListener("install", (event) => {
+  //the downloads still need this service worker,
+  //so it is installed even if the new version could not be cached:
+  event.waitUntil(precache().catch((error) => {
+    console.error("failed to cache the client files:", error);
+  }).then(() => self.skipWaiting()));
 });
 
 self.addEventListener("activate", (event) => {
-  event.waitUntil(self.clients.claim());
+  event.waitUntil(remove_old_caches().then(() => self.clients.claim()));
 });
 
 const map = new Map();
@@ -85,7 +215,7 @@ self.onfetch = (event) => {
 
   const hijacke = map.get(url);
 
-  if (!hijacke) return null;
+  if (!hijacke) return precache_fetch(event);
 
   const [stream, data, port] = hijacke;
 
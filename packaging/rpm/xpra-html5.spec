@@ -58,7 +58,7 @@ or by any other web server.
 %install
 mkdir -p %{buildroot}%{_datadir}/xpra/www
 mkdir -p %{buildroot}%{_sysconfdir}/xpra/html5-client
-%{python} ./setup.py install %{buildroot} %{_datadir}/xpra/www/ %{_sysconfdir}/xpra/html5-client %{minifier}
+%{python} ./setup.py install %{?_smp_mflags} %{buildroot} %{_datadir}/xpra/www/ %{_sysconfdir}/xpra/html5-client %{minifier}
 # Ensure there are no executable files:
 find %{buildroot}%{_datadir}/xpra/www/ -type f -exec chmod 0644 {} \;
 mkdir -p %{buildroot}/usr/share/doc/xpra-html5/
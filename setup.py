@@ -7,8 +7,12 @@
 import io
 import re
 import sys
+import json
 import time
+import zlib
+import shlex
 import shutil
+import hashlib
 import os.path
 from typing import AnyStr
 from subprocess import Popen, PIPE
@@ -22,6 +26,41 @@ AUTHOR_EMAIL = "antoine@xpra.org"
 # custom installation directory is set
 CONFIGURATION_FILES = ("default-settings.txt", )
 
+# Records the source digest and tool versions used for each installed file,
+# so that re-running `install` only processes the files that have changed,
+# one per installation directory, kept outside the directory that is served and packaged:
+INSTALL_MANIFEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "build", "install-manifests")
+# where older versions used to record it:
+LEGACY_INSTALL_MANIFEST = ".install-manifest.json"
+
+# The worker entry points, bundled with the scripts they load using `importScripts`:
+WORKER_SCRIPTS = ("js/Protocol.js", "js/DecodeWorker.js", "js/OffscreenDecodeWorker.js", "js/AudioDecodeWorker.js")
+# Lists the content-hashed bundles, which can be served with immutable cache headers:
+BUNDLE_MANIFEST = "bundle-manifest.json"
+BUNDLE_HASH_LENGTH = 16
+# Lists the modules that the client only loads when they are first used:
+LAZY_MODULES_SCRIPT = "js/LazyModules.js"
+LAZY_MODULES_RE = re.compile(r"^const LAZY_MODULES = (\{.*?^\});$", re.MULTILINE | re.DOTALL)
+SCRIPT_TAG_RE = re.compile(r'^\s*<script\b[^>]*\bsrc="([^":]+)"[^>]*>\s*</script>\s*$')
+IMPORT_SCRIPTS_RE = re.compile(r"importScripts\s*\(([^)]*)\)")
+# The service worker caches the client files, the list is prepended to it when installing:
+SERVICE_WORKER = "sw.js"
+PRECACHE_MANIFEST_PREFIX = "self.PRECACHE_MANIFEST = "
+# Prepended to worker bundles so that `importScripts` skips the scripts already included:
+IMPORT_SCRIPTS_SHIM = """(function() {
+  var bundled = %s.map(function(url) { return new URL(url, self.location.href).href; });
+  var import_scripts = self.importScripts.bind(self);
+  self.importScripts = function() {
+    var urls = Array.prototype.filter.call(arguments, function(url) {
+      return bundled.indexOf(new URL(url, self.location.href).href) < 0;
+    });
+    if (urls.length) {
+      import_scripts.apply(self, urls);
+    }
+  };
+})();
+"""
+
 
 def glob_recurse(srcdir: str):
     m = {}
@@ -180,40 +219,510 @@ def load_vcs_info():
     return info
 
 
+def get_tool_version(cmd: str) -> str:
+    # the first line of `cmd --version`, or an empty string if unknown
+    code, out, err = get_status_output([cmd, "--version"])
+    if code != 0:
+        return ""
+    lines = (out or err).strip().splitlines()
+    return lines[0] if lines else ""
+
+
+def file_digest(filename: str) -> str:
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_install_manifest(filename: str) -> dict:
+    if not os.path.exists(filename):
+        return {}
+    try:
+        with open(filename, "r", encoding="utf8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring invalid install manifest {filename!r}: {e}")
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    return manifest
+
+
+def get_install_manifest_filename(www_dir: str) -> str:
+    key = hashlib.sha256(os.path.abspath(www_dir).encode("utf8")).hexdigest()[:16]
+    return os.path.join(INSTALL_MANIFEST_DIR, f"{key}.json")
+
+
+def save_install_manifest(filename: str, manifest: dict) -> None:
+    dirname = os.path.dirname(filename)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname, 0o755)
+    with open(filename, "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.chmod(filename, 0o644)
+
+
+def get_brotli_module():
+    try:
+        import brotli  # @UnresolvedImport
+        return brotli
+    except ImportError:
+        return None
+
+
+def get_zopfli_module():
+    try:
+        import zopfli.gzip  # @UnresolvedImport
+        return zopfli
+    except ImportError:
+        return None
+
+
+def gzip_compress(data: bytes, zopfli=False) -> bytes:
+    # no filename and no timestamp, so the output is reproducible:
+    if zopfli:
+        zmod = get_zopfli_module()
+        if zmod:
+            return zmod.gzip.compress(data)
+    import gzip
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress_cmd(brotli_cmd: str, brotli_version: str, src: str) -> bytes:
+    # fallback for when the `brotli` python module is not installed
+    if brotli_version and brotli_version >= "1":
+        cmd = [brotli_cmd, "-c", "-q", "11", src]
+    else:
+        cmd = [brotli_cmd, "--input", src, "-q", "11"]
+    proc = Popen(cmd, stdout=PIPE, stderr=PIPE)
+    out, err = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{cmd} returned {proc.returncode}: {err.decode(errors='replace').strip()}")
+    return out
+
+
+def compress_file(dst: str, gzip=True, brotli=True, brotli_cmd="", brotli_version="", zopfli=False) -> dict:
+    """
+    writes the precompressed `.gz` and `.br` variants of `dst`
+    and returns the sizes and timings for the report
+    """
+    with open(dst, "rb") as f:
+        data = f.read()
+    info = {"size": len(data)}
+    variants = []
+    if gzip:
+        variants.append(("gz", lambda: gzip_compress(data, zopfli)))
+    if brotli:
+        brotli_module = None if brotli_cmd else get_brotli_module()
+        if brotli_module:
+            variants.append(("br", lambda: brotli_module.compress(data, quality=11)))
+        elif brotli_cmd:
+            variants.append(("br", lambda: brotli_compress_cmd(brotli_cmd, brotli_version, dst)))
+    for ext, compress_fn in variants:
+        start = time.monotonic()
+        try:
+            cdata = compress_fn()
+        except Exception as e:
+            info[f"{ext}-error"] = str(e)
+            continue
+        cfile = f"{dst}.{ext}"
+        with open(cfile, "wb") as f:
+            f.write(cdata)
+        os.chmod(cfile, 0o644)
+        info[ext] = len(cdata)
+        info[f"{ext}-time"] = time.monotonic() - start
+    return info
+
+
+def print_compression_report(report: dict) -> None:
+    if not report:
+        return
+
+    def fmt_ratio(size: int, csize) -> str:
+        if csize is None:
+            return "     -"
+        return "%5.1f%%" % (100 * csize / max(1, size))
+
+    print("compression report:")
+    print("%10s %10s %6s %10s %6s %8s  %s" % ("size", "gzip", "", "brotli", "", "time", "file"))
+    totals = {"size": 0, "gz": None, "br": None, "time": 0}
+    for fname, info in sorted(report.items()):
+        size = info["size"]
+        gz = info.get("gz")
+        br = info.get("br")
+        elapsed = info.get("gz-time", 0) + info.get("br-time", 0)
+        totals["size"] += size
+        if gz is not None:
+            totals["gz"] = (totals["gz"] or 0) + gz
+        if br is not None:
+            totals["br"] = (totals["br"] or 0) + br
+        totals["time"] += elapsed
+        print("%10i %10s %s %10s %s %7ims  %s" % (
+            size, "-" if gz is None else gz, fmt_ratio(size, gz),
+            "-" if br is None else br, fmt_ratio(size, br),
+            elapsed * 1000, fname,
+        ))
+    print("%10i %10s %s %10s %s %7ims  %s" % (
+        totals["size"], "-" if totals["gz"] is None else totals["gz"], fmt_ratio(totals["size"], totals["gz"]),
+        "-" if totals["br"] is None else totals["br"], fmt_ratio(totals["size"], totals["br"]),
+        totals["time"] * 1000, "total",
+    ))
+
+
+def replace_block_declarations(data: str) -> str:
+    for regexp, replacewith in {
+        r"^\s*for\s*\(\s*let\s+": "for(var ",
+        r"^\s*let\s+": "var ",
+        r"^\s*for\s*\(\s*const\s+": "for(var ",
+        r"^\s*const\s+": "var ",
+    }.items():
+        p = re.compile(regexp)
+        newdata = []
+        for line in data.splitlines():
+            newdata.append(p.sub(replacewith, line))
+        data = "\n".join(newdata)
+    return data
+
+
+def install_html5_file(src: str, fname: str, dst: str,
+                       minifier: str, gzip: bool, brotli: bool, brotli_cmd: str, brotli_version: str,
+                       zopfli: bool, compress: bool) -> tuple:
+    """
+    minify (or copy) and compress a single file,
+    this runs in a worker process when using `--jobs`
+    so we return the log messages and compression info rather than printing them
+    """
+    messages = []
+    for path in (dst, f"{dst}.gz", f"{dst}.br"):
+        if os.path.lexists(path):
+            os.unlink(path)
+    ddir = os.path.split(dst)[0]
+    if ddir:
+        os.makedirs(ddir, 0o755, exist_ok=True)
+    ftype = os.path.splitext(fname)[1].lstrip(".")
+    bname = os.path.basename(src)
+
+    fsrc = src
+    if ftype == "js" or fname.endswith("index.html"):
+        # save to a temporary file after replacing strings:
+        with io.open(src, mode='r', encoding='utf8') as f:
+            odata = f.read()
+        data = replace_block_declarations(odata)
+        if data != odata:
+            fsrc = src + ".tmp"
+            with io.open(fsrc, "w", encoding='utf8') as f:
+                f.write(data)
+            os.chmod(fsrc, 0o644)
+
+    if minifier not in ("", None, "copy") and ftype == "js":
+        if os.path.isabs(minifier):
+            minify_cmd = shlex.split(minifier)
+        elif minifier == "uglifyjs":
+            minify_cmd = ["uglifyjs",
+                          fsrc,
+                          "-o", dst,
+                          "--compress",
+                          ]
+        elif minifier == "hjsmin":
+            minify_cmd = ["hjsmin", "-i", fsrc, "-o", dst]
+        else:
+
+            assert minifier == "yuicompressor"
+            try:
+                import yuicompressor  # @UnresolvedImport
+                jar = yuicompressor.get_jar_filename()
+                java_cmd = os.environ.get("JAVA", "java")
+                minify_cmd = [java_cmd, "-jar", jar]
+            except (OSError, ImportError):
+                minify_cmd = ["yuicompressor"]
+            minify_cmd += [
+                fsrc,
+                "--nomunge",
+                "--line-break", "400",
+                "--type", ftype,
+                "-o", dst,
+            ]
+        r = get_status_output(minify_cmd)[0]
+        if r != 0:
+            messages.append(f"Error: failed to minify {bname!r}, command {minify_cmd} returned error {r}")
+            shutil.copyfile(fsrc, dst)
+        os.chmod(dst, 0o644)
+        messages.append(f"minified {fname}")
+    else:
+        messages.append(f"copied {fname}")
+        shutil.copyfile(fsrc, dst)
+        os.chmod(dst, 0o644)
+
+    if fsrc != src:
+        os.unlink(fsrc)
+
+    info = {}
+    if compress:
+        info = compress_file(dst, gzip, brotli, brotli_cmd, brotli_version, zopfli)
+        for ext in ("gz", "br"):
+            error = info.get(f"{ext}-error")
+            if error:
+                messages.append(f"Error: failed to create {dst}.{ext}: {error}")
+    return messages, info
+
+
+def get_imported_scripts(filename: str) -> list:
+    # the script paths loaded by a worker using `importScripts(..)`
+    with io.open(filename, mode='r', encoding='utf8') as f:
+        data = f.read()
+    scripts = []
+    for args in IMPORT_SCRIPTS_RE.findall(data):
+        scripts += [a or b for a, b in re.findall(r'"([^"]+)"|\'([^\']+)\'', args)]
+    return scripts
+
+
+def get_lazy_modules(filename: str) -> dict:
+    # the module definitions from `LazyModules.js`, which are kept as valid JSON
+    with io.open(filename, mode='r', encoding='utf8') as f:
+        data = f.read()
+    m = LAZY_MODULES_RE.search(data)
+    if not m:
+        print(f"Warning: no module definitions found in {filename!r}")
+        return {}
+    return json.loads(m.group(1))
+
+
+def make_bundle(www_dir: str, name: str, parts: list, prefix="", replace=None) -> tuple:
+    """
+    concatenates the installed files `parts` (paths relative to `www_dir`)
+    into a content-hashed bundle in the `js` directory,
+    returns the path of the bundle relative to `www_dir`, and its filename
+    """
+    chunks = [prefix] if prefix else []
+    for part in parts:
+        with io.open(os.path.join(www_dir, part), mode='r', encoding='utf8') as f:
+            data = f.read()
+        for old, new in (replace or {}).items():
+            data = data.replace(f'"{old}"', f'"{new}"').replace(f"'{old}'", f"'{new}'")
+        # the `;` guards against files that do not terminate their last statement:
+        chunks.append(f"/* {part} */\n{data}\n;\n")
+    content = "".join(chunks).encode("utf8")
+    digest = hashlib.sha256(content).hexdigest()[:BUNDLE_HASH_LENGTH]
+    bundle = f"js/bundle-{name}-{digest}.js"
+    filename = os.path.join(www_dir, bundle)
+    with open(filename, "wb") as f:
+        f.write(content)
+    os.chmod(filename, 0o644)
+    return bundle, filename
+
+
+def bundle_html5(www_dir: str, gzip=True, brotli=True, brotli_cmd="", brotli_version="", zopfli=False) -> dict:
+    """
+    replaces the individual script tags of `index.html` with content-hashed bundles,
+    bundles the worker entry points with their `importScripts` dependencies,
+    bundles the scripts of each module that the client loads on demand,
+    and records the result in a manifest so that servers can mark the bundles as immutable
+    """
+    js_dir = os.path.join(www_dir, "js")
+    for filename in os.listdir(js_dir):
+        if filename.startswith("bundle-"):
+            os.unlink(os.path.join(js_dir, filename))
+    report = {}
+    manifest = {"bundles": {}, "workers": {}, "modules": {}, "immutable": []}
+
+    def add_bundle(bundle: str, filename: str, parts: list) -> None:
+        manifest["bundles"][bundle] = parts
+        manifest["immutable"].append(bundle)
+        report[bundle] = compress_file(filename, gzip, brotli, brotli_cmd, brotli_version, zopfli)
+        print(f"bundled {len(parts)} files into {bundle}")
+
+    def bundleable(path: str) -> bool:
+        # files symlinked from the distribution are updated independently of the bundles
+        installed = os.path.join(www_dir, path)
+        return os.path.isfile(installed) and not os.path.islink(installed)
+
+    for worker in WORKER_SCRIPTS:
+        src = os.path.join("html5", worker)
+        if not os.path.exists(src) or not bundleable(worker):
+            continue
+        wdir = os.path.dirname(worker)
+        deps = [os.path.normpath(os.path.join(wdir, x)).replace(os.path.sep, "/") for x in get_imported_scripts(src)]
+        if not all(bundleable(dep) for dep in deps):
+            print(f"Warning: cannot bundle {worker!r}")
+            continue
+        # the worker's `importScripts` calls are relative to the bundle's location,
+        # skip the ones that are already included:
+        included = [os.path.relpath(dep, wdir).replace(os.path.sep, "/") for dep in deps]
+        prefix = IMPORT_SCRIPTS_SHIM % json.dumps(included)
+        name = os.path.splitext(os.path.basename(worker))[0].lower()
+        bundle, filename = make_bundle(www_dir, name, deps + [worker], prefix)
+        manifest["workers"][worker] = bundle
+        add_bundle(bundle, filename, deps + [worker])
+
+    lazy_modules = os.path.join("html5", LAZY_MODULES_SCRIPT)
+    if os.path.exists(lazy_modules):
+        for name, module in get_lazy_modules(lazy_modules).items():
+            scripts = module.get("scripts", [])
+            if not scripts or not all(bundleable(script) for script in scripts):
+                continue
+            bundle, filename = make_bundle(www_dir, f"module-{name}", scripts)
+            manifest["modules"][name] = bundle
+            add_bundle(bundle, filename, scripts)
+
+    with io.open(os.path.join("html5", "index.html"), mode='r', encoding='utf8') as f:
+        html = replace_block_declarations(f.read())
+    # group consecutive script tags that can be bundled,
+    # and replace each group with a single script tag:
+    lines = html.splitlines()
+    groups = []
+    group = []
+    for i, line in enumerate(lines):
+        m = SCRIPT_TAG_RE.match(line)
+        if m and bundleable(m.group(1)):
+            group.append((i, m.group(1)))
+            continue
+        if m or line.strip().startswith("<script"):
+            if group:
+                groups.append(group)
+            group = []
+    if group:
+        groups.append(group)
+    for group in groups:
+        if len(group) < 2:
+            continue
+        parts = [script for _, script in group]
+        prefix = ""
+        if LAZY_MODULES_SCRIPT in parts and manifest["modules"]:
+            # tell the module loader to use the bundles:
+            prefix = "var LAZY_MODULE_CHUNKS = %s;\n" % json.dumps(manifest["modules"])
+        bundle, filename = make_bundle(www_dir, "index", parts, prefix, replace=manifest["workers"])
+        add_bundle(bundle, filename, parts)
+        first = group[0][0]
+        indent = lines[first][:len(lines[first]) - len(lines[first].lstrip())]
+        lines[first] = f'{indent}<script type="text/javascript" src="{bundle}"></script>'
+        for i, _ in group[1:]:
+            lines[i] = None
+    index = os.path.join(www_dir, "index.html")
+    for path in (index, f"{index}.gz", f"{index}.br"):
+        if os.path.lexists(path):
+            os.unlink(path)
+    with io.open(index, "w", encoding="utf8") as f:
+        # don't leave runs of empty lines where the script tags used to be:
+        html_lines = []
+        for line in lines:
+            if line is None or (not line.strip() and html_lines and not html_lines[-1].strip()):
+                continue
+            html_lines.append(line)
+        f.write("\n".join(html_lines) + "\n")
+    os.chmod(index, 0o644)
+    report["index.html"] = compress_file(index, gzip, brotli, brotli_cmd, brotli_version, zopfli)
+
+    save_install_manifest(os.path.join(www_dir, BUNDLE_MANIFEST), manifest)
+    return report
+
+
+def precache_html5(www_dir: str, exclude=CONFIGURATION_FILES, gzip=True, brotli=True, brotli_cmd="", brotli_version="", zopfli=False) -> dict:
+    """
+    lists the installed files with their sha256 checksums in the service worker,
+    so that browsers cache a new version of the client whenever one of them changes
+    """
+    sw = os.path.join(www_dir, SERVICE_WORKER)
+    if not os.path.isfile(sw):
+        return {}
+    # the scripts that have been bundled are not loaded by the client:
+    exclude = set(exclude)
+    bundle_manifest = os.path.join(www_dir, BUNDLE_MANIFEST)
+    if os.path.exists(bundle_manifest):
+        for parts in load_install_manifest(bundle_manifest).get("bundles", {}).values():
+            exclude.update(parts)
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(www_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            fname = os.path.relpath(path, www_dir).replace(os.path.sep, "/")
+            # the web server sends the precompressed variants instead of the plain files:
+            if filename.endswith((".gz", ".br")) or filename.startswith("."):
+                continue
+            if fname in (SERVICE_WORKER, BUNDLE_MANIFEST) or fname in exclude or not os.path.isfile(path):
+                continue
+            # the files symlinked from the distribution or from the configuration directory
+            # are updated independently, so they must always be loaded from the server:
+            if os.path.islink(path):
+                continue
+            files[fname] = file_digest(path)
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf8")).hexdigest()[:BUNDLE_HASH_LENGTH]
+    manifest = {"version": f"{VERSION}-{version}", "files": files}
+    with io.open(sw, mode='r', encoding='utf8') as f:
+        data = f.read()
+    # re-installing over an existing client:
+    if data.startswith(PRECACHE_MANIFEST_PREFIX):
+        data = data.split("\n", 1)[1]
+    with io.open(sw, "w", encoding="utf8") as f:
+        f.write(PRECACHE_MANIFEST_PREFIX + json.dumps(manifest, sort_keys=True) + ";\n" + data)
+    print(f"precaching {len(files)} files, version {manifest['version']}")
+    return {SERVICE_WORKER: compress_file(sw, gzip, brotli, brotli_cmd, brotli_version, zopfli)}
+
+
 def install_html5(root="/", install_dir="/usr/share/xpra/www/", config_dir="/etc/xpra/html5-client",
                   configuration_files=CONFIGURATION_FILES,
                   minifier="uglifyjs",
-                  gzip=True, brotli=True) -> None:
-    print("install_html5%s" % ((root, install_dir, config_dir, configuration_files, minifier, gzip, brotli),))
+                  gzip=True, brotli=True, jobs=1, zopfli=False, bundle=True) -> None:
+    print("install_html5%s" % ((root, install_dir, config_dir, configuration_files, minifier, gzip, brotli, jobs, zopfli, bundle),))
     if minifier not in ("", None, "copy"):
         print(f"minifying html5 client to {install_dir!r} using {minifier}")
     else:
         print(f"copying html5 client to {install_dir!r}")
     if install_dir == ".":
         install_dir = os.getcwd()
-    brotli_cmd = None
-    brotli_version = None
+    brotli_cmd = ""
+    brotli_version = ""
     if brotli:
-        # find brotli on $PATH
-        paths = os.environ.get("PATH", "").split(os.pathsep)
-        if os.name == "posix":
-            # not always present,
-            # but brotli is often installed there (install from source):
-            paths.append("/usr/local/bin")
-        for x in paths:
-            br = os.path.join(x, "brotli")
-            if sys.platform.startswith("win"):
-                br += ".exe"
-            if os.path.exists(br):
-                proc = Popen([br, "--version"], stdout=PIPE, stderr=PIPE)
-                stdout = proc.communicate()[0]
-                if proc.wait() == 0:
-                    brotli_version = stdout.strip(b"\n\r").decode()
-                brotli_cmd = br
-                break
-    print(f"brotli_cmd={brotli_cmd}")
-    if brotli_version:
-        print(f"  {brotli_version}")
+        brotli_module = get_brotli_module()
+        if brotli_module:
+            brotli_version = "brotli module %s" % getattr(brotli_module, "__version__", "")
+        else:
+            # find brotli on $PATH
+            paths = os.environ.get("PATH", "").split(os.pathsep)
+            if os.name == "posix":
+                # not always present,
+                # but brotli is often installed there (install from source):
+                paths.append("/usr/local/bin")
+            for x in paths:
+                br = os.path.join(x, "brotli")
+                if sys.platform.startswith("win"):
+                    br += ".exe"
+                if os.path.exists(br):
+                    proc = Popen([br, "--version"], stdout=PIPE, stderr=PIPE)
+                    stdout = proc.communicate()[0]
+                    if proc.wait() == 0:
+                        brotli_version = stdout.strip(b"\n\r").decode()
+                    brotli_cmd = br
+                    break
+            if not brotli_cmd:
+                # the web servers expect the '.br' files to be present:
+                raise RuntimeError("the brotli python module and the brotli command are missing, "
+                                   "install one of them or use '--no-brotli' to skip the '.br' files")
+            print(f"brotli_cmd={brotli_cmd}")
+        if brotli_version:
+            print(f"  {brotli_version}")
+    if zopfli and not get_zopfli_module():
+        print("Warning: the zopfli python module is missing, using zlib for gzip")
+        zopfli = False
+    # the tool versions are recorded in the manifest,
+    # so that upgrading any of them triggers a full rebuild:
+    minifier_version = ""
+    if minifier not in ("", None, "copy"):
+        minifier_cmd = shlex.split(minifier)[0] if os.path.isabs(minifier) else minifier
+        minifier_version = f"{minifier} {get_tool_version(minifier_cmd)}".strip()
+    gzip_version = ""
+    if gzip:
+        gzip_version = ("zopfli %s" % getattr(get_zopfli_module(), "__version__", "")) if zopfli else f"zlib {zlib.ZLIB_VERSION}"
+    tool_versions = {
+        "minifier": minifier_version,
+        "gzip": gzip_version,
+        "brotli": (brotli_version or "unknown") if brotli else "",
+        # `index.html` is rewritten when bundling:
+        "bundle": bool(bundle),
+    }
     # those are used to replace the file we ship in source form
     # with one that is maintained by the distribution:
     symlinks = {
@@ -238,6 +747,15 @@ def install_html5(root="/", install_dir="/usr/share/xpra/www/", config_dir="/etc
             "/usr/share/fonts/woff/material-design-icons-iconfont/MaterialIcons-Regular.woff2",
         ],
     }
+    if not os.path.exists(root + install_dir):
+        os.makedirs(root + install_dir, 0o755)
+    legacy_manifest = os.path.join(root + install_dir, LEGACY_INSTALL_MANIFEST)
+    if os.path.exists(legacy_manifest):
+        os.unlink(legacy_manifest)
+    manifest_filename = get_install_manifest_filename(root + install_dir)
+    manifest = load_install_manifest(manifest_filename)
+    new_manifest = {}
+    tasks = []
     for files in glob_recurse("html5").values():
         for fname in files:
             if fname.endswith(".tmp"):
@@ -247,11 +765,9 @@ def install_html5(root="/", install_dir="/usr/share/xpra/www/", config_dir="/etc
             if parts[0] == "html5":
                 fname = str(os.path.join(*parts[1:]))
             dst = os.path.join(root + install_dir, fname)
-            if not os.path.exists(root + install_dir):
-                os.makedirs(root + install_dir, 0o755)
-            elif os.path.exists(dst):
-                os.unlink(dst)
             if fname in configuration_files and config_dir and config_dir != install_dir:
+                if os.path.lexists(dst):
+                    os.unlink(dst)
                 # install configuration files in `config_dir` in root:
                 cdir = root + config_dir
                 if not os.path.exists(cdir):
@@ -270,106 +786,54 @@ def install_html5(root="/", install_dir="/usr/share/xpra/www/", config_dir="/etc
             if install_symlink(symlink_options, dst):
                 # we've created a symlink, skip minification and compression
                 continue
-            ddir = os.path.split(dst)[0]
-            if ddir and not os.path.exists(ddir):
-                os.makedirs(ddir, 0o755)
             ftype = os.path.splitext(fname)[1].lstrip(".")
-            bname = os.path.basename(src)
-
-            fsrc = src
-            if ftype == "js" or fname.endswith("index.html"):
-                # save to a temporary file after replacing strings:
-                with io.open(src, mode='r', encoding='utf8') as f:
-                    odata = f.read()
-                data = odata
-                for regexp, replacewith in {
-                    r"^\s*for\s*\(\s*let\s+": "for(var ",
-                    r"^\s*let\s+": "var ",
-                    r"^\s*for\s*\(\s*const\s+": "for(var ",
-                    r"^\s*const\s+": "var ",
-                }.items():
-                    p = re.compile(regexp)
-                    newdata = []
-                    for line in data.splitlines():
-                        newdata.append(p.sub(replacewith, line))
-                    data = "\n".join(newdata)
-
-                if data != odata:
-                    fsrc = src + ".tmp"
-                    with io.open(fsrc, "w", encoding='utf8') as f:
-                        f.write(data)
-                    os.chmod(fsrc, 0o644)
-
-            if minifier not in ("", None, "copy") and ftype == "js":
-                if os.path.isabs(minifier):
-                    minify_cmd = shlex.split(minifier)
-                elif minifier == "uglifyjs":
-                    minify_cmd = ["uglifyjs",
-                                  fsrc,
-                                  "-o", dst,
-                                  "--compress",
-                                  ]
-                elif minifier == "hjsmin":
-                    minify_cmd = ["hjsmin", "-i", fsrc, "-o", dst]
-                else:
-
-                    assert minifier == "yuicompressor"
-                    try:
-                        import yuicompressor  # @UnresolvedImport
-                        jar = yuicompressor.get_jar_filename()
-                        java_cmd = os.environ.get("JAVA", "java")
-                        minify_cmd = [java_cmd, "-jar", jar]
-                    except (OSError, ImportError):
-                        minify_cmd = ["yuicompressor"]
-                    minify_cmd += [
-                        fsrc,
-                        "--nomunge",
-                        "--line-break", "400",
-                        "--type", ftype,
-                        "-o", dst,
-                    ]
-                r = get_status_output(minify_cmd)[0]
-                if r != 0:
-                    print(f"Error: failed to minify {bname!r}, command {minify_cmd} returned error {r}")
-                    shutil.copyfile(fsrc, dst)
-                os.chmod(dst, 0o644)
-                print(f"minified {fname}")
-            else:
-                print(f"copied {fname}")
-                shutil.copyfile(fsrc, dst)
-                os.chmod(dst, 0o644)
-
-            if fsrc != src:
-                os.unlink(fsrc)
-
-            if ftype not in ("png",) and fname not in configuration_files:
-                if gzip:
-                    gzip_dst = f"{dst}.gz"
-                    if os.path.exists(gzip_dst):
-                        os.unlink(gzip_dst)
-                    cmd = ["gzip", "-f", "-n", "-9", "-k", dst]
-                    get_status_output(cmd)
-                    if os.path.exists(gzip_dst):
-                        os.chmod(gzip_dst, 0o644)
-                if brotli and brotli_cmd:
-                    br_dst = f"{dst}.br"
-                    if os.path.exists(br_dst):
-                        os.unlink(br_dst)
-                    if brotli_version and brotli_version >= "1":
-                        cmd = [brotli_cmd, "-k", dst]
-                    else:
-                        cmd = [brotli_cmd, "--input", dst, "--output", br_dst, "-q", "11"]
-                    code, out, err = get_status_output(cmd)
-                    if code != 0:
-                        print(f"brotli error code={code} on {cmd}")
-                        if out:
-                            print(f"stdout={out}")
-                        if err:
-                            print(f"stderr={err}")
-                    elif os.path.exists(br_dst):
-                        os.chmod(br_dst, 0o644)
-                    else:
-                        print(f"Warning: brotli did not create {br_dst!r}")
+            compress = ftype not in ("png",) and fname not in configuration_files
+            entry = dict(tool_versions)
+            entry["sha256"] = file_digest(src)
+            outputs = [dst]
+            if compress and gzip:
+                outputs.append(f"{dst}.gz")
+            if compress and brotli:
+                outputs.append(f"{dst}.br")
+            new_manifest[fname] = entry
+            if manifest.get(fname) == entry and all(os.path.isfile(x) and not os.path.islink(x) for x in outputs):
+                print(f"unchanged {fname}")
+                continue
+            tasks.append((src, fname, dst, minifier, gzip, brotli, brotli_cmd, brotli_version, zopfli, compress))
+
+    if jobs > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        print(f"processing {len(tasks)} files using {jobs} jobs")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(install_html5_file, *task) for task in tasks]
+            results = [future.result() for future in futures]
+    else:
+        results = [install_html5_file(*task) for task in tasks]
+    report = {}
+    for task, (messages, info) in zip(tasks, results):
+        for message in messages:
+            print(message)
+        if info:
+            report[task[1]] = info
+    www_dir = root + install_dir
+    if bundle and os.path.exists(os.path.join(www_dir, "index.html")):
+        report.update(bundle_html5(www_dir, gzip, brotli, brotli_cmd, brotli_version, zopfli))
+    elif os.path.exists(os.path.join(www_dir, "js")):
+        for filename in os.listdir(os.path.join(www_dir, "js")):
+            if filename.startswith("bundle-"):
+                os.unlink(os.path.join(www_dir, "js", filename))
+        if os.path.exists(os.path.join(www_dir, BUNDLE_MANIFEST)):
+            os.unlink(os.path.join(www_dir, BUNDLE_MANIFEST))
+    # remove the outputs of files that are no longer installed from source:
+    for fname in manifest:
+        if fname in new_manifest:
+            continue
+        dst = os.path.join(root + install_dir, fname)
+        for path in (dst, f"{dst}.gz", f"{dst}.br"):
+            if os.path.isfile(path) and not os.path.islink(path):
+                os.unlink(path)
+                print(f"removed stale {path!r}")
+    save_install_manifest(manifest_filename, new_manifest)
 
     if os.name == "posix":
         paths = [
@@ -386,6 +850,10 @@ def install_html5(root="/", install_dir="/usr/share/xpra/www/", config_dir="/etc
                 if install_symlink(symlink_options, dst):
                     break
 
+    # the configuration files can be modified after installation, so they are not cached:
+    report.update(precache_html5(www_dir, configuration_files, gzip, brotli, brotli_cmd, brotli_version, zopfli))
+    print_compression_report(report)
+
 
 def set_version(new_version: str) -> None:
     vcs_info = load_vcs_info() or get_vcs_info()
@@ -459,15 +927,18 @@ def file_sub(filename: str, replace):
     open(filename, "w").write(fdata)
 
 
-def make_deb() -> None:
+def make_deb(jobs=1, zopfli=False, bundle=True, brotli=True) -> None:
     if os.path.exists("xpra-html5.deb"):
         os.unlink("xpra-html5.deb")
     root = "./xpra-html5"
     if os.path.exists(root):
         shutil.rmtree(root)
-    os.mkdir(root)
+    # the staging directory is kept between builds,
+    # so that only the modified files are minified and compressed again:
+    staging = "./build/deb-root"
+    install_html5(staging, jobs=jobs, zopfli=zopfli, bundle=bundle, brotli=brotli)
+    shutil.copytree(staging, root, symlinks=True)
     shutil.copytree("./packaging/debian", root + "/DEBIAN")
-    install_html5(root)
     # Create debian package
     assert Popen(["dpkg-deb", "-Zxz", "--build", "xpra-html5"]).wait() == 0
     assert os.path.exists("./xpra-html5.deb")
@@ -549,6 +1020,32 @@ def detect_minifier() -> str:
     return cmd
 
 
+def bench(args) -> int:
+    """
+    runs the client benchmarks using nodejs,
+    the arguments are passed on to `bench/bench.js` (ie: trace files, `--json`)
+    """
+    node = shutil.which("node") or shutil.which("nodejs")
+    if not node:
+        print("nodejs is required to run the benchmarks")
+        return 1
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "bench.js")
+    proc = Popen([node, "--expose-gc", script] + list(args))
+    return proc.wait()
+
+
+def replay(args) -> int:
+    """
+    runs the local replay server, see `bench/replay.py`
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "replay.py")
+    proc = Popen([sys.executable, script] + list(args))
+    try:
+        return proc.wait()
+    except KeyboardInterrupt:
+        return proc.wait()
+
+
 def show_help(args) -> int:
     cmd = args[0]
     print("invalid number of arguments, usage:")
@@ -557,12 +1054,50 @@ def show_help(args) -> int:
     print(f"{cmd} install")
     print(f"{cmd} install ROOT [INSTALL_DIR] [CONFIG_DIR] [MINIFIER]")
     print(f"{cmd} deb")
+    print("  'install' and 'deb' also accept '--jobs=N' (or '-jN') to process files in parallel")
+    print("  and '--zopfli' to generate smaller (but much slower) gzip files using the zopfli module")
+    print("  '--no-bundle' keeps the individual script files referenced from 'index.html'")
+    print("  '--no-brotli' does not generate the '.br' files, which otherwise requires brotli")
     print(f"{cmd} rpm")
     print(f"{cmd} set-version VERSION")
+    print(f"{cmd} bench [--iterations=N] [--json] [--only=NAME,..] [TRACE..]")
+    print(f"{cmd} replay [--trace=FILE] [--speed=N|max] [--stream=ENCODING:FPS ..] [--log=FILE]")
     return 1
 
 
+def parse_options(args) -> tuple:
+    """
+    extracts the `--jobs=N` / `-jN`, `--zopfli`, `--no-bundle` and `--no-brotli` options from the command line,
+    `-j` or `--jobs` without a value uses all the CPUs available
+    """
+    options = {"jobs": 1, "zopfli": False, "bundle": True, "brotli": True}
+    remaining = []
+    for arg in args:
+        if arg in ("-j", "--jobs"):
+            options["jobs"] = os.cpu_count() or 1
+        elif arg.startswith("--jobs=") or (arg.startswith("-j") and arg[2:].isdigit()):
+            value = arg[7:] if arg.startswith("--jobs=") else arg[2:]
+            try:
+                options["jobs"] = max(1, int(value))
+            except ValueError:
+                print(f"invalid number of jobs {value!r}")
+        elif arg == "--zopfli":
+            options["zopfli"] = True
+        elif arg == "--no-bundle":
+            options["bundle"] = False
+        elif arg == "--no-brotli":
+            options["brotli"] = False
+        else:
+            remaining.append(arg)
+    return remaining, options
+
+
 def main(args) -> int:
+    if len(args) >= 2 and args[1] == "bench":
+        return bench(args[2:])
+    if len(args) >= 2 and args[1] == "replay":
+        return replay(args[2:])
+    args, options = parse_options(args)
     if len(args) < 2 or len(args) >= 7:
         return show_help(args)
     cmd = args[1]
@@ -607,10 +1142,10 @@ def main(args) -> int:
         if len(args) >= 6:
             minifier = args[5]
         # Perform installation
-        install_html5(root_dir, install_dir, config_dir, minifier=minifier)
+        install_html5(root_dir, install_dir, config_dir, minifier=minifier, **options)
         return 0
     if cmd == "deb":
-        make_deb()
+        make_deb(**options)
         return 0
     if cmd == "rpm":
         make_rpm()